@@ -0,0 +1,145 @@
+'''
+answer_renderer.py
+'''
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MONEY_KEYWORDS = ['amount', 'total', 'sum', 'planned', 'actual', 'spent', 'income', 'balance', 'budget', 'cost', 'price']
+COUNT_KEYWORDS = ['count', 'number_of', 'num_']
+
+# Questions that need reasoning over several rows ("which category did I spend most on")
+REASONING_PHRASES = ['how much', 'total', 'most', 'least', 'highest', 'lowest', 'biggest', 'smallest',
+                     'average', 'compare', 'why', 'which', 'should', 'more than', 'less than']
+
+MAX_LISTED_ROWS = 10
+MAX_LISTED_COLUMNS = 5
+MAX_STRUCTURED_ROWS = 200
+
+
+class AnswerRenderer:
+    """
+    Turns SQL results into answers without an LLM call.
+
+    Handles the common result shapes (empty, scalar, single row, simple
+    lists). render() returns None when the shape is genuinely ambiguous
+    for the question, and the caller falls back to the LLM.
+    """
+
+    def render(self, raw_data: Dict[str, Any], original_query: str, structured: bool = False) -> Optional[str]:
+        columns = raw_data.get("columns", [])
+        data = raw_data.get("data", [])
+        query_lower = original_query.lower()
+
+        if not data:
+            return "No information found for your query."
+
+        if len(data) == 1 and len(columns) == 1:
+            return self._render_scalar(columns[0], data[0][0], query_lower)
+
+        if len(data) == 1:
+            if any(phrase in query_lower for phrase in REASONING_PHRASES) and len(self._money_columns(columns)) != 1:
+                return None
+            return self._render_row(columns, data[0])
+
+        # The frontend renders the rows itself; a one-line summary is enough
+        # data may be a preview of a larger result; rowcount is the full size
+        rowcount = raw_data.get("rowcount", len(data))
+        if structured:
+            return f"Found {rowcount} records matching your query."
+
+        if any(phrase in query_lower for phrase in REASONING_PHRASES) or len(columns) > MAX_LISTED_COLUMNS:
+            return None
+
+        return self._render_table(columns, data, rowcount)
+
+    def structure(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Columns and JSON-safe rows for the frontend to render"""
+        data = raw_data.get("data", [])
+        rows = data[:MAX_STRUCTURED_ROWS]
+        rowcount = raw_data.get("rowcount", len(data))
+        structured = {
+            "columns": list(raw_data.get("columns", [])),
+            "rows": [[self._json_value(value) for value in row] for row in rows],
+            "rowcount": rowcount,
+            "truncated": rowcount > len(rows)
+        }
+        if raw_data.get("summary"):
+            structured["summary"] = raw_data["summary"]
+        return structured
+
+    def _render_scalar(self, column: str, value: Any, query_lower: str) -> str:
+        if value is None:
+            return "No information found for your query."
+
+        if self._is_count_column(column):
+            return f"Found {int(value)} matching records."
+
+        if isinstance(value, (int, float, Decimal)) and (self._is_money_column(column) or '$' in query_lower
+                                                         or 'how much' in query_lower):
+            if any(word in query_lower for word in ['spent', 'spend', 'expense', 'cost']):
+                return f"Your total expenses were {self.format_money(abs(value))}."
+            if any(word in query_lower for word in ['income', 'earned', 'revenue']):
+                return f"Your total income was {self.format_money(value)}."
+            if any(word in query_lower for word in ['budget', 'planned']):
+                return f"Your total budget is {self.format_money(value)}."
+            return f"The total is {self.format_money(value)}."
+
+        return f"{self._label(column)}: {self._format_value(column, value)}"
+
+    def _render_row(self, columns: List[str], row) -> str:
+        parts = [f"{self._label(col)}: {self._format_value(col, value)}"
+                 for col, value in zip(columns, row) if value is not None]
+        if not parts:
+            return "No information found for your query."
+        return "Here is what I found: " + ", ".join(parts) + "."
+
+    def _render_table(self, columns: List[str], data, rowcount: Optional[int] = None) -> str:
+        rowcount = len(data) if rowcount is None else rowcount
+        lines = [f"Found {rowcount} records:"]
+        for row in data[:MAX_LISTED_ROWS]:
+            values = [self._format_value(col, value) for col, value in zip(columns, row) if value is not None]
+            lines.append("- " + " · ".join(values))
+        if rowcount > MAX_LISTED_ROWS:
+            lines.append(f"...and {rowcount - MAX_LISTED_ROWS} more.")
+        return "\n".join(lines)
+
+    def _money_columns(self, columns: List[str]) -> List[str]:
+        return [col for col in columns if self._is_money_column(col)]
+
+    def _is_money_column(self, column: str) -> bool:
+        column = column.lower()
+        return not self._is_count_column(column) and any(keyword in column for keyword in MONEY_KEYWORDS)
+
+    def _is_count_column(self, column: str) -> bool:
+        return any(keyword in column.lower() for keyword in COUNT_KEYWORDS)
+
+    def _format_value(self, column: str, value: Any) -> str:
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) and self._is_money_column(column):
+            return self.format_money(value)
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M")
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
+
+    def _label(self, column: str) -> str:
+        return column.replace('_', ' ').strip().capitalize()
+
+    def _json_value(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def format_money(value) -> str:
+        value = float(value)
+        sign = "-" if value < 0 else ""
+        return f"{sign}${abs(value):,.2f}"
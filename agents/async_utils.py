@@ -0,0 +1,25 @@
+'''
+async_utils.py
+'''
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from backend.core.config import settings
+
+# Short blocking work (SQL, validation) from the async pipeline runs here rather
+# than in Starlette's threadpool, so chats waiting on Ollama never hold those workers
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AGENT_BLOCKING_THREADS', 8),
+    thread_name_prefix="agent-blocking"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking agent function off the event loop, keeping the caller's context"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _blocking_executor,
+        functools.partial(context.run, func, *args, **kwargs)
+    )
@@ -1,7 +1,15 @@
 import logging
-from typing import Dict, Any,List
-from langchain_ollama import OllamaLLM
+from typing import Dict, Any, List, Optional
 from agents.query_runner import QueryRunner
+from agents.llm_client import get_shared_llm
+from agents.async_utils import run_blocking
+from agents.pipeline_trace import trace_stage
+from agents.pending_store import create_pending_store
+from sqlalchemy import text, bindparam
+from backend.database.connection import agent_session
+from backend.core.user_data_events import user_data_changed
+from backend.database import rollups
+import re
 import json
 from datetime import datetime
 import sys
@@ -66,21 +74,42 @@ logger = logging.getLogger(__name__)
 #tables the user is allowed to modify
 ALLOWED_USER_MOD_TABLES = ['transactions','budgetentries']
 
+DELETE_PREFIX_PATTERN = re.compile(r'^\s*DELETE\s+FROM\s+transactions\b', re.IGNORECASE)
+# Confirmed deletes remove the ids captured by the preview
+CAPTURED_DELETE_SQL = "DELETE FROM transactions WHERE id IN :ids AND user_id = :user_id"
+
 class DataHandler:
-    def __init__(self):
-        # Handle different settings types
-        llm_model = getattr(settings, 'LLM_MODEL', None) or os.getenv('LLM_MODEL', 'llama2')
-        self.llm = OllamaLLM(model=llm_model)
-        self.query_runner = QueryRunner()
-        self.pending_deletes = {}  # Store pending delete operations: {user_id: {session_id: delete_info}}
+    def __init__(self, llm=None, query_runner: Optional[QueryRunner] = None):
+        self.llm = llm or get_shared_llm()
+        self.query_runner = query_runner or QueryRunner(llm=self.llm)
+        # Deletes waiting for confirmation; the database backend is shared by every worker
+        self.pending_deletes = create_pending_store(settings)
 
 
     def process_natural_language_create(self, enhanced_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
         """
         Process natural language to generate INSERT SQL statements
         """
-        
-        prompt = f"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = self.llm.invoke(self._build_create_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return self._complete_create(sql_query, original_user_query, user_id)
+        except Exception as e:
+            return self._processing_failed("CREATE", "Failed to process request", e)
+
+    async def aprocess_natural_language_create(self, enhanced_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
+        """Async variant of process_natural_language_create"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = await self.llm.ainvoke(self._build_create_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return await run_blocking(self._complete_create, sql_query, original_user_query, user_id)
+        except Exception as e:
+            return self._processing_failed("CREATE", "Failed to process request", e)
+
+    def _build_create_prompt(self, original_user_query: str, user_id: int) -> str:
+        return f"""
         Convert this user request into a PostgreSQL INSERT statement.
         
         USER REQUEST: "{original_user_query}"
@@ -131,96 +160,113 @@ class DataHandler:
         SQL:
         """
 
+    def _complete_create(self, sql_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
+        """Validate and execute the INSERT statement generated by the LLM"""
+        sql_query = sql_query.strip()
+        logger.info(f"Generated SQL: {sql_query}")
+        
+        # Clean up SQL
+        sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
+        
+        # Remove any quotes around SQL
+        if sql_query.startswith('"') and sql_query.endswith('"'):
+            sql_query = sql_query[1:-1]
+        elif sql_query.startswith("'") and sql_query.endswith("'"):
+            sql_query = sql_query[1:-1]
+        
+        # Validate INSERT statement
+        if not sql_query.upper().startswith('INSERT INTO'):
+            raise ValueError("Must be an INSERT statement")
+        
+        # Check for forbidden columns
+        if ' id,' in sql_query.lower() or '(id' in sql_query.lower():
+            raise ValueError("Remove 'id' column - it's auto-generated")
+        
+        if 'created_at' in sql_query.lower():
+            raise ValueError("Remove 'created_at' column - it's auto-generated")
+        
+        # Check user_id is included
+        if str(user_id) not in sql_query:
+            raise ValueError(f"Must include user_id = {user_id}")
+        
+        # Validate table is allowed
+        import re
+        table_match = re.search(r'INSERT INTO\s+(\w+)', sql_query, re.IGNORECASE)
+        if table_match:
+            table_name = table_match.group(1).lower()
+            if table_name not in ALLOWED_USER_MOD_TABLES:
+                raise ValueError(f"Cannot insert into table: {table_name}")
+        
+        # checks columns in transactions
+        if 'transactions' in sql_query.lower():
+            col_match = re.search(r'INSERT INTO transactions\s*\((.*?)\)', sql_query, re.IGNORECASE)
+            if col_match:
+                columns = [col.strip().lower() for col in col_match.group(1).split(',')]
+                if 'id' in columns:
+                    raise ValueError("Remove 'id' from transactions column list")
+                if 'created_at' in columns:
+                    raise ValueError("Remove 'created_at' from transactions column list")
+        
+                expected = ['user_id', 'category_id', 'amount']
+                for col in expected:
+                    if col not in columns:
+                        raise ValueError(f"Transactions INSERT must include: {col}")
+        
+        # execute SQL
         try:
-            sql_query = self.llm.invoke(prompt).strip()
-            logger.info(f"Generated SQL: {sql_query}")
-            
-            # Clean up SQL
-            sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-            
-            # Remove any quotes around SQL
-            if sql_query.startswith('"') and sql_query.endswith('"'):
-                sql_query = sql_query[1:-1]
-            elif sql_query.startswith("'") and sql_query.endswith("'"):
-                sql_query = sql_query[1:-1]
-            
-            # Validate INSERT statement
-            if not sql_query.upper().startswith('INSERT INTO'):
-                raise ValueError("Must be an INSERT statement")
-            
-            # Check for forbidden columns
-            if ' id,' in sql_query.lower() or '(id' in sql_query.lower():
-                raise ValueError("Remove 'id' column - it's auto-generated")
-            
-            if 'created_at' in sql_query.lower():
-                raise ValueError("Remove 'created_at' column - it's auto-generated")
-            
-            # Check user_id is included
-            if str(user_id) not in sql_query:
-                raise ValueError(f"Must include user_id = {user_id}")
-            
-            # Validate table is allowed
-            import re
-            table_match = re.search(r'INSERT INTO\s+(\w+)', sql_query, re.IGNORECASE)
-            if table_match:
-                table_name = table_match.group(1).lower()
-                if table_name not in ALLOWED_USER_MOD_TABLES:
-                    raise ValueError(f"Cannot insert into table: {table_name}")
-            
-            # checks columns in transactions
-            if 'transactions' in sql_query.lower():
-                col_match = re.search(r'INSERT INTO transactions\s*\((.*?)\)', sql_query, re.IGNORECASE)
-                if col_match:
-                    columns = [col.strip().lower() for col in col_match.group(1).split(',')]
-                    if 'id' in columns:
-                        raise ValueError("Remove 'id' from transactions column list")
-                    if 'created_at' in columns:
-                        raise ValueError("Remove 'created_at' from transactions column list")
-                    
-                    expected = ['user_id', 'category_id', 'amount']
-                    for col in expected:
-                        if col not in columns:
-                            raise ValueError(f"Transactions INSERT must include: {col}")
-            
-            # execute SQL
-            try:
+            if table_match and table_match.group(1).lower() == 'transactions':
+                result = self._insert_transactions(sql_query, user_id)
+            else:
                 result = self.query_runner.execute_query(sql_query)
-                logger.info(f"SQL executed successfully: {result.get('message', '')}")
-                
-                # Log interaction
-                self.log_interaction(
-                    user_id=user_id,
-                    original_prompt=original_user_query,
-                    response=f"Executed: {sql_query}"
-                )
-                
-                return {
-                    "status": "COMPLETE",
-                    "sql": sql_query,
-                    "message": f"Record added successfully. {result.get('rowcount', 0)} rows affected."
-                }
-                
-            except Exception as exec_error:
-                logger.error(f"SQL execution failed: {exec_error}")
-                return {
-                    "status": "ERROR",
-                    "sql": sql_query,
-                    "message": f"Failed to execute: {str(exec_error)}"
-                }
-                
-        except Exception as e:
-            logger.error(f"CREATE processing failed: {e}")
+            logger.info(f"SQL executed successfully: {result.get('message', '')}")
+            # Raw SQL bypasses the ORM hooks, so report the write ourselves
+            user_data_changed(user_id, table_match.group(1).lower() if table_match else None)
+        
+            # Log interaction
+            self.log_interaction(
+                user_id=user_id,
+                original_prompt=original_user_query,
+                response=f"Executed: {sql_query}"
+            )
+        
+            return {
+                "status": "COMPLETE",
+                "sql": sql_query,
+                "message": f"Record added successfully. {result.get('rowcount', 0)} rows affected."
+            }
+        
+        except Exception as exec_error:
+            logger.error(f"SQL execution failed: {exec_error}")
             return {
                 "status": "ERROR",
-                "sql": None,
-                "message": f"Failed to process request: {str(e)}"
+                "sql": sql_query,
+                "message": f"Failed to execute: {str(exec_error)}"
             }
 
     def process_natural_language_update(self, enhanced_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
         """
         Process natural language to generate UPDATE SQL statements
         """
-        prompt = f"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = self.llm.invoke(self._build_update_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return self._complete_update(sql_query, original_user_query, user_id)
+        except Exception as e:
+            return self._processing_failed("UPDATE", "Failed to process update request", e)
+
+    async def aprocess_natural_language_update(self, enhanced_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
+        """Async variant of process_natural_language_update"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = await self.llm.ainvoke(self._build_update_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return await run_blocking(self._complete_update, sql_query, original_user_query, user_id)
+        except Exception as e:
+            return self._processing_failed("UPDATE", "Failed to process update request", e)
+
+    def _build_update_prompt(self, original_user_query: str, user_id: int) -> str:
+        return f"""
         Convert this to a PostgreSQL UPDATE statement.
 
         USER: "{original_user_query}"
@@ -239,39 +285,51 @@ class DataHandler:
         SQL:
         """
 
-        try:
-            sql_query = self.llm.invoke(prompt).strip()
-            logger.info(f"Generated UPDATE SQL: {sql_query}")
-            
-            # Clean up
-            sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-            
-            if not sql_query.upper().startswith('UPDATE'):
-                raise ValueError("Must be UPDATE statement")
-            
-            if f"WHERE user_id = {user_id}" not in sql_query.upper():
-                raise ValueError(f"Must include WHERE user_id = {user_id}")
-            
-            return {
-                "status": "COMPLETE",
-                "sql": sql_query,
-                "message": f"SQL generated successfully"
-            }
-
-        except Exception as e:
-            logger.error(f"UPDATE processing failed: {e}")
-            return {
-                "status": "ERROR",
-                "sql": None,
-                "message": f"Failed to process update request: {str(e)}"
-            }
+    def _complete_update(self, sql_query: str, original_user_query: str, user_id: int) -> Dict[str, Any]:
+        """Validate the UPDATE statement generated by the LLM"""
+        sql_query = sql_query.strip()
+        logger.info(f"Generated UPDATE SQL: {sql_query}")
+        
+        # Clean up
+        sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
+        
+        if not sql_query.upper().startswith('UPDATE'):
+            raise ValueError("Must be UPDATE statement")
+        
+        if f"WHERE user_id = {user_id}" not in sql_query.upper():
+            raise ValueError(f"Must include WHERE user_id = {user_id}")
+        
+        return {
+            "status": "COMPLETE",
+            "sql": sql_query,
+            "message": f"SQL generated successfully"
+        }
 
     def process_natural_language_delete(self, enhanced_query: str, original_user_query: str, user_id: int, session_id: str = '') -> Dict[str, Any]:
         """
         Process natural language to generate DELETE SQL statements
         Focus on transaction deletions with strict safety measures
         """
-        prompt = f"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = self.llm.invoke(self._build_delete_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return self._complete_delete(sql_query, original_user_query, user_id, session_id)
+        except Exception as e:
+            return self._processing_failed("DELETE", "Failed to process delete request", e)
+
+    async def aprocess_natural_language_delete(self, enhanced_query: str, original_user_query: str, user_id: int, session_id: str = '') -> Dict[str, Any]:
+        """Async variant of process_natural_language_delete"""
+        try:
+            with trace_stage("generate_sql"):
+                sql_query = await self.llm.ainvoke(self._build_delete_prompt(original_user_query, user_id))
+            with trace_stage("execute_query"):
+                return await run_blocking(self._complete_delete, sql_query, original_user_query, user_id, session_id)
+        except Exception as e:
+            return self._processing_failed("DELETE", "Failed to process delete request", e)
+
+    def _build_delete_prompt(self, original_user_query: str, user_id: int) -> str:
+        return f"""
         Convert this user request into a PostgreSQL DELETE statement.
 
         USER REQUEST: "{original_user_query}"
@@ -327,76 +385,80 @@ class DataHandler:
         SQL:
         """
 
-        try:
-            sql_query = self.llm.invoke(prompt).strip()
-            logger.info(f"Generated DELETE SQL: {sql_query}")
-            
-            # Clean SQL
-            sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-            
-            # Remove quotes around SQL
-            if sql_query.startswith('"') and sql_query.endswith('"'):
-                sql_query = sql_query[1:-1]
-            elif sql_query.startswith("'") and sql_query.endswith("'"):
-                sql_query = sql_query[1:-1]
-            
-            # Validate DELETE statement
-            if not sql_query.upper().startswith('DELETE FROM'):
-                raise ValueError("Must be a DELETE FROM statement")
-            
-            # Check user_id is included
-            if f"user_id = {user_id}" not in sql_query and f"user_id={user_id}" not in sql_query:
-                # Also check for IN clause or other user_id references
-                if f"WHERE user_id IN ({user_id}" not in sql_query:
-                    raise ValueError(f"DELETE statement must include user_id = {user_id} for safety")
-            
-            # Validate table is allowed
-            import re
-            table_match = re.search(r'DELETE FROM\s+(\w+)', sql_query, re.IGNORECASE)
-            if table_match:
-                table_name = table_match.group(1).lower()
-                if table_name != 'transactions':
-                    raise ValueError(f"Cannot delete from table: {table_name}. Only 'transactions' table is allowed.")
-            
-            # generates preview of what will be deleted
-            preview_info = self._preview_delete(sql_query, user_id)
-            
-            # generate unique confirmation ID
-            import uuid
-            confirmation_id = str(uuid.uuid4())[:8]
-            
-            # Store pending delete
-            if user_id not in self.pending_deletes:
-                self.pending_deletes[user_id] = {}
-            
-            self.pending_deletes[user_id][confirmation_id] = {
-                'sql_query': sql_query,
-                'original_query': original_user_query,
-                'preview': preview_info,
-                'created_at': datetime.now(),
-                'session_id': session_id
-            }
-            
-            # Clean up old pending deletes
-            self._cleanup_old_pending_deletes()
-            
-            # Return confirmation request
+    def _complete_delete(self, sql_query: str, original_user_query: str, user_id: int, session_id: str = '') -> Dict[str, Any]:
+        """Validate the DELETE statement generated by the LLM and stage it for confirmation"""
+        sql_query = sql_query.strip()
+        logger.info(f"Generated DELETE SQL: {sql_query}")
+        
+        # Clean SQL
+        sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
+        
+        # Remove quotes around SQL
+        if sql_query.startswith('"') and sql_query.endswith('"'):
+            sql_query = sql_query[1:-1]
+        elif sql_query.startswith("'") and sql_query.endswith("'"):
+            sql_query = sql_query[1:-1]
+        
+        # Validate DELETE statement
+        if not sql_query.upper().startswith('DELETE FROM'):
+            raise ValueError("Must be a DELETE FROM statement")
+        
+        # Check user_id is included
+        if f"user_id = {user_id}" not in sql_query and f"user_id={user_id}" not in sql_query:
+            # Also check for IN clause or other user_id references
+            if f"WHERE user_id IN ({user_id}" not in sql_query:
+                raise ValueError(f"DELETE statement must include user_id = {user_id} for safety")
+        
+        # Validate table is allowed
+        import re
+        table_match = re.search(r'DELETE FROM\s+(\w+)', sql_query, re.IGNORECASE)
+        if table_match:
+            table_name = table_match.group(1).lower()
+            if table_name != 'transactions':
+                raise ValueError(f"Cannot delete from table: {table_name}. Only 'transactions' table is allowed.")
+        
+        # generates preview of what will be deleted
+        preview_info = self._preview_delete(sql_query, user_id)
+        if preview_info.get('too_many'):
             return {
-                "status": "CONFIRM_REQUIRED",
-                "confirmation_id": confirmation_id,
+                "status": "ERROR",
                 "sql": sql_query,
                 "preview": preview_info,
-                "message": f"Delete operation requires confirmation. {preview_info['message']} Please confirm with 'yes' or 'confirm {confirmation_id}' to proceed, or 'no' to cancel."
-            }
-                
-        except Exception as e:
-            logger.error(f"DELETE processing failed: {e}")
-            return {
-                "status": "ERROR",
-                "sql": None,
-                "message": f"Failed to process delete request: {str(e)}"
+                "message": preview_info['message']
             }
         
+        # generate unique confirmation ID
+        import uuid
+        confirmation_id = str(uuid.uuid4())[:8]
+        
+        # Store pending delete (expired entries are purged by the store)
+        self.pending_deletes.put(user_id, confirmation_id, {
+            'sql_query': sql_query,
+            'original_query': original_user_query,
+            'preview': preview_info,
+            'created_at': datetime.now(),
+            'session_id': session_id
+        })
+        
+        # Return confirmation request
+        return {
+            "status": "CONFIRM_REQUIRED",
+            "confirmation_id": confirmation_id,
+            "sql": sql_query,
+            "preview": preview_info,
+            "message": f"Delete operation requires confirmation. {preview_info['message']} Please confirm with 'yes' or 'confirm {confirmation_id}' to proceed, or 'no' to cancel."
+        }
+
+        
+    def _processing_failed(self, operation: str, message: str, error: Exception) -> Dict[str, Any]:
+        """Error result shared by the CREATE/UPDATE/DELETE handlers"""
+        logger.error(f"{operation} processing failed: {error}")
+        return {
+            "status": "ERROR",
+            "sql": None,
+            "message": f"{message}: {str(error)}"
+        }
+
     def confirm_delete(self, user_id: int, confirmation_id: str, confirm: bool = True, session_id: str = '') -> Dict[str, Any]:
         """
         Confirm or cancel a pending delete operation
@@ -411,20 +473,20 @@ class DataHandler:
             Dict with operation result
         """
         try:
-            # Check if user has pending deletes
-            if user_id not in self.pending_deletes or confirmation_id not in self.pending_deletes[user_id]:
+            # Claim the pending delete so concurrent confirmations cannot run it twice
+            delete_info = self.pending_deletes.pop(user_id, confirmation_id)
+            
+            if delete_info is None:
                 return {
                     "status": "ERROR",
                     "message": f"No pending delete found with confirmation ID: {confirmation_id}"
                 }
             
-            delete_info = self.pending_deletes[user_id][confirmation_id]
             sql_query = delete_info['sql_query']
             original_query = delete_info['original_query']
             
             if not confirm:
                 # Cancel delete
-                del self.pending_deletes[user_id][confirmation_id]
                 
                 # Log cancellation
                 self.log_interaction(
@@ -441,10 +503,21 @@ class DataHandler:
             
             # Execute delete
             try:
-                result = self.query_runner.execute_query(sql_query)
-                logger.info(f"DELETE executed successfully: {result.get('message', '')}")
-                
-                rowcount = result.get('rowcount', 0)
+                captured_ids = delete_info.get('preview', {}).get('ids')
+                if captured_ids is not None:
+                    # Delete the rows the user was shown, not whatever the statement matches now
+                    rowcount = self._delete_captured_rows(captured_ids, user_id)
+                    sql_query = CAPTURED_DELETE_SQL
+                else:
+                    # Preview failed, so there are no captured ids to go on
+                    result = self.query_runner.execute_query(sql_query)
+                    rowcount = result.get('rowcount', 0)
+                    if rowcount and re.search(r'DELETE\s+FROM\s+transactions\b', sql_query, re.IGNORECASE):
+                        self._rebuild_rollups(user_id)
+                logger.info(f"DELETE executed successfully: {rowcount} rows affected")
+                if rowcount:
+                    table_match = re.search(r'DELETE\s+FROM\s+(\w+)', sql_query, re.IGNORECASE)
+                    user_data_changed(user_id, table_match.group(1).lower() if table_match else None)
                 
                 # Log interaction
                 self.log_interaction(
@@ -453,9 +526,6 @@ class DataHandler:
                     response=f"CONFIRMED and executed DELETE: {sql_query} (Deleted {rowcount} rows)"
                 )
                 
-                # Clean up pending delete
-                del self.pending_deletes[user_id][confirmation_id]
-                
                 if rowcount == 0:
                     message = "No records found to delete with the specified criteria."
                 else:
@@ -472,10 +542,6 @@ class DataHandler:
             except Exception as exec_error:
                 logger.error(f"DELETE execution failed: {exec_error}")
                 
-                # Clean up pending delete even on error
-                if confirmation_id in self.pending_deletes.get(user_id, {}):
-                    del self.pending_deletes[user_id][confirmation_id]
-                
                 return {
                     "status": "ERROR",
                     "sql": sql_query,
@@ -492,43 +558,63 @@ class DataHandler:
 
     def _preview_delete(self, sql_query: str, user_id: int) -> Dict[str, Any]:
         """
-        Preview what will be deleted by running a SELECT first
+        Preview what will be deleted and capture the matching primary keys
+        
+        One SELECT with the DELETE's WHERE clause returns the ids, sample
+        columns and a window count of the total, so confirmation deletes
+        exactly these rows by id instead of re-running the LLM's statement.
         
         Args:
             sql_query: The DELETE SQL query
             user_id: The user ID
             
         Returns:
-            Dict with preview information
+            Dict with preview information, including the captured 'ids'
         """
         try:
             # Convert DELETE to SELECT for preview
-            preview_sql = sql_query.replace('DELETE FROM', 'SELECT * FROM')
-            
-            count_sql = preview_sql
-            if 'LIMIT' in count_sql.upper():
-                count_sql = count_sql[:count_sql.upper().index('LIMIT')].strip()
-            
-            # Add COUNT for total
-            count_sql = f"SELECT COUNT(*) as record_count FROM ({count_sql}) as subquery"
-            
-            # Execute preview queries
-            preview_result = self.query_runner.execute_query(preview_sql)
-            count_result = self.query_runner.execute_query(count_sql)
+            preview_sql = DELETE_PREFIX_PATTERN.sub(
+                'SELECT id, amount, category_id, created_at, COUNT(*) OVER () AS record_count FROM transactions',
+                sql_query.strip().rstrip(';'), count=1
+            )
+            if preview_sql == sql_query.strip().rstrip(';'):
+                raise ValueError("Could not build a preview for this DELETE statement")
+            
+            max_rows = getattr(settings, 'PENDING_DELETE_MAX_ROWS', 500)
+            with agent_session() as db:
+                try:
+                    result = db.execute(text(preview_sql))
+                    rows = [row._mapping for row in result.fetchmany(max_rows + 1)]
+                finally:
+                    db.rollback()
+            
+            # A LIMIT in the generated statement (e.g. ORDER BY created_at DESC LIMIT 1)
+            # applies after the window count, so only the fetched rows decide the size;
+            # the window count is the full total and is only shown to the user
+            if len(rows) > max_rows:
+                matching = rows[0]['record_count']
+                return {
+                    'record_count': matching,
+                    'sample_records': [],
+                    'ids': [],
+                    'too_many': True,
+                    'message': f"{matching} records match, which is more than the {max_rows} that can be deleted at once. Please narrow the request.",
+                    'preview_sql': preview_sql
+                }
             
-            record_count = count_result.get('data', [{}])[0].get('record_count', 0) if count_result.get('data') else 0
+            ids = [row['id'] for row in rows]
+            record_count = len(ids)
             
             # Get sample records
             sample_records = []
-            if preview_result.get('data'):
-                for i, record in enumerate(preview_result['data'][:5]):
-                    formatted = {
-                        'id': record.get('id'),
-                        'amount': f"${abs(float(record.get('amount', 0))):.2f}",
-                        'category_id': record.get('category_id'),
-                        'created_at': record.get('created_at')
-                    }
-                    sample_records.append(formatted)
+            for record in rows[:5]:
+                formatted = {
+                    'id': record['id'],
+                    'amount': f"${abs(float(record['amount'] or 0)):.2f}",
+                    'category_id': record['category_id'],
+                    'created_at': record['created_at']
+                }
+                sample_records.append(formatted)
             
             # Generate human summary
             if record_count == 0:
@@ -552,6 +638,7 @@ class DataHandler:
             return {
                 'record_count': record_count,
                 'sample_records': sample_records,
+                'ids': ids,
                 'message': message,
                 'preview_sql': preview_sql
             }
@@ -561,27 +648,69 @@ class DataHandler:
             return {
                 'record_count': 0,
                 'sample_records': [],
+                'ids': None,
                 'message': "Unable to preview what will be deleted. Proceed with caution.",
                 'error': str(e)
             }
     
-    def _cleanup_old_pending_deletes(self, max_age_minutes: int = 10):
-        """Clean up pending deletes older than max_age_minutes"""
+    def _delete_captured_rows(self, ids: List[int], user_id: int) -> int:
+        """Delete exactly the rows captured by the preview, still scoped to the user"""
+        if not ids:
+            return 0
+        
+        with agent_session() as db:
+            try:
+                # Take the rows out of the monthly rollups in the same transaction
+                rollups.apply_transactions(db.connection(), ids, -1, user_id=user_id)
+                statement = text(CAPTURED_DELETE_SQL).bindparams(bindparam("ids", expanding=True))
+                result = db.execute(statement, {"ids": list(ids), "user_id": user_id})
+                db.commit()
+                return result.rowcount or 0
+            except Exception:
+                db.rollback()
+                raise
+    
+    def _insert_transactions(self, sql_query: str, user_id: int) -> Dict[str, Any]:
+        """Run a transactions INSERT and add the new rows to the monthly rollups in the same transaction"""
+        statement = sql_query.strip().rstrip(';').strip()
+        returning = 'RETURNING' not in statement.upper()
+        if returning:
+            statement = f"{statement} RETURNING id"
+        
+        with agent_session() as db:
+            try:
+                result = db.execute(text(statement))
+                if returning:
+                    ids = [row[0] for row in result.fetchall()]
+                    rollups.apply_transactions(db.connection(), ids, 1)
+                    affected_rows = len(ids)
+                else:
+                    # Unknown RETURNING list, so recompute the user's rollups instead
+                    affected_rows = result.rowcount or 0
+                    rollups.rebuild(db.connection(), user_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        
+        return {
+            "rowcount": affected_rows,
+            "message": f"Query executed successfully. {affected_rows} rows affected."
+        }
+    
+    def _rebuild_rollups(self, user_id: int):
+        """Recompute a user's monthly rollups after a delete that had no captured ids"""
         try:
-            from datetime import datetime, timedelta
-            cutoff_time = datetime.now() - timedelta(minutes=max_age_minutes)
-            
-            for user_id in list(self.pending_deletes.keys()):
-                for confirmation_id in list(self.pending_deletes[user_id].keys()):
-                    delete_info = self.pending_deletes[user_id][confirmation_id]
-                    if delete_info['created_at'] < cutoff_time:
-                        del self.pending_deletes[user_id][confirmation_id]
-                        logger.info(f"Cleaned up expired pending delete: {confirmation_id}")
-                
-                # Remove empty user entries
-                if not self.pending_deletes[user_id]:
-                    del self.pending_deletes[user_id]
-                    
+            with agent_session() as db:
+                rollups.rebuild(db.connection(), user_id)
+                db.commit()
+        except Exception as e:
+            logger.error(f"Could not rebuild category rollups for user {user_id}: {e}")
+    
+    def _cleanup_old_pending_deletes(self):
+        """Clean up expired pending deletes"""
+        try:
+            self.pending_deletes.purge_expired()
         except Exception as e:
             logger.error(f"Error cleaning up pending deletes: {e}")
 
@@ -589,7 +718,9 @@ class DataHandler:
     def list_pending_deletes(self, user_id: int) -> Dict[str, Any]:
         """List all pending delete operations for a user"""
         try:
-            if user_id not in self.pending_deletes or not self.pending_deletes[user_id]:
+            user_pending = self.pending_deletes.list(user_id)
+            
+            if not user_pending:
                 return {
                     "status": "NO_PENDING",
                     "message": "No pending delete operations.",
@@ -597,7 +728,7 @@ class DataHandler:
                 }
             
             pending_list = []
-            for conf_id, delete_info in self.pending_deletes[user_id].items():
+            for conf_id, delete_info in user_pending.items():
                 pending_list.append({
                     'confirmation_id': conf_id,
                     'original_query': delete_info['original_query'],
@@ -623,26 +754,26 @@ class DataHandler:
     def cancel_all_pending_deletes(self, user_id: int) -> Dict[str, Any]:
         """Cancel all pending delete operations for a user"""
         try:
-            if user_id not in self.pending_deletes:
+            # Clear all pending deletes for this user
+            user_pending = self.pending_deletes.pop_all(user_id)
+            
+            if not user_pending:
                 return {
                     "status": "NO_PENDING",
                     "message": "No pending delete operations to cancel.",
                     "cancelled_count": 0
                 }
             
-            cancelled_count = len(self.pending_deletes[user_id])
+            cancelled_count = len(user_pending)
             
             # Log each cancellation
-            for conf_id, delete_info in self.pending_deletes[user_id].items():
+            for conf_id, delete_info in user_pending.items():
                 self.log_interaction(
                     user_id=user_id,
                     original_prompt=f"AUTO-CANCELLED: {delete_info['original_query']}",
                     response=f"Cancelled all pending deletes. Included confirmation ID: {conf_id}"
                 )
             
-            # Clear all pending deletes for this user
-            del self.pending_deletes[user_id]
-            
             return {
                 "status": "CANCELLED",
                 "message": f"Cancelled {cancelled_count} pending delete operation(s).",
@@ -1,18 +1,5 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import StaticPool
-from .config import settings
-
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    poolclass=StaticPool,
-    connect_args={"options": "-c timezone=utc"}
-)
-
-SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
-)
+# The agents use the API's connection pool (configured by the DB_POOL_* settings)
+from backend.database.connection import engine, SessionLocal, TurnSession, agent_session
 
 def get_db():
     """Dependency for FastAPI to get database session"""
@@ -20,4 +7,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,37 @@
+'''
+evaluate_pipeline_modes.py
+
+Compare the two-call (enhance, then generate SQL) and single-call SQL
+pipelines on a set of questions:
+
+    python -m agents.evaluate_pipeline_modes --user-id 1 "how much did I spend on groceries" ...
+'''
+import argparse
+import json
+from agents.query_runner import QueryRunner, PIPELINE_MODES
+
+
+def evaluate(questions, user_id: int, query_runner: QueryRunner = None):
+    """Run every question through both modes and summarize latency and agreement"""
+    query_runner = query_runner or QueryRunner()
+    reports = [query_runner.compare_pipeline_modes(question, user_id) for question in questions]
+
+    summary = {"questions": len(reports), "same_result": sum(1 for r in reports if r["same_result"])}
+    for mode in PIPELINE_MODES:
+        timings = [r["modes"][mode]["generation_seconds"] for r in reports
+                   if r["modes"][mode]["generation_seconds"] is not None]
+        summary[mode] = {
+            "errors": sum(1 for r in reports if r["modes"][mode]["error"]),
+            "avg_generation_seconds": round(sum(timings) / len(timings), 3) if timings else None
+        }
+
+    return {"summary": summary, "reports": reports}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SQL pipeline modes")
+    parser.add_argument("questions", nargs="+")
+    parser.add_argument("--user-id", type=int, required=True)
+    args = parser.parse_args()
+
+    print(json.dumps(evaluate(args.questions, args.user_id), indent=2, default=str))
@@ -1,20 +1,28 @@
 # file name: intent_classifier.py (updated version)
+import asyncio
 import logging
 import re
 import json
-from typing import Dict, Any
-from langchain_ollama import OllamaLLM
-from backend.core.config import settings
+import threading
+from typing import Dict, Any, Optional, Iterator, Tuple
 from agents.query_runner import QueryRunner
 from agents.data_handler import DataHandler
+from agents.llm_client import get_shared_llm
+from agents.intent_router import IntentRouter
+from agents.async_utils import run_blocking
+from agents.pipeline_trace import trace_stage
+from backend.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_intent_classifier = None
+_intent_classifier_lock = threading.Lock()
+
 class IntentClassifier:
-    def __init__(self):
-        self.llm = OllamaLLM(model=settings.LLM_MODEL)
-        self.query_runner = QueryRunner()
-        self.data_handler = DataHandler()
+    def __init__(self, llm=None, query_runner: Optional[QueryRunner] = None, data_handler: Optional[DataHandler] = None):
+        self.llm = llm or get_shared_llm()
+        self.query_runner = query_runner or QueryRunner(llm=self.llm)
+        self.data_handler = data_handler or DataHandler(llm=self.llm, query_runner=self.query_runner)
         
         # Enhanced keywords for different intents
         self.insert_keywords = [
@@ -54,14 +62,35 @@ class IntentClassifier:
             r'\$?\d+\s+(from)\s+\w+',
             r'(i|I)\s+(earned|made|received|got)\s+\$?\d+'
         ]
+        
+        # Deterministic fast path; the LLM is only asked when the rules are ambiguous
+        self.intent_router = IntentRouter(
+            insert_keywords=self.insert_keywords,
+            update_keywords=self.update_keywords,
+            delete_keywords=self.delete_keywords,
+            view_keywords=self.view_keywords,
+            spending_patterns=self.spending_patterns,
+            income_patterns=self.income_patterns,
+            min_route_score=getattr(settings, 'INTENT_FAST_PATH_MIN_SCORE', 0.85)
+        )
+        
+        # Opt-in: enhance VIEW prompts while the LLM is still classifying the intent
+        self.speculative_enhancement = getattr(settings, 'SPECULATIVE_ENHANCEMENT', False)
+        self._speculation_lock = threading.Lock()
+        self.speculation_used = 0
+        self.speculation_wasted = 0
 
-    def classify_intent(self, user_query: str, user_id: int) -> Dict[str, Any]:
+    def classify_intent(self, user_query: str, user_id: int, structured: bool = False) -> Dict[str, Any]:
         """
         Classify user intent and route to appropriate handler
+        
+        With structured set, VIEW results also carry the columns and rows
+        ("table") so the frontend can render them itself.
         """
         try:
             if self._is_spending_or_income_query(user_query):
                 logger.info(f"Detected spending/income pattern in query: '{user_query}'")
+                self.intent_router.record_hit()
                 # Route to CREATE handler
                 handler_result = self.data_handler.process_natural_language_create(
                     enhanced_query=user_query,
@@ -77,29 +106,194 @@ class IntentClassifier:
                     "original_query": user_query
                 }
             
-            # 1: Use LLM for primary intent classification
-            intent_result = self._llm_classify_intent(user_query)
+            # 1-4: Decide the intent (rules first, LLM only when ambiguous)
+            final_intent, confidence = self._decide_intent(user_query)
+            
+            # 5: Route to appropriate handler
+            handler_result = self._route_to_handler(user_query, user_id, final_intent, structured)
+            
+            return {
+                "intent": final_intent,
+                "handler": "data_handler" if final_intent in ['CREATE', 'UPDATE', 'DELETE'] else "query_runner",
+                "result": handler_result,
+                "confidence": confidence,
+                "original_query": user_query
+            }
+            
+        except Exception as e:
+            logger.error(f"Intent classification failed: {e}")
+            return self._fallback_response(user_query, user_id)
+    
+    async def aclassify_intent(self, user_query: str, user_id: int, structured: bool = False) -> Dict[str, Any]:
+        """
+        Async variant of classify_intent.
+        
+        The event loop is only ever blocked by in-memory work: LLM calls are
+        awaited and database work runs on the agents' blocking executor.
+        """
+        try:
+            if self._is_spending_or_income_query(user_query):
+                logger.info(f"Detected spending/income pattern in query: '{user_query}'")
+                self.intent_router.record_hit()
+                handler_result = await self.data_handler.aprocess_natural_language_create(
+                    enhanced_query=user_query,
+                    original_user_query=user_query,
+                    user_id=user_id
+                )
+                
+                return {
+                    "intent": "CREATE",
+                    "handler": "data_handler",
+                    "result": handler_result,
+                    "confidence": 0.9,
+                    "original_query": user_query
+                }
+            
+            route = self.intent_router.route(user_query)
+            
+            # The LLM classification is needed; start the VIEW enhancement alongside it
+            speculation = None
+            if self.speculative_enhancement and not route["confident"] \
+                    and self.query_runner.pipeline_mode == "two_call" \
+                    and not self.query_runner.sql_cache.contains(user_query):
+                speculation = asyncio.ensure_future(self.query_runner.aenhance_query(user_query))
             
-            # 2: Use keyword matching as fallback/verification
-            keyword_intent = self._keyword_classify_intent(user_query)
+            try:
+                final_intent, confidence = await self._adecide_intent(user_query, route)
+            except BaseException:
+                if speculation:
+                    speculation.cancel()
+                raise
             
-            # 3: Resolve conflicts and get final intent
-            final_intent = self._resolve_intent_conflict(intent_result, keyword_intent)
+            enhanced_query = None
+            if speculation:
+                enhanced_query = await self._resolve_speculation(speculation, final_intent)
             
-            # 4: Route to appropriate handler
-            handler_result = self._route_to_handler(user_query, user_id, final_intent)
+            handler_result = await self._aroute_to_handler(user_query, user_id, final_intent, enhanced_query, structured)
             
             return {
                 "intent": final_intent,
                 "handler": "data_handler" if final_intent in ['CREATE', 'UPDATE', 'DELETE'] else "query_runner",
                 "result": handler_result,
-                "confidence": intent_result.get("confidence", 0.7),
+                "confidence": confidence,
                 "original_query": user_query
             }
             
         except Exception as e:
             logger.error(f"Intent classification failed: {e}")
-            return self._fallback_response(user_query, user_id)
+            return await run_blocking(self._fallback_response, user_query, user_id)
+    
+    def stream_classify_intent(self, user_query: str, user_id: int, structured: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of classify_intent.
+        
+        Yields stage events ("intent", then "sql"/"rows"/"token" for VIEW
+        queries) and finishes with a "result" event whose data has the same
+        shape as the classify_intent return value (with the table in
+        structured mode).
+        """
+        try:
+            if self._is_spending_or_income_query(user_query):
+                classification = self.classify_intent(user_query, user_id, structured)
+                yield {"event": "intent", "data": {"intent": classification["intent"], "confidence": classification["confidence"]}}
+                yield {"event": "result", "data": classification}
+                return
+            
+            final_intent, confidence = self._decide_intent(user_query)
+        except Exception as e:
+            logger.error(f"Intent classification failed: {e}")
+            classification = self._fallback_response(user_query, user_id)
+            yield {"event": "result", "data": classification}
+            return
+        
+        yield {"event": "intent", "data": {"intent": final_intent, "confidence": confidence}}
+        
+        classification = {
+            "intent": final_intent,
+            "handler": "data_handler" if final_intent in ['CREATE', 'UPDATE', 'DELETE'] else "query_runner",
+            "confidence": confidence,
+            "original_query": user_query
+        }
+        
+        if final_intent != "VIEW":
+            classification["result"] = self._route_to_handler(user_query, user_id, final_intent, structured)
+            yield {"event": "result", "data": classification}
+            return
+        
+        for event in self.query_runner.stream_natural_language_query(user_query, user_id, structured):
+            if event["event"] != "answer":
+                yield event
+                continue
+            
+            classification["result"] = self._view_handler_result(event["data"])
+        
+        yield {"event": "result", "data": classification}
+    
+    def _decide_intent(self, user_query: str) -> Tuple[str, float]:
+        """Decide the intent and its confidence without running any handler"""
+        # 1: Try the deterministic rule router first
+        route = self.intent_router.route(user_query)
+        
+        if route["confident"]:
+            logger.info(f"Rule router classified intent: {route['intent']} (route score: {route['route_score']})")
+            return route["intent"], route["route_score"]
+        
+        # 2: Use LLM for primary intent classification
+        intent_result = self._llm_classify_intent(user_query)
+        
+        # 3: Use keyword matching as fallback/verification
+        keyword_intent = self._keyword_classify_intent(user_query)
+        
+        # 4: Resolve conflicts and get final intent
+        final_intent = self._resolve_intent_conflict(intent_result, keyword_intent)
+        return final_intent, intent_result.get("confidence", 0.7)
+    
+    async def _adecide_intent(self, user_query: str, route: Optional[Dict[str, Any]] = None) -> Tuple[str, float]:
+        """Async variant of _decide_intent; takes the router result if it was already computed"""
+        route = route or self.intent_router.route(user_query)
+        
+        if route["confident"]:
+            logger.info(f"Rule router classified intent: {route['intent']} (route score: {route['route_score']})")
+            return route["intent"], route["route_score"]
+        
+        intent_result = await self._allm_classify_intent(user_query)
+        keyword_intent = self._keyword_classify_intent(user_query)
+        
+        final_intent = self._resolve_intent_conflict(intent_result, keyword_intent)
+        return final_intent, intent_result.get("confidence", 0.7)
+    
+    async def _resolve_speculation(self, speculation: "asyncio.Future", final_intent: str) -> Optional[str]:
+        """Use the speculative enhancement for VIEW queries and discard it for everything else"""
+        if final_intent != "VIEW":
+            speculation.cancel()
+            with self._speculation_lock:
+                self.speculation_wasted += 1
+            logger.info(f"Discarded speculative enhancement for {final_intent} query")
+            return None
+        
+        try:
+            enhanced_query = await speculation
+        except Exception as e:
+            logger.warning(f"Speculative enhancement failed: {e}")
+            enhanced_query = None
+        
+        with self._speculation_lock:
+            if enhanced_query is None:
+                self.speculation_wasted += 1
+            else:
+                self.speculation_used += 1
+        return enhanced_query
+    
+    def speculation_stats(self) -> Dict[str, Any]:
+        """How often the speculative enhancement was used versus thrown away"""
+        with self._speculation_lock:
+            total = self.speculation_used + self.speculation_wasted
+            return {
+                "enabled": self.speculative_enhancement,
+                "used": self.speculation_used,
+                "wasted": self.speculation_wasted,
+                "waste_rate": round(self.speculation_wasted / total, 3) if total else 0.0
+            }
     
     def _is_spending_or_income_query(self, user_query: str) -> bool:
         """Check if query indicates spending or income (CREATE intent)"""
@@ -125,7 +319,29 @@ class IntentClassifier:
 
     def _llm_classify_intent(self, user_query: str) -> Dict[str, Any]:
         """Use LLM to classify intent with better prompt and error handling"""
-        prompt = f"""
+        try:
+            with trace_stage("classify_intent"):
+                response = self.llm.invoke(self._build_classification_prompt(user_query)).strip()
+        except Exception as e:
+            logger.warning(f"LLM classification failed: {e}")
+            return {"intent": "VIEW", "confidence": 0.3, "reason": f"LLM error: {str(e)}"}
+        
+        return self._parse_classification_response(response)
+    
+    async def _allm_classify_intent(self, user_query: str) -> Dict[str, Any]:
+        """Async variant of _llm_classify_intent"""
+        try:
+            with trace_stage("classify_intent"):
+                response = (await self.llm.ainvoke(self._build_classification_prompt(user_query))).strip()
+        except Exception as e:
+            logger.warning(f"LLM classification failed: {e}")
+            return {"intent": "VIEW", "confidence": 0.3, "reason": f"LLM error: {str(e)}"}
+        
+        return self._parse_classification_response(response)
+    
+    def _build_classification_prompt(self, user_query: str) -> str:
+        """Build the JSON intent classification prompt"""
+        return f"""
         Analyze this user query and classify its intent for a financial database system.
         
         USER QUERY: "{user_query}"
@@ -154,11 +370,11 @@ class IntentClassifier:
         
         Response:
         """
-        
+    
+    def _parse_classification_response(self, response: str) -> Dict[str, Any]:
+        """Parse the LLM's JSON classification, defaulting to a low-confidence VIEW"""
+        logger.debug(f"LLM raw response: {response}")
         try:
-            response = self.llm.invoke(prompt).strip()
-            logger.debug(f"LLM raw response: {response}")
-            
             # Clean and parse JSON
             response = response.replace('json', '').replace('', '').strip()
             
@@ -264,7 +480,7 @@ class IntentClassifier:
         
         return keyword_intent
 
-    def _route_to_handler(self, user_query: str, user_id: int, intent: str) -> Dict[str, Any]:
+    def _route_to_handler(self, user_query: str, user_id: int, intent: str, structured: bool = False) -> Dict[str, Any]:
         """Route the query to appropriate handler with improved CREATE handling"""
         
         # Enhanced query for better understanding
@@ -289,17 +505,62 @@ class IntentClassifier:
             return self._handle_delete_intent(user_query, user_id)
         
         else:  
-            answer, sql = self.query_runner.process_natural_language_query(
+            view_result = self.query_runner.process_view_query(
                 user_query=user_query,
+                user_id=user_id,
+                structured=structured
+            )
+            
+            return self._view_handler_result(view_result)
+    
+    async def _aroute_to_handler(self, user_query: str, user_id: int, intent: str, view_enhanced_query: Optional[str] = None,
+                                 structured: bool = False) -> Dict[str, Any]:
+        """Async variant of _route_to_handler; VIEW queries can reuse a speculative enhancement"""
+        enhanced_query = self._enhance_for_handler(user_query, intent)
+        
+        if intent == "CREATE":
+            create_query = self._prepare_create_query(user_query)
+            return await self.data_handler.aprocess_natural_language_create(
+                enhanced_query=enhanced_query,
+                original_user_query=create_query,
                 user_id=user_id
             )
+        
+        elif intent == "UPDATE":
+            return await self.data_handler.aprocess_natural_language_update(
+                enhanced_query=enhanced_query,
+                original_user_query=user_query,
+                user_id=user_id
+            )
+        
+        elif intent == "DELETE":
+            return await self.data_handler.aprocess_natural_language_delete(
+                enhanced_query=user_query,
+                original_user_query=user_query,
+                user_id=user_id
+            )
+        
+        else:
+            view_result = await self.query_runner.aprocess_view_query(
+                user_query=user_query,
+                user_id=user_id,
+                enhanced_query=view_enhanced_query,
+                structured=structured
+            )
             
-            return {
-                "status": "COMPLETE",
-                "answer": answer,
-                "sql": sql,
-                "message": "Query executed successfully"
-            }
+            return self._view_handler_result(view_result)
+    
+    def _view_handler_result(self, view_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Handler result for a VIEW query (includes the table in structured mode)"""
+        result = {
+            "status": "COMPLETE",
+            "answer": view_result["answer"],
+            "sql": view_result["sql"],
+            "message": "Query executed successfully"
+        }
+        if "table" in view_result:
+            result["table"] = view_result["table"]
+        return result
     
     def _prepare_create_query(self, user_query: str) -> str:
         """Prepare CREATE queries to ensure they work with data handler"""
@@ -428,4 +689,12 @@ class IntentClassifier:
 
 def get_intent_classifier() -> IntentClassifier:
     """Get a singleton instance of IntentClassifier"""
-    return IntentClassifier()
\ No newline at end of file
+    global _intent_classifier
+    
+    if _intent_classifier is None:
+        with _intent_classifier_lock:
+            if _intent_classifier is None:
+                _intent_classifier = IntentClassifier()
+                logger.info("Initialized shared agent pipeline")
+    
+    return _intent_classifier
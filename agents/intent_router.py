@@ -0,0 +1,154 @@
+'''
+intent_router.py
+'''
+import logging
+import re
+import threading
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ['VIEW', 'CREATE', 'UPDATE', 'DELETE']
+
+# Keywords that only hint at an intent ("my expenses" is usually a VIEW)
+WEAK_CREATE_KEYWORDS = ['expense', 'purchase', 'income', 'cost', 'new']
+
+# Past-tense spending words without an amount are weaker than command verbs
+PAST_TENSE_CREATE_KEYWORDS = ['spent', 'bought', 'paid', 'earned', 'made', 'received', 'got', 'gained']
+
+QUESTION_WORDS = ['what', 'how', 'where', 'when', 'who', 'which']
+
+AGGREGATE_PHRASES = ['how much', 'add up', 'total', 'sum', 'calculate', 'compute', 'amount of']
+
+PATTERN_WEIGHT = 3.0
+LEADING_WORD_BONUS = 1.0
+QUESTION_MARK_WEIGHT = 1.0
+
+
+class IntentRouter:
+    """
+    Deterministic intent router built from the classifier's keyword lists.
+
+    All keywords and spending/income patterns are compiled into a single
+    regex. Every match adds a weight to its intent, and the route score
+    combines how far the best intent is ahead of the runner-up with how much
+    evidence it has, so the LLM is only needed when the rules are ambiguous.
+
+    The route score is a heuristic in [0, 1], not a calibrated probability;
+    min_route_score is hand-tuned against the classifier's keyword lists.
+    """
+
+    def __init__(self, insert_keywords: List[str], update_keywords: List[str],
+                 delete_keywords: List[str], view_keywords: List[str],
+                 spending_patterns: List[str], income_patterns: List[str],
+                 min_route_score: float = 0.85):
+        self.min_route_score = min_route_score
+        self._rules = self._build_rules(
+            insert_keywords, update_keywords, delete_keywords, view_keywords,
+            spending_patterns, income_patterns
+        )
+        self._matcher = re.compile(
+            '|'.join(f'(?P<r{i}>{source})' for i, (source, _, _) in enumerate(self._rules))
+        )
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _build_rules(self, insert_keywords, update_keywords, delete_keywords, view_keywords,
+                     spending_patterns, income_patterns) -> List[Tuple[str, str, float]]:
+        """Build (regex, intent, weight) rules; patterns first, then longest phrases first"""
+        rules = [(pattern, 'CREATE', PATTERN_WEIGHT) for pattern in spending_patterns + income_patterns]
+
+        keyword_weights = {}
+        for keyword in view_keywords:
+            if keyword in AGGREGATE_PHRASES or keyword in QUESTION_WORDS:
+                keyword_weights[keyword] = ('VIEW', 1.5)
+            else:
+                keyword_weights[keyword] = ('VIEW', 2.0)
+        for phrase in AGGREGATE_PHRASES:
+            keyword_weights[phrase] = ('VIEW', 1.5)
+        for keyword in insert_keywords:
+            if keyword in WEAK_CREATE_KEYWORDS:
+                keyword_weights[keyword] = ('CREATE', 0.5)
+            elif keyword in PAST_TENSE_CREATE_KEYWORDS:
+                keyword_weights[keyword] = ('CREATE', 1.0)
+            else:
+                keyword_weights[keyword] = ('CREATE', 1.5)
+        for keyword in update_keywords:
+            keyword_weights[keyword] = ('UPDATE', 2.0)
+        for keyword in delete_keywords:
+            keyword_weights[keyword] = ('DELETE', 2.0)
+        for phrase in ['set up', 'setup']:
+            keyword_weights[phrase] = ('CREATE', 2.0)
+
+        # Longer phrases must win over their prefixes ("how much" before "how")
+        for keyword in sorted(keyword_weights, key=len, reverse=True):
+            intent, weight = keyword_weights[keyword]
+            rules.append((rf'\b{re.escape(keyword)}s?\b', intent, weight))
+
+        return rules
+
+    def score(self, user_query: str) -> Dict[str, float]:
+        """Score every intent for the query"""
+        query_lower = user_query.lower().strip()
+        scores = {intent: 0.0 for intent in INTENTS}
+
+        for match in self._matcher.finditer(query_lower):
+            _, intent, weight = self._rules[int(match.lastgroup[1:])]
+            if match.start() == 0:
+                weight += LEADING_WORD_BONUS
+            scores[intent] += weight
+
+        if query_lower.endswith('?'):
+            scores['VIEW'] += QUESTION_MARK_WEIGHT
+
+        return scores
+
+    def route(self, user_query: str) -> Dict[str, Any]:
+        """
+        Decide the intent from the rules alone.
+
+        Returns the best intent, its route score (margin over the runner-up
+        times evidence, in [0, 1]) and whether the score is high enough to
+        skip the LLM classification call.
+        """
+        scores = self.score(user_query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best_intent, best_score), (_, runner_up_score) = ranked[0], ranked[1]
+
+        if best_score <= 0:
+            route_score = 0.0
+        else:
+            margin = (best_score - runner_up_score) / best_score
+            evidence = min(1.0, best_score / PATTERN_WEIGHT)
+            route_score = round(0.5 + 0.5 * margin * evidence, 3) if margin > 0 else 0.0
+
+        confident = route_score >= self.min_route_score
+        with self._stats_lock:
+            if confident:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        logger.debug(f"Intent router scores for '{user_query}': {scores} -> {best_intent} ({route_score})")
+        return {
+            "intent": best_intent,
+            "route_score": route_score,
+            "confident": confident,
+            "scores": scores
+        }
+
+    def record_hit(self):
+        """Count a turn that was handled by another deterministic rule"""
+        with self._stats_lock:
+            self.hits += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the fast path"""
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
@@ -0,0 +1,190 @@
+'''
+llm_client.py
+'''
+import asyncio
+import logging
+import threading
+import httpx
+from langchain_ollama import OllamaLLM
+from backend.core.config import settings
+from agents.pipeline_trace import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+_shared_llm = None
+_shared_llm_lock = threading.Lock()
+
+
+class _Flight:
+    """A blocking generation that other threads with the same prompt can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.generation = None
+        self.error = None
+
+
+class _AsyncFlight:
+    """An async generation shared by every coroutine awaiting the same prompt"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class TracedLLM:
+    """
+    Thin wrapper around OllamaLLM that reports every call to the pipeline trace.
+    
+    invoke/ainvoke go through generate/agenerate so the final Ollama chunk's
+    generation_info (eval counts and durations) is available; everything
+    else is delegated to the wrapped client.
+    
+    With single_flight, concurrent identical prompts for the same model
+    (double submits, retries, the static classification prompt) share one
+    in-flight generation instead of queueing duplicates on the Ollama box.
+    Streaming is not coalesced.
+    """
+
+    def __init__(self, llm: OllamaLLM, single_flight: bool = True):
+        self._llm = llm
+        self.single_flight = single_flight
+        self._flights_lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+        self.generations = 0
+        self.coalesced = 0
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    def invoke(self, prompt: str) -> str:
+        if not self.single_flight:
+            return self._generate(prompt)
+
+        key = (self._llm.model, prompt)
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if isinstance(flight.error, Exception):
+                raise flight.error
+            if flight.generation is None:
+                # The leader was interrupted (KeyboardInterrupt, SystemExit, cancellation)
+                raise RuntimeError("The shared LLM generation was interrupted") from flight.error
+            record_llm_call(prompt, flight.generation.text, coalesced=True)
+            return flight.generation.text
+
+        try:
+            text = self._generate(prompt, flight)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return text
+
+    async def ainvoke(self, prompt: str) -> str:
+        if not self.single_flight:
+            generation = (await self._llm.agenerate([prompt])).generations[0][0]
+            return self._record_generation(prompt, generation)
+
+        key = (id(asyncio.get_running_loop()), self._llm.model, prompt)
+        with self._flights_lock:
+            flight = self._async_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[key] = _AsyncFlight(asyncio.ensure_future(self._llm.agenerate([prompt])))
+                flight.task.add_done_callback(lambda _: self._finish_async_flight(key, flight))
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        try:
+            # Shielded so one cancelled caller does not cancel the generation for the others
+            generation = (await asyncio.shield(flight.task)).generations[0][0]
+        finally:
+            with self._flights_lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+                if abandoned and self._async_flights.get(key) is flight:
+                    del self._async_flights[key]
+            if abandoned:
+                flight.task.cancel()
+
+        if not leader:
+            record_llm_call(prompt, generation.text, coalesced=True)
+            return generation.text
+        return self._record_generation(prompt, generation)
+
+    def stream(self, prompt: str):
+        chunks = []
+        for chunk in self._llm.stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        record_llm_call(prompt, "".join(chunks))
+
+    def stats(self):
+        with self._flights_lock:
+            return {"single_flight": self.single_flight, "generations": self.generations, "coalesced": self.coalesced}
+
+    def _generate(self, prompt: str, flight: _Flight = None) -> str:
+        generation = self._llm.generate([prompt]).generations[0][0]
+        if flight is not None:
+            flight.generation = generation
+        return self._record_generation(prompt, generation)
+
+    def _record_generation(self, prompt: str, generation) -> str:
+        with self._flights_lock:
+            self.generations += 1
+        record_llm_call(prompt, generation.text, generation.generation_info)
+        return generation.text
+
+    def _finish_async_flight(self, key, flight: _AsyncFlight):
+        with self._flights_lock:
+            if self._async_flights.get(key) is flight:
+                del self._async_flights[key]
+
+
+def _build_llm() -> OllamaLLM:
+    """Create the Ollama client with a bounded keep-alive connection pool"""
+    limits = httpx.Limits(
+        max_connections=getattr(settings, 'LLM_MAX_CONNECTIONS', 10),
+        max_keepalive_connections=getattr(settings, 'LLM_MAX_KEEPALIVE_CONNECTIONS', 5)
+    )
+    llm_kwargs = {
+        "model": getattr(settings, 'LLM_MODEL', 'llama3'),
+        "client_kwargs": {"limits": limits}
+    }
+
+    base_url = getattr(settings, 'OLLAMA_BASE_URL', None)
+    if base_url:
+        llm_kwargs["base_url"] = base_url
+
+    return OllamaLLM(**llm_kwargs)
+
+
+def get_shared_llm() -> TracedLLM:
+    """
+    Get the process-wide Ollama client.
+
+    Every agent shares this instance so that all prompts go through one
+    pooled HTTP client and keep-alive connections are reused across requests.
+    """
+    global _shared_llm
+
+    if _shared_llm is None:
+        with _shared_llm_lock:
+            if _shared_llm is None:
+                _shared_llm = TracedLLM(_build_llm(), single_flight=getattr(settings, 'LLM_SINGLE_FLIGHT', True))
+                logger.info(f"Initialized shared LLM client for model {_shared_llm.model}")
+
+    return _shared_llm
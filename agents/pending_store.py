@@ -0,0 +1,229 @@
+'''
+pending_store.py
+'''
+import heapq
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+from sqlalchemy import Table, Column, MetaData, String, Integer, Float, Text, create_engine, select, delete
+
+logger = logging.getLogger(__name__)
+
+
+class PendingOperationStore(ABC):
+    """
+    Pending operations (e.g. deletes waiting for confirmation) keyed by
+    user id and confirmation id, each with an expiry.
+
+    pop() is a claim: at most one caller gets a given operation back, so a
+    confirmation cannot be executed twice. Expired operations are never
+    returned, and purge_expired() only touches expired entries.
+    """
+
+    def __init__(self, ttl_seconds: int = 600):
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    def put(self, user_id: int, operation_id: str, info: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def pop(self, user_id: int, operation_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def pop_all(self, user_id: int) -> Dict[str, Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        ...
+
+
+class MemoryPendingStore(PendingOperationStore):
+    """Per-process store; a heap ordered by expiry makes purging O(expired)"""
+
+    def __init__(self, ttl_seconds: int = 600):
+        super().__init__(ttl_seconds)
+        self._operations: Dict[int, Dict[str, Tuple[float, Dict[str, Any]]]] = {}
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def put(self, user_id, operation_id, info):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._operations.setdefault(user_id, {})[operation_id] = (expires_at, info)
+            heapq.heappush(self._expiry_heap, (expires_at, user_id, operation_id))
+        self.purge_expired()
+
+    def pop(self, user_id, operation_id):
+        with self._lock:
+            entry = self._operations.get(user_id, {}).pop(operation_id, None)
+            self._drop_empty(user_id)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def list(self, user_id):
+        now = time.time()
+        with self._lock:
+            user_operations = dict(self._operations.get(user_id, {}))
+        return {op_id: info for op_id, (expires_at, info) in user_operations.items() if expires_at > now}
+
+    def pop_all(self, user_id):
+        now = time.time()
+        with self._lock:
+            user_operations = self._operations.pop(user_id, {})
+        return {op_id: info for op_id, (expires_at, info) in user_operations.items() if expires_at > now}
+
+    def purge_expired(self):
+        now = time.time()
+        purged = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, user_id, operation_id = heapq.heappop(self._expiry_heap)
+                entry = self._operations.get(user_id, {}).get(operation_id)
+                # Entries already popped (or replaced) leave stale heap items behind
+                if entry is not None and entry[0] == expires_at:
+                    del self._operations[user_id][operation_id]
+                    self._drop_empty(user_id)
+                    purged += 1
+                    logger.info(f"Cleaned up expired pending operation: {operation_id}")
+        return purged
+
+    def _drop_empty(self, user_id):
+        if user_id in self._operations and not self._operations[user_id]:
+            del self._operations[user_id]
+
+
+class DatabasePendingStore(PendingOperationStore):
+    """
+    Store backed by a pending_operations table, so every worker process
+    sees the same confirmations. Uses the application database unless a
+    separate URL (e.g. a SQLite file shared by local workers) is given.
+
+    The table is created by the versioned migrations: the app's startup
+    migration for the application database, and the same migration run
+    here for a separate store database.
+    """
+
+    metadata = MetaData()
+    table = Table(
+        "pending_operations", metadata,
+        Column("operation_id", String(64), primary_key=True),
+        Column("user_id", Integer, nullable=False, index=True),
+        Column("payload", Text, nullable=False),
+        Column("created_at", Float, nullable=False),
+        Column("expires_at", Float, nullable=False, index=True),
+    )
+
+    def __init__(self, engine=None, url: Optional[str] = None, ttl_seconds: int = 600):
+        super().__init__(ttl_seconds)
+        if engine is None:
+            if url:
+                from backend.database.migrations import migrate, PENDING_OPERATIONS_MIGRATION
+                engine = create_engine(url, pool_pre_ping=True)
+                migrate(engine, [PENDING_OPERATIONS_MIGRATION])
+            else:
+                from backend.database.connection import engine
+        self.engine = engine
+
+    def put(self, user_id, operation_id, info):
+        now = time.time()
+        payload = dict(info)
+        if isinstance(payload.get('created_at'), datetime):
+            payload['created_at'] = payload['created_at'].isoformat()
+
+        with self.engine.begin() as conn:
+            conn.execute(self.table.insert().values(
+                operation_id=operation_id,
+                user_id=user_id,
+                payload=json.dumps(payload, default=str),
+                created_at=now,
+                expires_at=now + self.ttl_seconds
+            ))
+        self.purge_expired()
+
+    def pop(self, user_id, operation_id):
+        table = self.table
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                select(table.c.payload).where(
+                    table.c.operation_id == operation_id,
+                    table.c.user_id == user_id,
+                    table.c.expires_at > time.time()
+                )
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = conn.execute(
+                delete(table).where(table.c.operation_id == operation_id, table.c.user_id == user_id)
+            ).rowcount
+        # Another worker deleted it between our SELECT and DELETE
+        if claimed != 1:
+            return None
+        return self._load(row.payload)
+
+    def list(self, user_id):
+        table = self.table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.operation_id, table.c.payload)
+                .where(table.c.user_id == user_id, table.c.expires_at > time.time())
+                .order_by(table.c.created_at)
+            ).fetchall()
+        return {row.operation_id: self._load(row.payload) for row in rows}
+
+    def pop_all(self, user_id):
+        table = self.table
+        claimed = {}
+        with self.engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.operation_id, table.c.payload)
+                .where(table.c.user_id == user_id, table.c.expires_at > time.time())
+            ).fetchall()
+            for row in rows:
+                deleted = conn.execute(delete(table).where(table.c.operation_id == row.operation_id)).rowcount
+                if deleted == 1:
+                    claimed[row.operation_id] = self._load(row.payload)
+        return claimed
+
+    def purge_expired(self):
+        # Uses the expires_at index, so the cost is proportional to the expired rows
+        with self.engine.begin() as conn:
+            purged = conn.execute(delete(self.table).where(self.table.c.expires_at <= time.time())).rowcount
+        if purged:
+            logger.info(f"Cleaned up {purged} expired pending operation(s)")
+        return purged or 0
+
+    def _load(self, payload: str) -> Dict[str, Any]:
+        info = json.loads(payload)
+        if isinstance(info.get('created_at'), str):
+            try:
+                info['created_at'] = datetime.fromisoformat(info['created_at'])
+            except ValueError:
+                pass
+        return info
+
+
+def create_pending_store(settings) -> PendingOperationStore:
+    """Build the store selected by PENDING_STORE_BACKEND ("database" or "memory")"""
+    backend = getattr(settings, 'PENDING_STORE_BACKEND', 'database')
+    ttl_seconds = getattr(settings, 'PENDING_OPERATION_TTL_SECONDS', 600)
+
+    if backend == "database":
+        try:
+            return DatabasePendingStore(url=getattr(settings, 'PENDING_STORE_URL', None), ttl_seconds=ttl_seconds)
+        except Exception as e:
+            logger.error(f"Could not use the database pending store, falling back to memory: {e}")
+    elif backend != "memory":
+        logger.warning(f"Unknown PENDING_STORE_BACKEND '{backend}', using memory")
+    return MemoryPendingStore(ttl_seconds=ttl_seconds)
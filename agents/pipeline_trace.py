@@ -0,0 +1,120 @@
+'''
+pipeline_trace.py
+'''
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+# Trace for the chat turn being processed and the stage currently open in this context
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("pipeline_trace", default=None)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("pipeline_stage", default=None)
+
+# Ollama reports these on the final chunk of every generation
+OLLAMA_COUNT_FIELDS = {
+    "prompt_eval_count": "prompt_tokens",
+    "eval_count": "completion_tokens",
+}
+OLLAMA_DURATION_FIELDS = {
+    "prompt_eval_duration": "prompt_eval_seconds",
+    "eval_duration": "eval_seconds",
+    "total_duration": "ollama_total_seconds",
+}
+
+
+class PipelineTrace:
+    """
+    Per-request timing breakdown of the agent pipeline.
+
+    Stages are recorded in the order they finish. The trace is shared by
+    the async tasks and executor threads working on the same chat turn, so
+    appends are locked.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add(self, stage: Dict[str, Any]):
+        with self._lock:
+            self.stages.append(stage)
+
+    @contextmanager
+    def activated(self):
+        """Make this the current trace for the code in the block"""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = [dict(stage) for stage in self.stages]
+        slowest = max(stages, key=lambda stage: stage["seconds"], default=None)
+        return {
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "slowest_stage": slowest["stage"] if slowest else None,
+            "stages": stages
+        }
+
+
+def current_trace() -> Optional[PipelineTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_stage(name: str):
+    """Time a pipeline stage; a no-op when no trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    stage = {"stage": name, "seconds": 0.0}
+    token = _current_stage.set(stage)
+    started = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage["seconds"] = round(time.perf_counter() - started, 4)
+        _current_stage.reset(token)
+        trace.add(stage)
+
+
+def record_stage(name: str, seconds: float, **details):
+    """Record a stage that was timed by the caller (e.g. across generator yields)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add({"stage": name, "seconds": round(seconds, 4), **details})
+
+
+def record_llm_call(prompt: str, response: str, generation_info: Optional[Dict[str, Any]] = None,
+                    coalesced: bool = False):
+    """
+    Attach prompt/response sizes and Ollama's eval counts to the open stage.
+
+    A coalesced call shared another request's in-flight generation, so it
+    is counted separately and carries no eval counts of its own.
+    """
+    stage = _current_stage.get()
+    if stage is None:
+        return
+
+    if coalesced:
+        stage["coalesced_calls"] = stage.get("coalesced_calls", 0) + 1
+        generation_info = None
+    else:
+        stage["llm_calls"] = stage.get("llm_calls", 0) + 1
+    stage["prompt_chars"] = stage.get("prompt_chars", 0) + len(prompt)
+    stage["response_chars"] = stage.get("response_chars", 0) + len(response)
+
+    for field, key in OLLAMA_COUNT_FIELDS.items():
+        if generation_info and generation_info.get(field) is not None:
+            stage[key] = stage.get(key, 0) + generation_info[field]
+    for field, key in OLLAMA_DURATION_FIELDS.items():
+        if generation_info and generation_info.get(field) is not None:
+            # Ollama durations are nanoseconds
+            stage[key] = round(stage.get(key, 0) + generation_info[field] / 1e9, 4)
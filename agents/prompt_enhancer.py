@@ -2,19 +2,13 @@
 prompt_enhancer.py
 '''
 import logging
-from langchain_ollama import OllamaLLM
-from backend.core.config import settings
+from agents.llm_client import get_shared_llm
+from agents.pipeline_trace import trace_stage
 
 logger = logging.getLogger(__name__)
 
-class PromptEnhancer:
-    def __init__(self):
-        self.llm = OllamaLLM(model=settings.LLM_MODEL)
-    
-    def enhance_query(self, user_query: str, schema_info: str) -> str:
-        """Enhanced query with emphasis on exact value retrieval"""
-        
-        category_mapping_info = """
+# Shared with the single-call SQL prompt in query_runner
+CATEGORY_MAPPING_INFO = """
         CATEGORY NAME MAPPING FOR FINANCIAL SYSTEM:
         
         INCOME CATEGORIES (category_kind = 'income'):
@@ -33,13 +27,42 @@ class PromptEnhancer:
         CRITICAL: Always use exact category names from the database, not approximations.
         """
 
-        prompt = f"""
+
+class PromptEnhancer:
+    def __init__(self, llm=None):
+        self.llm = llm or get_shared_llm()
+    
+    def enhance_query(self, user_query: str, schema_info: str) -> str:
+        """Enhanced query with emphasis on exact value retrieval"""
+        try:
+            with trace_stage("enhance_query"):
+                enhanced_query = self.llm.invoke(self._build_prompt(user_query, schema_info)).strip()
+            logger.info(f"Enhanced query: '{user_query}' -> '{enhanced_query}'")
+            return enhanced_query
+        except Exception as e:
+            logger.error(f"Prompt enhancement failed: {e}")
+            return user_query
+    
+    async def aenhance_query(self, user_query: str, schema_info: str) -> str:
+        """Async variant of enhance_query"""
+        try:
+            with trace_stage("enhance_query"):
+                enhanced_query = (await self.llm.ainvoke(self._build_prompt(user_query, schema_info))).strip()
+            logger.info(f"Enhanced query: '{user_query}' -> '{enhanced_query}'")
+            return enhanced_query
+        except Exception as e:
+            logger.error(f"Prompt enhancement failed: {e}")
+            return user_query
+    
+    def _build_prompt(self, user_query: str, schema_info: str) -> str:
+        """Build the query enhancement prompt"""
+        return f"""
         You are enhancing a financial query for SQL generation.
 
         DATABASE SCHEMA:
         {schema_info}
 
-        {category_mapping_info}
+        {CATEGORY_MAPPING_INFO}
 
         ENHANCEMENT RULES:
         1. Map vague terms to exact database category names
@@ -52,11 +75,3 @@ class PromptEnhancer:
 
         Enhanced question (focus on data retrieval, not response formatting):
         """
-        
-        try:
-            enhanced_query = self.llm.invoke(prompt).strip()
-            logger.info(f"Enhanced query: '{user_query}' -> '{enhanced_query}'")
-            return enhanced_query
-        except Exception as e:
-            logger.error(f"Prompt enhancement failed: {e}")
-            return user_query
\ No newline at end of file
@@ -2,246 +2,410 @@
 query_runner.py
 '''
 import logging
-from typing import Tuple, Dict, Any, Optional
-from langchain_ollama import OllamaLLM
+import threading
+import time
+from typing import Tuple, Dict, Any, Optional, Iterator
 from sqlalchemy import text
-from backend.database.connection import SessionLocal
+from backend.database.connection import agent_session
+from agents.prompt_enhancer import PromptEnhancer, CATEGORY_MAPPING_INFO
+from agents.llm_client import get_shared_llm
+from agents.schema_catalogue import SchemaCatalogue
+from agents.sql_template_cache import SQLTemplateCache
+from agents.answer_renderer import AnswerRenderer
+from agents.sql_guard import SQLGuard
+from agents.result_summary import fetch_preview_with_summary
+from agents.async_utils import run_blocking
+from agents.pipeline_trace import trace_stage, record_stage
 from backend.core.config import settings
-from agents.prompt_enhancer import PromptEnhancer
+from backend.core.llm_access import role_cache, llm_access_for_role
 
 logger = logging.getLogger(__name__)
 
+# two_call: enhance the question, then generate SQL; single_call: one prompt does both
+PIPELINE_MODES = ("two_call", "single_call")
+
 class QueryRunner:
-    def __init__(self):
-        self.llm = OllamaLLM(model=settings.LLM_MODEL)
-        self.enhancer = PromptEnhancer()
+    def __init__(self, llm=None, enhancer: Optional[PromptEnhancer] = None):
+        self.llm = llm or get_shared_llm()
+        self.enhancer = enhancer or PromptEnhancer(llm=self.llm)
         self.conversation_context = {}  # Store extracted values for future use
+        self._context_lock = threading.Lock()  # Instance is shared across request threads
+        self.schema_catalogue = SchemaCatalogue(
+            check_interval_seconds=getattr(settings, 'SCHEMA_CATALOGUE_CHECK_SECONDS', 300)
+        )
+        self.sql_cache = SQLTemplateCache(
+            max_entries=getattr(settings, 'SQL_TEMPLATE_CACHE_SIZE', 256),
+            ttl_seconds=getattr(settings, 'SQL_TEMPLATE_CACHE_TTL_SECONDS', 3600)
+        )
+        # Templates were generated against the old views
+        self.schema_catalogue.add_listener(self.sql_cache.clear)
+        
+        # Limits for running LLM-generated SELECTs
+        self.sql_guard = SQLGuard(
+            statement_timeout_ms=getattr(settings, 'SQL_STATEMENT_TIMEOUT_MS', 5000),
+            max_plan_cost=getattr(settings, 'SQL_MAX_PLAN_COST', 100000.0),
+            max_plan_rows=getattr(settings, 'SQL_MAX_PLAN_ROWS', 100000),
+            row_cap=getattr(settings, 'SQL_ROW_CAP', 500)
+        )
+        self.guard_enabled = getattr(settings, 'SQL_GUARD_ENABLED', True)
+        
+        # Keep only preview rows in memory; totals/averages come from the database
+        self.result_summaries = getattr(settings, 'SQL_RESULT_SUMMARIES', True)
+        self.preview_rows = getattr(settings, 'SQL_PREVIEW_ROWS', 50)
+        
+        # Formats common result shapes without the final LLM call
+        self.renderer = AnswerRenderer()
+        self.deterministic_answers = getattr(settings, 'DETERMINISTIC_ANSWERS', True)
+        
+        self.pipeline_mode = getattr(settings, 'SQL_PIPELINE_MODE', 'two_call')
+        if self.pipeline_mode not in PIPELINE_MODES:
+            logger.warning(f"Unknown SQL_PIPELINE_MODE '{self.pipeline_mode}', using two_call")
+            self.pipeline_mode = "two_call"
 
     def execute_query(self, query: str) -> Dict[str, Any]:
         """Execute SQL query and return results"""
-        db = SessionLocal()
-
-        try:
-            # Wrap raw SQL with text()
-            result = db.execute(text(query))
+        with agent_session() as db:
+            try:
+                # Wrap raw SQL with text()
+                result = db.execute(text(query))
             
-            # COMMIT THE TRANSACTION for non-SELECT queries
-            if not query.strip().upper().startswith('SELECT'):
-                db.commit()
-                logger.info(f"Executed and committed non-SELECT query")
+                # COMMIT THE TRANSACTION for non-SELECT queries
+                if not query.strip().upper().startswith('SELECT'):
+                    db.commit()
+                    logger.info(f"Executed and committed non-SELECT query")
             
-            if query.strip().upper().startswith('SELECT'):
-                # Get column names and data for SELECT queries
-                columns = list(result.keys())
-                data = result.fetchall()
-                return {
-                    "columns": columns,
-                    "data": data,
-                    "rowcount": len(data)
-                }
-            else:
-                #return rowcount and a message for non-SELECT queries
-                affected_rows = getattr(result, "rowcount", None)
-                if affected_rows is None:
-                    # Fallback if rowcount is not available
-                    affected_rows = 0
-                return {
-                    "columns": [],
-                    "data": [],
-                    "rowcount": affected_rows, 
-                    "message": f"Query executed successfully. {affected_rows} rows affected."
-                }
-        except Exception as e:
-            # Rollback on error
-            db.rollback()
-            logger.error(f"Query execution failed: {e}")
-            raise
-        finally:
-            db.close()
+                if query.strip().upper().startswith('SELECT'):
+                    # Get column names and data for SELECT queries
+                    columns = list(result.keys())
+                    data = result.fetchall()
+                    return {
+                        "columns": columns,
+                        "data": data,
+                        "rowcount": len(data)
+                    }
+                else:
+                    #return rowcount and a message for non-SELECT queries
+                    affected_rows = getattr(result, "rowcount", None)
+                    if affected_rows is None:
+                        # Fallback if rowcount is not available
+                        affected_rows = 0
+                    return {
+                        "columns": [],
+                        "data": [],
+                        "rowcount": affected_rows, 
+                        "message": f"Query executed successfully. {affected_rows} rows affected."
+                    }
+            except Exception as e:
+                # Rollback on error
+                db.rollback()
+                logger.error(f"Query execution failed: {e}")
+                raise
 
     def _get_schema_info(self) -> str:
         '''Get database schema information focused on LLM-friendly views'''
-        db = SessionLocal()
-        try:
-            # Get detailed view information
-            views_query = text("""
-            SELECT table_name, column_name, data_type, is_nullable
-            FROM information_schema.columns 
-            WHERE table_schema = 'public' AND table_name LIKE 'llm_%'
-            ORDER BY table_name, ordinal_position;
-            """)
-            
-            views_result = db.execute(views_query)
-            
-            schema_info = "LLM-OPTIMIZED VIEWS (USE THESE INSTEAD OF BASE TABLES):\n\n"
-            
-            current_view = None
-            for table_name, column_name, data_type, is_nullable in views_result.fetchall():
-                if table_name != current_view:
-                    if current_view:
-                        schema_info += "\n"
-                    current_view = table_name
-                    schema_info += f"VIEW: {table_name}\n"
-                    schema_info += "Columns:\n"
-                
-                nullable = " (nullable)" if is_nullable == 'YES' else ""
-                schema_info += f"  - {column_name} ({data_type}){nullable}\n"            
-            schema_info += """
-    VIEW PURPOSES AND EXACT USAGE:
-
-    llm_user_profile - User personal and business information:
-    • business_name → Use for: "what company do I work for", "am I in a business", "my business name"
-    • role_name → Use for: "what is my role", "am I an admin"
-    • display_name → Use for: "what is my name", "who am I"
-
-    llm_business_hierarchy - Business user relationships:
-    • admin_display_name, admin_user_email → Use for: "who is my admin", "who do I report to"
-    • display_name, email → Use for: "who works under me", "my team members"
-
-    CRITICAL FINANCIAL VIEWS - MUST USE THESE:
-
-    llm_transaction_summary - MOST IMPORTANT FOR SPENDING QUESTIONS:
-    • amount → Use for spending calculations (negative = expense, positive = income)
-    • absolute_amount → Always positive amount
-    • category_name → Category of transaction
-    • category_kind → 'expense' or 'income'
-    • created_at → Transaction date (use for filtering by month)
-    • month, year → Alternative date fields
-    • user_id → Filter by specific user
-    • transaction_id → Unique identifier
-    • USE THIS VIEW FOR: "how much did I spend", "what are my expenses", "show my transactions"
-
-    llm_financial_overview - Financial summary data:
-    • amount → Same as above
-    • absolute_amount → Always positive amount
-    • budgeted_amount, actual_income, actual_expenses → For budget comparisons
-    • category_name, category_kind → Category information
-    • month → Month for summary
-    • USE THIS VIEW FOR: "how am I doing vs budget", "budget performance"
-
-    llm_budget_overview - Budget planning:
-    • budgeted_amount → Planned amount
-    • actual_expenses, actual_income → Actual amounts
-    • category_name, category_kind → Category information
-    • month → Month for budget
-    • USE THIS VIEW FOR: "what's my budget", "am I over budget"
-
-    IMPORTANT COLUMN NOTES:
-    1. 'amount' column: Negative values = expenses, Positive values = income
-    2. 'absolute_amount' column: Always positive (use when you need positive values only)
-    3. 'created_at' in llm_transaction_summary = actual transaction date
-    4. 'month' in other views = summary month
-
-    QUERY FILTERING EXAMPLES:
-    - Current month expenses: WHERE amount < 0 AND DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-    - All expenses: WHERE amount < 0
-    - Specific month: WHERE EXTRACT(MONTH FROM created_at) = 3 AND EXTRACT(YEAR FROM created_at) = 2024
-    - By category: WHERE category_name = 'Food & Dining'
-
-    CRITICAL RESPONSE RULES:
-    1. NEVER mention table names, column names, or SQL in final responses
-    2. NEVER make assumptions if data is not found - just say what the data shows
-    3. NEVER generate fake data - only use what's in the query results
-    4. Keep responses concise and direct - no explanations unless necessary
-    5. If no data found, simply say "No [requested information] found in your records"
-
-    BUSINESS SPECIFIC COLUMNS:
-    - business_name (in llm_user_profile) → company affiliation
-    - role_name → user type (business_admin, business_subuser, personal_user)
-    - admin_email → for finding hierarchical relationships
-    """
-            return schema_info
-            
-        finally:
-            db.close()
+        with trace_stage("load_schema"):
+            return self.schema_catalogue.get()
     
     def process_natural_language_query(self, user_query: str, user_id: int) -> Tuple[str, str]:
         """Process natural language query with two-stage approach"""
-        
+        result = self.process_view_query(user_query, user_id)
+        return result["answer"], result["sql"]
+    
+    def process_view_query(self, user_query: str, user_id: int, structured: bool = False) -> Dict[str, Any]:
+        """
+        Answer a VIEW question: {"answer", "sql"} plus "table" (columns and
+        rows for the frontend) when structured is set and the query ran
+        """
         # check if user has LLM access based on role
-        access_check = self._check_user_llm_access(user_id)
+        with trace_stage("access_check"):
+            access_check = self._check_user_llm_access(user_id)
         if not access_check["has_access"]:
-            return access_check["message"], "ACCESS_DENIED"
-        
-        #1. Generate SQL to get comprehensive data from views
-        schema_info = self._get_schema_info()
-        enhanced_query = self.enhancer.enhance_query(user_query, schema_info)
-        
-        sql_query = self._generate_sql_query(enhanced_query, schema_info, user_id)
-        sql_query = self._clean_sql_response(sql_query)
-
+            return {"answer": access_check["message"], "sql": "ACCESS_DENIED"}
         
-        #print what we're about to execute
-        print(f"DEBUG: Generated SQL: {sql_query}")
+        #1. Get SQL for the question (cached template or LLM generated)
+        sql_query, sql_params, enhanced_query = self._prepare_sql_query(user_query, user_id)
         
         try:
-            raw_data = self.execute_query(sql_query)
-            
-            #show resulets
-            print(f"DEBUG: Raw data columns: {raw_data.get('columns', [])}")
-            print(f"DEBUG: Raw data row count: {raw_data.get('rowcount', 0)}")
-            if raw_data.get('data'):
-                print(f"DEBUG: First few rows: {raw_data['data'][:3]}")
+            raw_data = self._run_sql_query(user_query, sql_query, sql_params, user_id)
             
             # 2. Extract specific answer and generate natural response
             final_answer = self._extract_and_format_answer(
-                user_query, enhanced_query, raw_data, sql_query
+                user_query, enhanced_query, raw_data, sql_query, structured
             )
             
             # Store extracted values for future context
             self._store_extracted_values(final_answer, raw_data)
             
-            return final_answer, sql_query
+            return self._view_result(final_answer, sql_query, raw_data, structured)
             
         except Exception as e:
             logger.error(f"Query processing failed: {e}")
             error_message = f"I encountered an error while processing your query: {str(e)}"
-            return error_message, sql_query if sql_query else "SQL generation failed"
+            return {"answer": error_message, "sql": sql_query if sql_query else "SQL generation failed"}
     
-    def _check_user_llm_access(self, user_id: int) -> Dict[str, Any]:
-        """Check if user has permission to use LLM based on role"""
-        db = SessionLocal()
+    async def aprocess_natural_language_query(self, user_query: str, user_id: int, enhanced_query: Optional[str] = None) -> Tuple[str, str]:
+        """Async variant of process_natural_language_query"""
+        result = await self.aprocess_view_query(user_query, user_id, enhanced_query)
+        return result["answer"], result["sql"]
+    
+    async def aprocess_view_query(self, user_query: str, user_id: int, enhanced_query: Optional[str] = None,
+                                  structured: bool = False) -> Dict[str, Any]:
+        """
+        Async variant of process_view_query.
+        
+        LLM calls are awaited on the Ollama client's async API; the short
+        database calls run on the agents' blocking executor. An enhanced_query
+        that was computed ahead of time (speculatively) skips the enhancer.
+        """
+        with trace_stage("access_check"):
+            access_check = await run_blocking(self._check_user_llm_access, user_id)
+        if not access_check["has_access"]:
+            return {"answer": access_check["message"], "sql": "ACCESS_DENIED"}
+        
+        sql_query, sql_params, enhanced_query = await self._aprepare_sql_query(user_query, user_id, enhanced_query)
+        
         try:
-            # Check user role and LLM access
-            role_check = db.execute(text("""
-                SELECT r.role_name, r.permission_level 
-                FROM users u 
-                JOIN roles r ON u.role_id = r.id 
-                WHERE u.id = :user_id
-            """), {"user_id": user_id})
-            
-            user_role = role_check.fetchone()
+            raw_data = await run_blocking(self._run_sql_query, user_query, sql_query, sql_params, user_id)
             
-            if not user_role:
-                return {"has_access": False, "message": "User not found."}
-            
-            role_name, permission_level = user_role
+            final_answer = await self._aextract_and_format_answer(
+                user_query, enhanced_query, raw_data, sql_query, structured
+            )
             
-            # Business subusers don't get LLM access
-            if role_name == "business_subuser":
-                return {
-                    "has_access": False, 
-                    "message": "LLM access is not available for sub-users. Please contact your business administrator."
-                }
+            self._store_extracted_values(final_answer, raw_data)
             
-            # All other roles have access
-            return {"has_access": True, "message": "Access granted"}
+            return self._view_result(final_answer, sql_query, raw_data, structured)
             
+        except Exception as e:
+            logger.error(f"Query processing failed: {e}")
+            error_message = f"I encountered an error while processing your query: {str(e)}"
+            return {"answer": error_message, "sql": sql_query if sql_query else "SQL generation failed"}
+    
+    def _view_result(self, answer: str, sql_query: str, raw_data: Dict[str, Any], structured: bool) -> Dict[str, Any]:
+        result = {"answer": answer, "sql": sql_query}
+        if structured:
+            result["table"] = self.renderer.structure(raw_data)
+        return result
+    
+    def stream_natural_language_query(self, user_query: str, user_id: int, structured: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Same pipeline as process_natural_language_query, yielding stage events
+        and then the answer tokens as the LLM generates them.
+        
+        The last event is always "answer" with the final (cleaned) answer and
+        SQL, plus the table when structured is set and the query ran.
+        """
+        with trace_stage("access_check"):
+            access_check = self._check_user_llm_access(user_id)
+        if not access_check["has_access"]:
+            yield {"event": "answer", "data": {"answer": access_check["message"], "sql": "ACCESS_DENIED"}}
+            return
+        
+        sql_query, sql_params, enhanced_query = self._prepare_sql_query(user_query, user_id)
+        yield {"event": "sql", "data": {"sql": sql_query}}
+        
+        try:
+            raw_data = self._run_sql_query(user_query, sql_query, sql_params, user_id)
+        except Exception as e:
+            logger.error(f"Query processing failed: {e}")
+            yield {"event": "answer", "data": {
+                "answer": f"I encountered an error while processing your query: {str(e)}",
+                "sql": sql_query if sql_query else "SQL generation failed"
+            }}
+            return
+        
+        yield {"event": "rows", "data": {"columns": raw_data["columns"], "rowcount": raw_data["rowcount"]}}
+        
+        rendered = self._render_answer(raw_data, user_query, structured)
+        if rendered is not None:
+            yield {"event": "token", "data": {"text": rendered}}
+            self._store_extracted_values(rendered, raw_data)
+            yield {"event": "answer", "data": self._view_result(rendered, sql_query, raw_data, structured)}
+            return
+        
+        prompt = self._build_extraction_prompt(user_query, raw_data)
+        chunks = []
+        started = time.perf_counter()
+        try:
+            for chunk in self.llm.stream(prompt):
+                chunks.append(chunk)
+                yield {"event": "token", "data": {"text": chunk}}
+            final_answer = self._clean_template_artifacts("".join(chunks).strip())
+        except Exception as e:
+            logger.error(f"Streaming extraction failed: {e}")
+            final_answer = self._create_direct_response(raw_data, user_query)
+        # The stage spans yields, so it is timed here rather than with trace_stage
+        record_stage("extract_answer", time.perf_counter() - started, llm_calls=1,
+                     prompt_chars=len(prompt), response_chars=len("".join(chunks)))
+        
+        self._store_extracted_values(final_answer, raw_data)
+        yield {"event": "answer", "data": self._view_result(final_answer, sql_query, raw_data, structured)}
+    
+    def _prepare_sql_query(self, user_query: str, user_id: int, pipeline_mode: Optional[str] = None,
+                           use_cache: bool = True) -> Tuple[str, Optional[Dict[str, Any]], str]:
+        """Get the SQL for a question: (sql, bind params or None, enhanced query)"""
+        # Make sure the catalogue (and therefore the template cache) is current
+        schema_info = self._get_schema_info()
+        
+        # Reuse a validated SQL template for a question we have seen before
+        cached = self.sql_cache.lookup(user_query, user_id) if use_cache else None
+        if cached:
+            sql_query, sql_params = cached
+            logger.info(f"SQL template cache hit for '{user_query}'")
+            return sql_query, sql_params, user_query
+        
+        if (pipeline_mode or self.pipeline_mode) == "single_call":
+            # Category mapping and SQL generation in one prompt
+            enhanced_query = user_query
+            sql_query = self._generate_sql_query(user_query, schema_info, user_id, map_categories=True)
+        else:
+            # Generate SQL to get comprehensive data from views
+            enhanced_query = self.enhancer.enhance_query(user_query, schema_info)
+            sql_query = self._generate_sql_query(enhanced_query, schema_info, user_id)
+        
+        sql_query = self._clean_sql_response(sql_query)
+        
+        return sql_query, None, enhanced_query
+    
+    async def aenhance_query(self, user_query: str) -> str:
+        """Run the prompt enhancer on its own (used to speculate before the intent is known)"""
+        schema_info = await run_blocking(self._get_schema_info)
+        return await self.enhancer.aenhance_query(user_query, schema_info)
+    
+    async def _aprepare_sql_query(self, user_query: str, user_id: int, enhanced_query: Optional[str] = None) -> Tuple[str, Optional[Dict[str, Any]], str]:
+        """Async variant of _prepare_sql_query"""
+        schema_info = await run_blocking(self._get_schema_info)
+        
+        cached = self.sql_cache.lookup(user_query, user_id)
+        if cached:
+            sql_query, sql_params = cached
+            logger.info(f"SQL template cache hit for '{user_query}'")
+            return sql_query, sql_params, user_query
+        
+        if enhanced_query is None and self.pipeline_mode == "single_call":
+            enhanced_query = user_query
+            sql_query = await self._agenerate_sql_query(user_query, schema_info, user_id, map_categories=True)
+        else:
+            if enhanced_query is None:
+                enhanced_query = await self.enhancer.aenhance_query(user_query, schema_info)
+            sql_query = await self._agenerate_sql_query(enhanced_query, schema_info, user_id)
+        
+        sql_query = self._clean_sql_response(sql_query)
+        
+        return sql_query, None, enhanced_query
+    
+    def compare_pipeline_modes(self, user_query: str, user_id: int) -> Dict[str, Any]:
+        """
+        Evaluation switch: run a question through both SQL pipeline modes.
+        
+        The template cache is bypassed so both modes really hit the LLM.
+        Returns per-mode SQL, generation latency and row count, plus whether
+        both modes returned the same rows.
+        """
+        report = {"question": user_query, "modes": {}}
+        rows_by_mode = {}
+        
+        for mode in PIPELINE_MODES:
+            started = time.perf_counter()
+            entry = {"sql": None, "generation_seconds": None, "rowcount": None, "error": None}
+            try:
+                sql_query, _, _ = self._prepare_sql_query(user_query, user_id, pipeline_mode=mode, use_cache=False)
+                entry["sql"] = sql_query
+                entry["generation_seconds"] = round(time.perf_counter() - started, 3)
+                raw_data = self.execute_guarded_query(sql_query)
+                entry["rowcount"] = raw_data["rowcount"]
+                rows_by_mode[mode] = [tuple(row) for row in raw_data["data"]]
+            except Exception as e:
+                entry["error"] = str(e)
+            report["modes"][mode] = entry
+        
+        report["same_result"] = len(rows_by_mode) == len(PIPELINE_MODES) and \
+            rows_by_mode["two_call"] == rows_by_mode["single_call"]
+        return report
+    
+    def _run_sql_query(self, user_query: str, sql_query: str, sql_params: Optional[Dict[str, Any]], user_id: int) -> Dict[str, Any]:
+        """Execute the question's SQL, caching newly generated statements that succeed"""
+        with trace_stage("execute_query") as stage:
+            if self.result_summaries:
+                raw_data = self.execute_summarized_query(sql_query, sql_params)
+            elif self.guard_enabled:
+                raw_data = self.execute_guarded_query(sql_query, sql_params)
+            elif sql_params is not None:
+                raw_data = self.execute_query_with_params(sql_query, sql_params)
+            else:
+                raw_data = self.execute_query(sql_query)
+            if sql_params is None:
+                self.sql_cache.store(user_query, sql_query, user_id)
+            if stage is not None:
+                stage["rowcount"] = raw_data.get("rowcount", 0)
+                stage["rows_fetched"] = len(raw_data.get("data", []))
+        
+        return raw_data
+    
+    def _check_user_llm_access(self, user_id: int) -> Dict[str, Any]:
+        """Check if user has permission to use LLM based on role (role names are cached per user)"""
+        try:
+            role_name = role_cache.get_or_load(user_id, lambda: self._load_role_name(user_id))
+            return llm_access_for_role(role_name)
         except Exception as e:
             logger.error(f"Role check failed: {e}")
             return {"has_access": False, "message": "Error checking user permissions."}
-        finally:
-            db.close()
     
-    def _generate_sql_query(self, enhanced_query: str, schema_info: str, user_id: int) -> str:
+    def _load_role_name(self, user_id: int) -> Optional[str]:
+        with agent_session() as db:
+            user_role = db.execute(text("""
+                SELECT r.role_name
+                FROM users u 
+                JOIN roles r ON u.role_id = r.id 
+                WHERE u.id = :user_id
+            """), {"user_id": user_id}).fetchone()
+        return user_role[0] if user_role else None
+    
+    def _generate_sql_query(self, enhanced_query: str, schema_info: str, user_id: int, map_categories: bool = False) -> str:
         """Generate SQL with strict rules to prevent over-explaining"""
         
-        prompt = f"""
+        prompt = self._build_sql_prompt(enhanced_query, schema_info, user_id, map_categories)
+        
+        with trace_stage("generate_sql"):
+            sql_query = self.llm.invoke(prompt).strip()
+        
+        # Log the generated SQL for debugging
+        logger.info(f"Generated SQL query for '{enhanced_query}': {sql_query}")
+        
+        return sql_query
+    
+    async def _agenerate_sql_query(self, enhanced_query: str, schema_info: str, user_id: int, map_categories: bool = False) -> str:
+        """Async variant of _generate_sql_query"""
+        prompt = self._build_sql_prompt(enhanced_query, schema_info, user_id, map_categories)
+        
+        with trace_stage("generate_sql"):
+            sql_query = (await self.llm.ainvoke(prompt)).strip()
+        
+        logger.info(f"Generated SQL query for '{enhanced_query}': {sql_query}")
+        
+        return sql_query
+    
+    def _build_sql_prompt(self, enhanced_query: str, schema_info: str, user_id: int, map_categories: bool = False) -> str:
+        """
+        Build the SQL generation prompt with strict rules to prevent over-explaining.
+        
+        With map_categories the prompt also carries the enhancer's category
+        mapping, so the raw user question can go straight to SQL.
+        """
+        category_rules = ""
+        if map_categories:
+            category_rules = f"""
+        {CATEGORY_MAPPING_INFO}
+        Map vague words in the question (e.g. "groceries") to the exact category names above
+        and filter on category_name / category_kind accordingly.
+        """
+        
+        return f"""
         You are a SQL query generator for PostgreSQL using LLM-optimized views.
         You only speak in SQL code without extra characters or explanations.
 
         Database Schema:
         {schema_info}
+        {category_rules}
 
         USER CONTEXT:
         - Current User ID: {user_id}
@@ -255,12 +419,14 @@ class QueryRunner:
         5. For expenses: WHERE amount < 0
         6. For income: WHERE amount > 0
         7. For "this month": WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-        8. Return ONLY the SQL query, no explanations
+        8. For totals per category or per month → USE llm_monthly_category_totals (already summed, filter on month)
+        9. Return ONLY the SQL query, no explanations
 
         SPECIFIC QUERY PATTERNS FOR YOUR SCHEMA:
         - "how much did I spend" → SELECT SUM(amount) as total_spent FROM llm_transaction_summary WHERE user_id = {user_id} AND amount < 0
         - "how much did I spend this month" → SELECT SUM(amount) as total_spent FROM llm_transaction_summary WHERE user_id = {user_id} AND amount < 0 AND DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
         - "show my expenses" → SELECT amount, category_name, created_at FROM llm_transaction_summary WHERE user_id = {user_id} AND amount < 0 ORDER BY created_at DESC
+        - "spending by category this month" → SELECT category_name, absolute_amount FROM llm_monthly_category_totals WHERE user_id = {user_id} AND category_kind = 'expense' AND month = DATE_TRUNC('month', CURRENT_DATE)::date ORDER BY absolute_amount DESC
         - "what is my income" → SELECT SUM(amount) as total_income FROM llm_transaction_summary WHERE user_id = {user_id} AND amount > 0
         - "what business am I in" → SELECT business_name FROM llm_user_profile WHERE user_id = {user_id}
         - "who works under me" → SELECT display_name, role_name FROM llm_business_hierarchy WHERE admin_user_email = (SELECT email FROM users WHERE id = {user_id})
@@ -270,21 +436,58 @@ class QueryRunner:
         Generate a clean, efficient SQL query using llm_transaction_summary for spending questions.
         SQL Query:
         """
+
+    
+    def _render_answer(self, raw_data: Dict[str, Any], original_query: str, structured: bool = False) -> Optional[str]:
+        """Deterministic answer for the result shape, or None when the LLM is needed"""
+        if not self.deterministic_answers:
+            return None
+        with trace_stage("render_answer"):
+            return self.renderer.render(raw_data, original_query, structured)
+    
+    def _extract_and_format_answer(self, original_query: str, enhanced_query: str, raw_data: Dict[str, Any], sql_query: str,
+                                   structured: bool = False) -> str:
+        """Extract answer with strict rules to prevent template hallucinations"""
+        rendered = self._render_answer(raw_data, original_query, structured)
+        if rendered is not None:
+            return rendered
         
-        sql_query = self.llm.invoke(prompt).strip()
+        prompt = self._build_extraction_prompt(original_query, raw_data)
         
-        # Log the generated SQL for debugging
-        logger.info(f"Generated SQL query for '{enhanced_query}': {sql_query}")
-        print(f"DEBUG: Generated SQL: {sql_query}")
+        try:
+            with trace_stage("extract_answer"):
+                response = self.llm.invoke(prompt).strip()
+            
+            # fix any template remnants that slipped through
+            response = self._clean_template_artifacts(response)
+            
+            return response
+        except Exception as e:
+            logger.error(f"Extraction failed: {e}")
+            return self._create_direct_response(raw_data, original_query)
+    
+    async def _aextract_and_format_answer(self, original_query: str, enhanced_query: str, raw_data: Dict[str, Any], sql_query: str,
+                                          structured: bool = False) -> str:
+        """Async variant of _extract_and_format_answer"""
+        rendered = self._render_answer(raw_data, original_query, structured)
+        if rendered is not None:
+            return rendered
         
-        return sql_query
-
+        prompt = self._build_extraction_prompt(original_query, raw_data)
+        
+        try:
+            with trace_stage("extract_answer"):
+                response = (await self.llm.ainvoke(prompt)).strip()
+            return self._clean_template_artifacts(response)
+        except Exception as e:
+            logger.error(f"Extraction failed: {e}")
+            return self._create_direct_response(raw_data, original_query)
     
-    def _extract_and_format_answer(self, original_query: str, enhanced_query: str, raw_data: Dict[str, Any], sql_query: str) -> str:
-        """Extract answer with strict rules to prevent template hallucinations"""
+    def _build_extraction_prompt(self, original_query: str, raw_data: Dict[str, Any]) -> str:
+        """Build the answer extraction prompt for the retrieved data"""
         data_summary = self._format_data_for_extraction(raw_data)
         
-        prompt = f"""
+        return f"""
         ORIGINAL USER QUESTION: "{original_query}"
         
         EXACT DATA RETRIEVED FROM DATABASE:
@@ -313,17 +516,6 @@ class QueryRunner:
 
         FINAL RESPONSE (be direct and use exact values):
         """
-        
-        try:
-            response = self.llm.invoke(prompt).strip()
-            
-            # fix any template remnants that slipped through
-            response = self._clean_template_artifacts(response)
-            
-            return response
-        except Exception as e:
-            logger.error(f"Extraction failed: {e}")
-            return self._create_direct_response(raw_data, original_query)
     
     def _clean_template_artifacts(self, response: str) -> str:
         """Clean up any template artifacts that the LLM might have left"""
@@ -355,11 +547,17 @@ class QueryRunner:
         money_columns = [i for i, col in enumerate(columns) 
                         if any(keyword in col.lower() for keyword in ['amount', 'total', 'sum', 'planned', 'actual'])]
         
+        numeric_summary = raw_data.get("summary", {}).get("numeric", {})
+        
         if money_columns:
             col_idx = money_columns[0]
             values = [row[col_idx] for row in data if row[col_idx] is not None]
             if values:
-                total = sum(float(val) for val in values)
+                # data may only be a preview; prefer the database's total
+                if columns[col_idx] in numeric_summary:
+                    total = numeric_summary[columns[col_idx]]["sum"]
+                else:
+                    total = sum(float(val) for val in values)
                 formatted_total = f"${total:,.2f}" if abs(total) >= 1000 else f"${total:.2f}"
                 
                 query_lower = original_query.lower()
@@ -394,13 +592,15 @@ class QueryRunner:
                     return f"Amount: ${value:,.2f}" if abs(value) >= 1000 else f"Amount: ${value:.2f}"
                 return f"Result: {value}"
         
-        return f"Found {len(data)} records matching your query."
+        return f"Found {raw_data.get('rowcount', len(data))} records matching your query."
 
     
     def _format_data_for_extraction(self, raw_data: Dict[str, Any]) -> str:
         """Format raw data for LLM consumption"""
         columns = raw_data["columns"]
         data = raw_data["data"]
+        # data may be a preview; rowcount is the full result size
+        rowcount = raw_data.get("rowcount", len(data))
         
         summary = f"Columns: {', '.join(columns)}\n\nData:\n"
         
@@ -408,8 +608,19 @@ class QueryRunner:
             row_text = " | ".join([str(val) if val is not None else "NULL" for val in row])
             summary += f"Row {i+1}: {row_text}\n"
         
-        if len(data) > 15:
-            summary += f"\n... and {len(data) - 15} more rows"
+        if rowcount > 15:
+            summary += f"\n... and {rowcount - 15} more rows"
+        
+        if "summary" in raw_data:
+            # Computed by the database over every row, not just the preview
+            numeric_summary = raw_data["summary"]["numeric"]
+            if numeric_summary:
+                summary += "\n\nKey Numeric Values Found:"
+                for col in columns:
+                    if col in numeric_summary:
+                        stats = numeric_summary[col]
+                        summary += f"\n- {col}: {stats['count']} values, sum: {stats['sum']:.2f}, avg: {stats['avg']:.2f}"
+            return summary
         
         if data and len(columns) > 0:
             numeric_cols = [i for i, col in enumerate(columns) 
@@ -483,9 +694,11 @@ class QueryRunner:
         """Store extracted numeric values for future context"""
         import re
         
+        extracted = {}
+        
         numbers = re.findall(r'\$?(\d+\.?\d*)', response)
         if numbers:
-            self.conversation_context['last_extracted_values'] = numbers
+            extracted['last_extracted_values'] = numbers
         
         # Store key data points
         if raw_data.get("data"):
@@ -496,7 +709,10 @@ class QueryRunner:
             for i, col in enumerate(columns):
                 if any(keyword in col.lower() for keyword in ['total', 'amount', 'sum', 'count']):
                     if first_row[i] is not None:
-                        self.conversation_context[f'last_{col}'] = first_row[i]
+                        extracted[f'last_{col}'] = first_row[i]
+        
+        with self._context_lock:
+            self.conversation_context.update(extracted)
     
     def _fallback_formatting(self, raw_data: Dict[str, Any], original_query: str) -> str:
         """Fallback formatting if LLM extraction fails"""
@@ -516,10 +732,14 @@ class QueryRunner:
         elif "amount" in columns or "absolute_amount" in columns:
             amount_col = "absolute_amount" if "absolute_amount" in columns else "amount"
             amount_idx = columns.index(amount_col)
-            total = sum(row[amount_idx] for row in data if row[amount_idx] is not None)
+            numeric_summary = raw_data.get("summary", {}).get("numeric", {})
+            if amount_col in numeric_summary:
+                total = numeric_summary[amount_col]["sum"]
+            else:
+                total = sum(row[amount_idx] for row in data if row[amount_idx] is not None)
             return f"The total amount is ${total:,.2f}."
         
-        return f"I found {len(data)} records matching your query. The most relevant information has been retrieved."
+        return f"I found {raw_data.get('rowcount', len(data))} records matching your query. The most relevant information has been retrieved."
     
     def _clean_sql_response(self, sql_response: str) -> str:
         """Clean up SQL response from LLM to extract only the SQL query"""
@@ -569,35 +789,95 @@ class QueryRunner:
         
         return sql_response
     
-    def execute_query_with_params(self, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute SQL query with parameters to prevent SQL injection"""
-        db = SessionLocal()
-        try:
-            result = db.execute(text(query), params)
-            
-            # COMMIT for non-SELECT queries
-            if not query.strip().upper().startswith('SELECT'):
-                db.commit()
+    def execute_guarded_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute an LLM-generated read query under the SQL guard: statement
+        timeout, EXPLAIN cost/row check, automatic LIMIT and a fetch cap
+        """
+        if not query.strip().upper().startswith(('SELECT', 'WITH')):
+            raise ValueError("Only SELECT queries can be used to answer questions")
+        
+        guarded_query = self.sql_guard.apply_row_cap(query)
+        with agent_session() as db:
+            try:
+                self.sql_guard.prepare_session(db)
+                self.sql_guard.check_plan(db, guarded_query, params)
             
-            if query.strip().upper().startswith('SELECT'):
+                result = db.execute(text(guarded_query), params or {})
                 columns = list(result.keys())
-                data = result.fetchall()
+                data = result.fetchmany(self.sql_guard.row_cap + 1)
+                # A full page under the guard's own LIMIT means rows were probably left out
+                limit_added = guarded_query != query.strip().rstrip(';').strip()
+                truncated = len(data) > self.sql_guard.row_cap or (limit_added and len(data) == self.sql_guard.row_cap)
+                if truncated:
+                    data = data[:self.sql_guard.row_cap]
+                    logger.warning(f"Query result truncated to {self.sql_guard.row_cap} rows")
+            
                 return {
                     "columns": columns,
                     "data": data,
-                    "rowcount": len(data)
-                }
-            else:
-                affected_rows = getattr(result, "rowcount", 0)
-                return {
-                    "columns": [],
-                    "data": [],
-                    "rowcount": affected_rows,
-                    "message": f"Query executed successfully. {affected_rows} rows affected."
+                    "rowcount": len(data),
+                    "truncated": truncated
                 }
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Parameterized query execution failed: {e}")
-            raise
-        finally:
-            db.close()
\ No newline at end of file
+            except Exception as e:
+                logger.error(f"Guarded query execution failed: {e}")
+                raise
+            finally:
+                # Read-only: rollback also clears the SET LOCAL timeout
+                db.rollback()
+    
+    def execute_summarized_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute a read query streaming its rows: only the first SQL_PREVIEW_ROWS
+        are kept, and the row count plus count/sum/avg of each numeric column
+        come back from the database in the same round-trip (see result_summary).
+        The database still reads the full result to summarize it.
+        """
+        if not query.strip().upper().startswith(('SELECT', 'WITH')):
+            raise ValueError("Only SELECT queries can be used to answer questions")
+        
+        with agent_session() as db:
+            try:
+                if self.guard_enabled:
+                    # No row cap: the preview bounds only what is fetched. On PostgreSQL the
+                    # whole result is still materialized and summarized inside the database,
+                    # so statement_timeout (and the plan check) are what bound that work
+                    self.sql_guard.prepare_session(db)
+                    self.sql_guard.check_plan(db, query.strip().rstrip(';'), params)
+                return fetch_preview_with_summary(db, query, params, self.preview_rows)
+            except Exception as e:
+                logger.error(f"Summarized query execution failed: {e}")
+                raise
+            finally:
+                db.rollback()
+    
+    def execute_query_with_params(self, query: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute SQL query with parameters to prevent SQL injection"""
+        with agent_session() as db:
+            try:
+                result = db.execute(text(query), params)
+            
+                # COMMIT for non-SELECT queries
+                if not query.strip().upper().startswith('SELECT'):
+                    db.commit()
+            
+                if query.strip().upper().startswith('SELECT'):
+                    columns = list(result.keys())
+                    data = result.fetchall()
+                    return {
+                        "columns": columns,
+                        "data": data,
+                        "rowcount": len(data)
+                    }
+                else:
+                    affected_rows = getattr(result, "rowcount", 0)
+                    return {
+                        "columns": [],
+                        "data": [],
+                        "rowcount": affected_rows,
+                        "message": f"Query executed successfully. {affected_rows} rows affected."
+                    }
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Parameterized query execution failed: {e}")
+                raise
\ No newline at end of file
@@ -0,0 +1,90 @@
+'''
+result_summary.py
+'''
+import logging
+from decimal import Decimal
+from typing import Dict, Any, Optional
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL: preview rows plus row count and count/sum/avg of every numeric
+# column, computed by the database in the same statement. to_jsonb(q) lets
+# the numeric columns be found without knowing the query's select list.
+# Scanning the materialized CTE need not keep the query's ORDER BY, so each
+# row is numbered in the query's order and the preview is sorted by it.
+POSTGRES_SUMMARY_QUERY = """
+WITH q AS MATERIALIZED (
+    SELECT ordered.*, ROW_NUMBER() OVER () AS __summary_row_number FROM ({query}) AS ordered
+),
+numeric_stats AS (
+    SELECT jsonb_object_agg(key, jsonb_build_object('count', value_count, 'sum', value_sum, 'avg', value_avg)) AS stats
+    FROM (
+        SELECT e.key, COUNT(*) AS value_count, SUM(e.value::text::numeric) AS value_sum,
+               ROUND(AVG(e.value::text::numeric), 4) AS value_avg
+        FROM q CROSS JOIN LATERAL jsonb_each(to_jsonb(q)) AS e
+        WHERE jsonb_typeof(e.value) = 'number' AND e.key <> '__summary_row_number'
+        GROUP BY e.key
+    ) per_column
+)
+SELECT q.*, (SELECT COUNT(*) FROM q) AS __summary_row_count, (SELECT stats FROM numeric_stats) AS __summary_numeric
+FROM q
+ORDER BY q.__summary_row_number
+LIMIT {preview_rows}
+"""
+
+# Appended after the query's columns: row number, row count, numeric stats
+SUMMARY_COLUMNS = 3
+
+
+def fetch_preview_with_summary(db, query: str, params: Optional[Dict[str, Any]], preview_rows: int) -> Dict[str, Any]:
+    """
+    Run a read query keeping only the first preview_rows rows in memory.
+
+    Returns the usual result dict ("columns", "data" = preview rows,
+    "rowcount" = total rows) plus "summary": {"row_count", "numeric":
+    {column: {"count", "sum", "avg"}}} and "truncated".
+    """
+    query = query.strip().rstrip(';').strip()
+
+    if db.get_bind().dialect.name == "postgresql":
+        # replace() rather than format(): generated SQL can contain braces
+        summary_query = POSTGRES_SUMMARY_QUERY.replace("{preview_rows}", str(int(preview_rows))).replace("{query}", query)
+        result = db.execute(text(summary_query), params or {}, execution_options={"stream_results": True})
+        columns = list(result.keys())[:-SUMMARY_COLUMNS]
+        rows = result.fetchall()
+
+        data = [tuple(row)[:-SUMMARY_COLUMNS] for row in rows]
+        row_count = rows[0][-2] if rows else 0
+        numeric = rows[0][-1] if rows and rows[0][-1] else {}
+        numeric = {col: numeric[col] for col in columns if col in numeric}
+    else:
+        # No server-side aggregation helper: stream the rows and aggregate incrementally
+        result = db.execute(text(query), params or {}, execution_options={"stream_results": True})
+        columns = list(result.keys())
+        data, row_count, numeric = [], 0, {}
+        for partition in result.partitions(500):
+            for row in partition:
+                row_count += 1
+                if len(data) < preview_rows:
+                    data.append(tuple(row))
+                for col, value in zip(columns, row):
+                    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                        stats = numeric.setdefault(col, {"count": 0, "sum": 0})
+                        stats["count"] += 1
+                        stats["sum"] += value
+        for stats in numeric.values():
+            stats["avg"] = round(float(stats["sum"]) / stats["count"], 4)
+
+    for stats in numeric.values():
+        stats["sum"] = float(stats["sum"])
+        stats["avg"] = float(stats["avg"])
+
+    logger.debug(f"Fetched {len(data)} preview rows of {row_count}")
+    return {
+        "columns": columns,
+        "data": data,
+        "rowcount": row_count,
+        "truncated": row_count > len(data),
+        "summary": {"row_count": row_count, "numeric": numeric}
+    }
@@ -0,0 +1,180 @@
+'''
+schema_catalogue.py
+'''
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+from sqlalchemy import text
+from backend.database.connection import agent_session
+
+logger = logging.getLogger(__name__)
+
+VIEW_COLUMNS_QUERY = """
+SELECT table_name, column_name, data_type, is_nullable
+FROM information_schema.columns 
+WHERE table_schema = 'public' AND table_name LIKE 'llm_%'
+ORDER BY table_name, ordinal_position;
+"""
+
+VIEW_USAGE_NOTES = """
+    VIEW PURPOSES AND EXACT USAGE:
+
+    llm_user_profile - User personal and business information:
+    • business_name → Use for: "what company do I work for", "am I in a business", "my business name"
+    • role_name → Use for: "what is my role", "am I an admin"
+    • display_name → Use for: "what is my name", "who am I"
+
+    llm_business_hierarchy - Business user relationships:
+    • admin_display_name, admin_user_email → Use for: "who is my admin", "who do I report to"
+    • display_name, email → Use for: "who works under me", "my team members"
+
+    CRITICAL FINANCIAL VIEWS - MUST USE THESE:
+
+    llm_transaction_summary - MOST IMPORTANT FOR SPENDING QUESTIONS:
+    • amount → Use for spending calculations (negative = expense, positive = income)
+    • absolute_amount → Always positive amount
+    • category_name → Category of transaction
+    • category_kind → 'expense' or 'income'
+    • created_at → Transaction date (use for filtering by month)
+    • month, year → Alternative date fields
+    • user_id → Filter by specific user
+    • transaction_id → Unique identifier
+    • USE THIS VIEW FOR: "how much did I spend", "what are my expenses", "show my transactions"
+
+    llm_financial_overview - Financial summary data:
+    • amount → Same as above
+    • absolute_amount → Always positive amount
+    • budgeted_amount, actual_income, actual_expenses → For budget comparisons
+    • category_name, category_kind → Category information
+    • month → Month for summary
+    • USE THIS VIEW FOR: "how am I doing vs budget", "budget performance"
+
+    llm_budget_overview - Budget planning:
+    • budgeted_amount → Planned amount
+    • actual_expenses, actual_income → Actual amounts
+    • category_name, category_kind → Category information
+    • month → Month for budget
+    • USE THIS VIEW FOR: "what's my budget", "am I over budget"
+
+    llm_monthly_category_totals - Pre-aggregated totals, one row per user, month and category:
+    • amount → Sum of the month's transactions in the category (negative = expense)
+    • absolute_amount → Always positive total
+    • transaction_count → Number of transactions behind the total
+    • category_name, category_kind → Category information
+    • month → First day of the month (DATE)
+    • USE THIS VIEW FOR: "spending by category", "monthly totals", "which category did I spend most on"
+
+    IMPORTANT COLUMN NOTES:
+    1. 'amount' column: Negative values = expenses, Positive values = income
+    2. 'absolute_amount' column: Always positive (use when you need positive values only)
+    3. 'created_at' in llm_transaction_summary = actual transaction date
+    4. 'month' in other views = summary month
+
+    QUERY FILTERING EXAMPLES:
+    - Current month expenses: WHERE amount < 0 AND DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
+    - All expenses: WHERE amount < 0
+    - Specific month: WHERE EXTRACT(MONTH FROM created_at) = 3 AND EXTRACT(YEAR FROM created_at) = 2024
+    - By category: WHERE category_name = 'Food & Dining'
+
+    CRITICAL RESPONSE RULES:
+    1. NEVER mention table names, column names, or SQL in final responses
+    2. NEVER make assumptions if data is not found - just say what the data shows
+    3. NEVER generate fake data - only use what's in the query results
+    4. Keep responses concise and direct - no explanations unless necessary
+    5. If no data found, simply say "No [requested information] found in your records"
+
+    BUSINESS SPECIFIC COLUMNS:
+    - business_name (in llm_user_profile) → company affiliation
+    - role_name → user type (business_admin, business_subuser, personal_user)
+    - admin_email → for finding hierarchical relationships
+    """
+
+
+class SchemaCatalogue:
+    """
+    In-memory catalogue of the llm_* views used in SQL generation prompts.
+
+    The prompt text is built once and reused byte-for-byte until the view
+    columns change. The columns are re-read at most every
+    check_interval_seconds; the text (and version) only changes when their
+    fingerprint does, or when refresh() is called explicitly.
+
+    Columns come from information_schema unless column_source is set: a
+    callable returning (view, column, data_type, is_nullable) rows, used by
+    databases without information_schema (e.g. the benchmark's SQLite file).
+    """
+
+    def __init__(self, check_interval_seconds: int = 300, column_source: Optional[Callable[[], list]] = None):
+        self.check_interval_seconds = check_interval_seconds
+        self.column_source = column_source
+        self.version = 0
+        self.fingerprint: Optional[str] = None
+        self._schema_info: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+
+    def get(self) -> str:
+        """Get the catalogue text, re-checking the fingerprint when it is stale"""
+        if self._schema_info is not None and time.monotonic() - self._checked_at < self.check_interval_seconds:
+            return self._schema_info
+
+        with self._lock:
+            if self._schema_info is None or time.monotonic() - self._checked_at >= self.check_interval_seconds:
+                self._load()
+            return self._schema_info
+
+    def refresh(self) -> int:
+        """Force the catalogue to be re-read; returns the current version"""
+        with self._lock:
+            self._load(force=True)
+            return self.version
+
+    def add_listener(self, callback: Callable[[int], None]):
+        """Register a callback that receives the new version whenever the catalogue changes"""
+        self._listeners.append(callback)
+
+    def _load(self, force: bool = False):
+        rows = self._fetch_view_columns()
+        fingerprint = hashlib.sha256(repr(rows).encode()).hexdigest()
+        self._checked_at = time.monotonic()
+
+        if not force and fingerprint == self.fingerprint:
+            return
+
+        self._schema_info = self._build_schema_info(rows)
+        self.fingerprint = fingerprint
+        self.version += 1
+        logger.info(f"Schema catalogue rebuilt (version {self.version}, {len(rows)} columns)")
+
+        for callback in self._listeners:
+            try:
+                callback(self.version)
+            except Exception as e:
+                logger.error(f"Schema catalogue listener failed: {e}")
+
+    def _fetch_view_columns(self) -> list:
+        if self.column_source is not None:
+            return [tuple(row) for row in self.column_source()]
+        with agent_session() as db:
+            return [tuple(row) for row in db.execute(text(VIEW_COLUMNS_QUERY)).fetchall()]
+
+    def _build_schema_info(self, rows: list) -> str:
+        '''Build the LLM-friendly description of the views'''
+        schema_info = "LLM-OPTIMIZED VIEWS (USE THESE INSTEAD OF BASE TABLES):\n\n"
+        
+        current_view = None
+        for table_name, column_name, data_type, is_nullable in rows:
+            if table_name != current_view:
+                if current_view:
+                    schema_info += "\n"
+                current_view = table_name
+                schema_info += f"VIEW: {table_name}\n"
+                schema_info += "Columns:\n"
+            
+            nullable = " (nullable)" if is_nullable == 'YES' else ""
+            schema_info += f"  - {column_name} ({data_type}){nullable}\n"
+        
+        return schema_info + VIEW_USAGE_NOTES
@@ -0,0 +1,80 @@
+'''
+sql_guard.py
+'''
+import json
+import logging
+import re
+from typing import Dict, Any, Optional
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_PATTERN = re.compile(r'\b(SUM|COUNT|AVG|MIN|MAX)\s*\(|\bGROUP\s+BY\b', re.IGNORECASE)
+LIMIT_PATTERN = re.compile(r'\bLIMIT\s+\d+\s*(OFFSET\s+\d+\s*)?$', re.IGNORECASE)
+
+
+class SQLGuardError(Exception):
+    """Raised when a generated query is rejected before it runs"""
+
+
+class SQLGuard:
+    """
+    Limits for executing LLM-generated SELECTs.
+
+    - statement timeout for every statement in the session's transaction
+    - EXPLAIN before running, rejecting plans whose estimated cost or row
+      count is over the limits
+    - automatic LIMIT on non-aggregate SELECTs, plus a fetch cap so
+      aggregates with many groups cannot balloon worker memory either
+
+    The timeout and EXPLAIN checks need PostgreSQL and are skipped on other
+    dialects (SQLite test and benchmark databases); the row cap always applies.
+    """
+
+    def __init__(self, statement_timeout_ms: int = 5000, max_plan_cost: float = 100000.0,
+                 max_plan_rows: int = 100000, row_cap: int = 500):
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_plan_cost = max_plan_cost
+        self.max_plan_rows = max_plan_rows
+        self.row_cap = row_cap
+
+    def apply_row_cap(self, query: str) -> str:
+        """Append LIMIT to a non-aggregate SELECT that has none"""
+        stripped = query.strip().rstrip(';').strip()
+        if not stripped.upper().startswith(('SELECT', 'WITH')):
+            return query
+        if AGGREGATE_PATTERN.search(stripped) or LIMIT_PATTERN.search(stripped):
+            return stripped
+        return f"{stripped} LIMIT {self.row_cap}"
+
+    def prepare_session(self, db):
+        """Set the statement timeout for the current transaction"""
+        if self._is_postgres(db) and self.statement_timeout_ms:
+            db.execute(text(f"SET LOCAL statement_timeout = {int(self.statement_timeout_ms)}"))
+
+    def check_plan(self, db, query: str, params: Optional[Dict[str, Any]] = None):
+        """EXPLAIN the query and raise SQLGuardError if the estimates are over the limits"""
+        if not self._is_postgres(db):
+            return
+
+        row = db.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params or {}).fetchone()
+        plan_json = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+        plan = plan_json[0]["Plan"]
+
+        total_cost = plan.get("Total Cost", 0)
+        plan_rows = plan.get("Plan Rows", 0)
+        logger.debug(f"Query plan estimate: cost={total_cost}, rows={plan_rows}")
+
+        if total_cost > self.max_plan_cost:
+            raise SQLGuardError(
+                f"Query rejected: estimated cost {total_cost:,.0f} exceeds the limit of {self.max_plan_cost:,.0f}. "
+                "Try narrowing the question (e.g. a date range or category)."
+            )
+        if plan_rows > self.max_plan_rows:
+            raise SQLGuardError(
+                f"Query rejected: it would scan about {plan_rows:,} rows (limit {self.max_plan_rows:,}). "
+                "Try narrowing the question (e.g. a date range or category)."
+            )
+
+    def _is_postgres(self, db) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
@@ -0,0 +1,157 @@
+'''
+sql_template_cache.py
+'''
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATE_SLOT_PATTERN = re.compile(r'\b\d{4}-\d{2}-\d{2}\b')
+NUMBER_SLOT_PATTERN = re.compile(r'\$?(\d+(?:\.\d+)?)')
+SQL_NUMBER_PATTERN = re.compile(r'(?<![\w.:\'])(\d+(?:\.\d+)?)(?![\w.\'])')
+
+
+class SQLTemplate:
+    """A validated SQL statement with the user id and question values turned into bind parameters"""
+
+    def __init__(self, sql: str, slot_types: List[str]):
+        self.sql = sql
+        self.slot_types = slot_types
+        self.created_at = time.monotonic()
+        self.hits = 0
+
+    def bind(self, user_id: int, slot_values: List[str]) -> Tuple[str, Dict[str, Any]]:
+        params = {"user_id": user_id}
+        for i, (slot_type, value) in enumerate(zip(self.slot_types, slot_values)):
+            params[f"slot_{i}"] = float(value) if slot_type == "number" else value
+        return self.sql, params
+
+
+class SQLTemplateCache:
+    """
+    LRU/TTL cache from normalized questions to parameterized SQL templates.
+
+    Questions are normalized by lowercasing, dropping punctuation and
+    replacing dates and numbers with slots, so "how much did I spend on
+    2024-03-01" and "... on 2024-04-01" share one template. A template is
+    only stored when every slot value and the user id can be located in
+    the generated SQL unambiguously; otherwise the question is simply not
+    cached.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, SQLTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, question: str) -> Tuple[str, List[str], List[str]]:
+        """Return the cache key plus the slot values and types extracted from the question"""
+        slot_values, slot_types = [], []
+
+        def take_date(match):
+            slot_values.append(match.group(0))
+            slot_types.append("date")
+            return " <date> "
+
+        def take_number(match):
+            slot_values.append(match.group(1))
+            slot_types.append("number")
+            return " <number> "
+
+        normalized = question.lower()
+        normalized = DATE_SLOT_PATTERN.sub(take_date, normalized)
+        normalized = NUMBER_SLOT_PATTERN.sub(take_number, normalized)
+        normalized = re.sub(r"[^\w<>\s]", " ", normalized)
+        normalized = " ".join(normalized.split())
+
+        return normalized, slot_values, slot_types
+
+    def lookup(self, question: str, user_id: int) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Get the bound SQL and parameters for a question, or None on a miss"""
+        key, slot_values, _ = self.normalize(question)
+
+        with self._lock:
+            template = self._entries.get(key)
+            if template and time.monotonic() - template.created_at > self.ttl_seconds:
+                del self._entries[key]
+                template = None
+
+            if template is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            template.hits += 1
+            self.hits += 1
+
+        return template.bind(user_id, slot_values)
+
+    def contains(self, question: str) -> bool:
+        """Check for a live template without touching the LRU order or hit/miss counters"""
+        key, _, _ = self.normalize(question)
+        with self._lock:
+            template = self._entries.get(key)
+            return template is not None and time.monotonic() - template.created_at <= self.ttl_seconds
+
+    def store(self, question: str, sql_query: str, user_id: int) -> bool:
+        """Parameterize a SQL statement that executed successfully and cache it"""
+        key, slot_values, slot_types = self.normalize(question)
+        template_sql = self._parameterize(sql_query, user_id, slot_values, slot_types)
+
+        if template_sql is None:
+            logger.debug(f"SQL for '{question}' could not be parameterized; not caching")
+            return False
+
+        with self._lock:
+            self._entries[key] = SQLTemplate(template_sql, slot_types)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        logger.info(f"Cached SQL template for '{key}'")
+        return True
+
+    def clear(self, *_):
+        """Drop every template (used when the schema catalogue changes)"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("SQL template cache cleared")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _parameterize(self, sql_query: str, user_id: int, slot_values: List[str], slot_types: List[str]) -> Optional[str]:
+        if not sql_query.strip().upper().startswith(('SELECT', 'WITH')):
+            return None
+
+        sql, user_refs = re.subn(rf'\buser_id\s*=\s*{user_id}\b', 'user_id = :user_id', sql_query)
+        if user_refs == 0:
+            return None
+
+        # Two slots with the same value cannot be told apart in the SQL
+        if len(set(slot_values)) != len(slot_values):
+            return None
+
+        for i, (slot_type, value) in enumerate(zip(slot_types, slot_values)):
+            if slot_type == "date":
+                sql = re.sub(re.escape(f"'{value}'"), f":slot_{i}", sql)
+            else:
+                sql = SQL_NUMBER_PATTERN.sub(
+                    lambda m: f":slot_{i}" if float(m.group(1)) == float(value) else m.group(0), sql
+                )
+            if not re.search(rf':slot_{i}\b', sql):
+                return None
+
+        # A leftover literal user id means the SQL targets this user in a way we cannot rebind
+        if any(float(m.group(1)) == float(user_id) for m in SQL_NUMBER_PATTERN.finditer(sql)):
+            return None
+
+        return sql
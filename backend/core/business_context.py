@@ -0,0 +1,120 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.ttl_cache import TTLCache
+from core.user_data_events import on_user_data_changed
+from models.user import User
+from models.profile import Profile
+from models.business import Business
+
+BUSINESS_ADMIN_ROLE_ID = 2
+
+# Tables whose rows feed the business dashboard
+BUSINESS_DATA_TABLES = ("transactions", "goals", "budgetentries", "monthly_category_rollups")
+
+
+class BusinessContextCache:
+    """
+    Business id -> {business_id, admin_user_id, business_name, member_ids},
+    loaded with one query and shared by every business endpoint, plus the
+    payloads those endpoints build from the admin's data (cached per
+    business, so every member is served from the same entry).
+
+    Contexts are dropped on registration and profile changes; payloads are
+    dropped when the admin's data changes. Both happen only in the process
+    that made the change: user_data_events listeners are in-process, so
+    other workers keep serving their entries until ttl_seconds
+    (BUSINESS_CONTEXT_TTL_SECONDS) expire. That TTL is the consistency
+    bound across workers.
+
+    A data change is matched to its business through the members seen in
+    this process's last load of each context. A process that never loaded
+    a business has no entries for it to drop.
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.contexts = TTLCache(ttl_seconds=ttl_seconds)
+        self.payloads = TTLCache(ttl_seconds=ttl_seconds)
+        self._business_by_user: Dict[int, int] = {}
+        self._payload_keys: Dict[int, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, business_id: int) -> Optional[Dict[str, Any]]:
+        """Context for the business, or None when it has no admin"""
+        if not business_id:
+            return None
+        return self.contexts.get_or_load(business_id, lambda: self._load(db, business_id))
+
+    def payload(self, business_id: int, name: Hashable, loader: Callable[[], Any]) -> Any:
+        """A per-business result (e.g. the dashboard summary), built once for all members"""
+        with self._lock:
+            self._payload_keys.setdefault(business_id, set()).add(name)
+        return self.payloads.get_or_load((business_id, name), loader)
+
+    def invalidate(self, business_id: int):
+        self.contexts.invalidate(business_id)
+        self.invalidate_payloads(business_id)
+
+    def invalidate_payloads(self, business_id: int):
+        with self._lock:
+            names = self._payload_keys.pop(business_id, set())
+        for name in names:
+            self.payloads.invalidate((business_id, name))
+
+    def business_of(self, user_id: int) -> Optional[int]:
+        with self._lock:
+            return self._business_by_user.get(user_id)
+
+    def clear(self):
+        self.contexts.clear()
+        self.payloads.clear()
+        with self._lock:
+            self._business_by_user.clear()
+            self._payload_keys.clear()
+
+    def _load(self, db: Session, business_id: int) -> Optional[Dict[str, Any]]:
+        rows = db.execute(
+            select(User.id, User.role_id, Profile.business_name, Business.name)
+            .select_from(User)
+            .outerjoin(Profile, Profile.user_id == User.id)
+            .outerjoin(Business, Business.id == User.business_id)
+            .where(User.business_id == business_id)
+            .order_by(User.id)
+        ).all()
+
+        admin = next((row for row in rows if row.role_id == BUSINESS_ADMIN_ROLE_ID), None)
+        if admin is None:
+            return None
+
+        member_ids = [row.id for row in rows]
+        with self._lock:
+            # Forget members who have left since the last load
+            for user_id in [u for u, b in self._business_by_user.items() if b == business_id]:
+                del self._business_by_user[user_id]
+            for member_id in member_ids:
+                self._business_by_user[member_id] = business_id
+
+        return {
+            "business_id": business_id,
+            "admin_user_id": admin.id,
+            "business_name": admin.business_name or admin.name,
+            "member_ids": member_ids,
+        }
+
+
+business_contexts = BusinessContextCache(ttl_seconds=settings.BUSINESS_CONTEXT_TTL_SECONDS)
+
+
+@on_user_data_changed
+def invalidate_business_caches(user_id: int, table_name: str = None):
+    business_id = business_contexts.business_of(user_id)
+    if business_id is None:
+        return
+    if table_name in (None, "profiles", "users"):
+        business_contexts.invalidate(business_id)
+    elif table_name in BUSINESS_DATA_TABLES:
+        context = business_contexts.contexts.get(business_id)
+        if context is None or context["admin_user_id"] == user_id:
+            business_contexts.invalidate_payloads(business_id)
@@ -0,0 +1,154 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select, union_all, literal, literal_column, cast, null, desc, func, Date, Float, Integer
+from sqlalchemy.orm import Session
+from core.config import settings
+from database.rollups import month_start_sql
+from models.transactions import Transaction
+from models.categories import Category
+from models.budget_entries import BudgetEntry
+from models.category_rollups import MonthlyCategoryRollup
+
+# Business category IDs
+BUSINESS_INCOME_IDS = [17, 18, 19, 20, 21]
+BUSINESS_EXPENSE_IDS = [22, 23, 24, 25, 26, 27, 28, 29, 30]
+
+DEFAULT_BUSINESS_BUDGET = 60000.0
+
+
+def _as_date(value) -> Optional[date]:
+    # Raw SQLite month expressions come back as 'YYYY-MM-DD' strings
+    if isinstance(value, datetime):
+        return value.date()
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class BusinessFigures:
+    """
+    Totals, quarterly income/expense and recent items for a business, read
+    from the data owner's (business admin's) rows in two statements:
+
+    1. monthly income/expense totals (plus the budget) from the category
+       rollups, or from transactions grouped by month when
+       CATEGORY_ROLLUPS_ENABLED is off
+    2. the latest income and expense transactions with their category names
+
+    Quarters and all-time totals are summed from the monthly rows in Python,
+    so any year (and the previous year for comparisons) costs no extra query.
+    """
+
+    def __init__(self, income_ids: List[int] = None, expense_ids: List[int] = None, recent_limit: int = 10):
+        self.income_ids = income_ids or BUSINESS_INCOME_IDS
+        self.expense_ids = expense_ids or BUSINESS_EXPENSE_IDS
+        self.recent_limit = recent_limit
+
+    def monthly_statement(self, owner_id: int, dialect_name: str):
+        """(row_type, category_id, month_start, total) rows: per category and month, then the budget"""
+        category_ids = self.income_ids + self.expense_ids
+
+        if settings.CATEGORY_ROLLUPS_ENABLED:
+            monthly = select(
+                literal("month").label("row_type"),
+                MonthlyCategoryRollup.category_id.label("category_id"),
+                MonthlyCategoryRollup.month_start.label("month_start"),
+                func.sum(MonthlyCategoryRollup.total).label("total"),
+            ).where(
+                MonthlyCategoryRollup.user_id == owner_id,
+                MonthlyCategoryRollup.category_id.in_(category_ids),
+                MonthlyCategoryRollup.txn_count > 0,
+            ).group_by(MonthlyCategoryRollup.category_id, MonthlyCategoryRollup.month_start)
+        else:
+            month_start = literal_column(month_start_sql(dialect_name, "transactions.created_at"), Date)
+            monthly = select(
+                literal("month").label("row_type"),
+                Transaction.category_id.label("category_id"),
+                month_start.label("month_start"),
+                func.sum(Transaction.amount).label("total"),
+            ).where(
+                Transaction.user_id == owner_id,
+                Transaction.category_id.in_(category_ids),
+                Transaction.created_at.isnot(None),
+            ).group_by(Transaction.category_id, month_start)
+
+        budget = select(
+            literal("budget"),
+            cast(null(), Integer),
+            cast(null(), Date),
+            cast(BudgetEntry.planned, Float),
+        ).where(BudgetEntry.user_id == owner_id).order_by(BudgetEntry.id).limit(1).subquery()
+
+        return union_all(monthly, select(*budget.c))
+
+    def recent_statement(self, owner_id: int):
+        """The latest income and expense transactions, tagged by kind"""
+        def latest(kind_name, category_ids):
+            return select(
+                literal(kind_name).label("kind"),
+                Transaction.id.label("id"),
+                Transaction.category_id.label("category_id"),
+                Category.name.label("category_name"),
+                Transaction.amount.label("amount"),
+                Transaction.created_at.label("created_at"),
+            ).select_from(Transaction).outerjoin(
+                Category, Category.id == Transaction.category_id
+            ).where(
+                Transaction.user_id == owner_id,
+                Transaction.category_id.in_(category_ids),
+            ).order_by(desc(Transaction.created_at)).limit(self.recent_limit).subquery()
+
+        income = latest("income", self.income_ids)
+        expense = latest("expense", self.expense_ids)
+        return union_all(select(*income.c), select(*expense.c))
+
+    def load(self, db: Session, owner_id: int, year: int = None) -> Dict[str, Any]:
+        """Figures for the owner; quarters for year (default: this year) and the year before"""
+        year = year or datetime.now().year
+        dialect_name = db.get_bind().dialect.name
+
+        monthly_rows = db.execute(self.monthly_statement(owner_id, dialect_name)).all()
+        recent_rows = db.execute(self.recent_statement(owner_id)).all()
+
+        budget_total = None
+        totals = {"income": 0.0, "expense": 0.0}
+        quarters = {y: {"income": [0.0] * 4, "expense": [0.0] * 4} for y in (year, year - 1)}
+        months = {}
+        for row_type, category_id, month_start, total in monthly_rows:
+            if row_type == "budget":
+                budget_total = float(total) if total is not None else None
+                continue
+            kind = "income" if category_id in self.income_ids else "expense"
+            total = float(total or 0)
+            totals[kind] += total
+            month_start = _as_date(month_start)
+            months[(kind, month_start)] = months.get((kind, month_start), 0.0) + total
+            if month_start.year in quarters:
+                quarters[month_start.year][kind][(month_start.month - 1) // 3] += total
+
+        recent = {"income": [], "expense": []}
+        for row in sorted(recent_rows, key=lambda r: (r.created_at is not None, r.created_at), reverse=True):
+            recent[row.kind].append(row)
+
+        return {
+            "year": year,
+            "budget_total": budget_total,
+            "total_income": totals["income"],
+            "total_expenses": abs(totals["expense"]),
+            "quarters": quarters,
+            "months": months,
+            "recent_income": recent["income"],
+            "recent_expenses": recent["expense"],
+        }
+
+    @staticmethod
+    def year_to_date(months: Dict, kind: str, year: int, through_month: int) -> float:
+        """Sum of a kind's monthly totals from January through through_month of year"""
+        return sum(total for (row_kind, month_start), total in months.items()
+                   if row_kind == kind and month_start.year == year and month_start.month <= through_month)
+
+
+def percent_change(current: float, previous: float) -> Optional[float]:
+    if not previous:
+        return None
+    return round((current - previous) / abs(previous) * 100, 1)
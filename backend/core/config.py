@@ -1,11 +1,66 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
     SECRET_KEY: str = Field(..., env="SECRET_KEY") 
     ALGORITHM: str = "HS256"  
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ROLE_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_SIZE: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+
+    # Password hashing pool and login throttling
+    PASSWORD_HASH_WORKERS: int = 2  # 0 hashes on the request thread
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    LOGIN_MAX_FAILURES_PER_IP: int = 30
+    LOGIN_IP_WINDOW_SECONDS: int = 60
+    # Comma-separated reverse proxy addresses whose X-Forwarded-For is trusted
+    TRUSTED_PROXY_IPS: str = ""
+    LOGIN_MAX_FAILURES_PER_ACCOUNT: int = 5
+    LOGIN_ACCOUNT_WINDOW_SECONDS: int = 300
+
+    # Dashboard summary cache (dropped when the user's data changes)
+    DASHBOARD_CACHE_TTL_SECONDS: int = 300
+    # Read category totals from monthly_category_rollups instead of summing transactions
+    CATEGORY_ROLLUPS_ENABLED: bool = True
+    # Business -> admin/members resolution and per-business dashboard payloads.
+    # Changes are invalidated in the writing worker only; other workers may
+    # serve stale business figures for up to this long.
+    BUSINESS_CONTEXT_TTL_SECONDS: int = 300
+
+    # Connection pool shared by the API and the agents
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 300
+
+    # LLM agents
+    LLM_MODEL: str = "llama3"
+    OLLAMA_BASE_URL: Optional[str] = None
+    LLM_MAX_CONNECTIONS: int = 10
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 5
+    INTENT_FAST_PATH_MIN_SCORE: float = 0.85  # hand-tuned rule router score, not a probability
+    SCHEMA_CATALOGUE_CHECK_SECONDS: int = 300
+    SQL_TEMPLATE_CACHE_SIZE: int = 256
+    SQL_TEMPLATE_CACHE_TTL_SECONDS: int = 3600
+    AGENT_BLOCKING_THREADS: int = 8
+    SPECULATIVE_ENHANCEMENT: bool = False
+    SQL_PIPELINE_MODE: str = "two_call"  # or "single_call"
+    DETERMINISTIC_ANSWERS: bool = True
+    LLM_SINGLE_FLIGHT: bool = True
+    SQL_GUARD_ENABLED: bool = True
+    SQL_STATEMENT_TIMEOUT_MS: int = 5000
+    SQL_MAX_PLAN_COST: float = 100000.0
+    SQL_MAX_PLAN_ROWS: int = 100000
+    SQL_ROW_CAP: int = 500
+    SQL_RESULT_SUMMARIES: bool = True
+    SQL_PREVIEW_ROWS: int = 50
+    PENDING_STORE_BACKEND: str = "database"  # or "memory" (single worker only)
+    PENDING_STORE_URL: Optional[str] = None  # defaults to DATABASE_URL
+    PENDING_OPERATION_TTL_SECONDS: int = 600
+    PENDING_DELETE_MAX_ROWS: int = 500
 
     class Config:
         env_file = ".env"
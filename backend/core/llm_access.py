@@ -0,0 +1,20 @@
+from typing import Dict, Any, Optional
+from core.config import settings
+from core.ttl_cache import TTLCache
+
+# Roles that may not use the LLM chat, with the message they are shown
+LLM_DENIED_ROLES = {
+    "business_subuser": "LLM access is not available for sub-users. Please contact your business administrator.",
+}
+
+# Role name by user id, shared by the chat router's access gate and the agents
+role_cache = TTLCache(ttl_seconds=settings.ROLE_CACHE_TTL_SECONDS)
+
+
+def llm_access_for_role(role_name: Optional[str]) -> Dict[str, Any]:
+    """Access decision for a role name (None means the user or role was not found)"""
+    if role_name is None:
+        return {"has_access": False, "message": "User not found."}
+    if role_name in LLM_DENIED_ROLES:
+        return {"has_access": False, "message": LLM_DENIED_ROLES[role_name]}
+    return {"has_access": True, "message": "Access granted"}
@@ -0,0 +1,109 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the pool cannot take the operation: too many are waiting, or a worker died"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification in a dedicated process pool.
+
+    At most max_pending operations are admitted at once (running plus
+    queued); further calls fail fast with PasswordPoolBusy instead of
+    tying up more request threads. workers=0 hashes inline (no pool).
+
+    Workers are started with the spawn method: forking the threaded API
+    process could copy a lock another thread holds into the child. Call
+    start() at app startup so the first login does not pay for it. If a
+    worker dies, the call that hit it fails with PasswordPoolBusy and the
+    pool is rebuilt on the next call.
+    """
+
+    def __init__(self, hash_func: Callable[[str], str], verify_func: Callable[[str, str], bool],
+                 workers: int = 2, max_pending: int = 16, mp_context=None):
+        self.hash_func = hash_func
+        self.verify_func = verify_func
+        self.workers = workers
+        self.mp_context = mp_context or multiprocessing.get_context("spawn")
+        self.max_pending = max(max_pending, workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def hash(self, password: str) -> str:
+        return self._run(self.hash_func, password)
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        return self._run(self.verify_func, plain, hashed)
+
+    def _run(self, func: Callable, *args) -> Any:
+        if self.workers <= 0:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("Password hashing queue is full")
+
+        with self._lock:
+            self.in_flight += 1
+        executor = None
+        try:
+            executor = self._get_executor()
+            return executor.submit(func, *args).result()
+        except BrokenProcessPool as e:
+            logger.error(f"Password hashing worker died, rebuilding the pool: {e}")
+            self._drop_executor(executor)
+            raise PasswordPoolBusy("Password hashing pool is restarting") from e
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def start(self):
+        """Create the pool now instead of on the first hash"""
+        if self.workers > 0:
+            self._get_executor()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context)
+            return self._executor
+
+    def _drop_executor(self, executor: ProcessPoolExecutor):
+        # Only the broken pool; another thread may already have built its replacement
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
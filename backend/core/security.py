@@ -2,6 +2,7 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
 from core.config import settings
+from core.password_pool import PasswordHasher
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -11,6 +12,14 @@ def hash_password(password: str):
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+# bcrypt off the request threads (see PasswordHasher)
+password_hasher = PasswordHasher(
+    hash_password,
+    verify_password,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
 def create_access_token(user_id: int, role: str):
     payload = {
         "sub": str(user_id),
@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class AttemptThrottle:
+    """
+    Sliding-window attempt counter per key (an IP address or an account).
+
+    is_blocked() is true once max_attempts were recorded within
+    window_seconds. Only the most recently active max_keys keys are kept.
+    """
+
+    def __init__(self, max_attempts: int, window_seconds: float, max_keys: int = 100000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_blocked(self, key: str) -> bool:
+        if self.max_attempts <= 0:
+            return False
+        with self._lock:
+            attempts = self._prune(key)
+            return attempts is not None and len(attempts) >= self.max_attempts
+
+    def record(self, key: str):
+        if self.max_attempts <= 0:
+            return
+        with self._lock:
+            attempts = self._prune(key)
+            if attempts is None:
+                attempts = self._attempts[key] = deque()
+            attempts.append(time.monotonic())
+            self._attempts.move_to_end(key)
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+
+    def reset(self, key: str):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+    def _prune(self, key: str):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        cutoff = time.monotonic() - self.window_seconds
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TokenCache:
+    """
+    Verified JWTs keyed by token digest: decoded claims plus a snapshot of
+    the user's columns, so authenticated requests skip the user lookup.
+
+    An entry lives until the token's exp claim or max_ttl_seconds, whichever
+    is sooner; the cap bounds how long another worker can serve a snapshot
+    after a change it did not see. invalidate_user() drops every token of
+    a user after a profile/email/role change in this process.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+        self._digests_by_user: Dict[Any, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """(claims, user snapshot) for a cached, unexpired token"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, token: str, claims: Dict[str, Any], user_snapshot: Dict[str, Any]):
+        if self.max_entries <= 0 or self.max_ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.max_ttl_seconds
+        if claims.get("exp"):
+            expires_at = min(expires_at, float(claims["exp"]))
+
+        key = self.digest(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, claims, user_snapshot)
+            self._digests_by_user.setdefault(user_snapshot["id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._digests_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests_by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[2]["id"]
+        digests = self._digests_by_user.get(user_id)
+        if digests is not None:
+            digests.discard(key)
+            if not digests:
+                del self._digests_by_user[user_id]
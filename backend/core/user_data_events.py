@@ -0,0 +1,66 @@
+import logging
+import sys
+from typing import Callable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# The API imports this module as core.user_data_events and the agents as
+# backend.core.user_data_events. Whichever name loads first serves both, so
+# there is one listener registry and one set of session hooks per process.
+for _name in ("core.user_data_events", "backend.core.user_data_events"):
+    sys.modules.setdefault(_name, sys.modules[__name__])
+
+# Called with (user_id, table_name) after a user's rows have changed
+_listeners: List[Callable[[int, Optional[str]], None]] = []
+
+# session.info key holding the (user_id, table_name) pairs flushed in a transaction;
+# tied to this registry so no other copy of the hooks can take its changes
+CHANGES_KEY = f"user_data_changes:{id(_listeners)}"
+
+
+def on_user_data_changed(listener: Callable[[int, Optional[str]], None]):
+    """Register a listener; usable as a decorator"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def user_data_changed(user_id: int, table_name: Optional[str] = None):
+    """
+    Tell the listeners that a user's rows in table_name were written.
+    Raw SQL writers (the agents' DataHandler) call this after committing;
+    ORM writes are picked up by the session hooks below.
+    """
+    if user_id is None:
+        return
+    for listener in list(_listeners):
+        try:
+            listener(user_id, table_name)
+        except Exception as e:
+            logger.warning(f"User data listener failed for user {user_id}: {e}")
+
+
+def _record_flushed_changes(session, flush_context):
+    changes = session.info.setdefault(CHANGES_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        user_id = getattr(obj, "user_id", None)
+        if user_id is not None:
+            changes.add((user_id, getattr(obj, "__tablename__", None)))
+
+
+def _notify_committed_changes(session):
+    for user_id, table_name in session.info.pop(CHANGES_KEY, set()):
+        user_data_changed(user_id, table_name)
+
+
+def _discard_changes(session):
+    session.info.pop(CHANGES_KEY, None)
+
+
+# Listeners only hear about ORM changes once they are committed
+if not event.contains(Session, "after_flush", _record_flushed_changes):
+    event.listen(Session, "after_flush", _record_flushed_changes)
+    event.listen(Session, "after_commit", _notify_committed_changes)
+    event.listen(Session, "after_rollback", _discard_changes)
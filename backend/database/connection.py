@@ -1,19 +1,96 @@
+import contextvars
+import threading
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings
 
+# One pool for the API routes and the agents
+pool_options = {}
+if not settings.DATABASE_URL.startswith("sqlite"):
+    pool_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_recycle=300
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    **pool_options
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False)
 Base = declarative_base()
 
+# Unit of work for the chat turn being processed (see TurnSession)
+_current_turn: contextvars.ContextVar = contextvars.ContextVar("turn_session", default=None)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+class TurnSession:
+    """
+    One pooled connection reused by every pipeline stage of a chat turn.
+
+    The connection is checked out on first use and returned by close().
+    Stages may run on different executor threads, so use of the session
+    is serialized; each stage's open transaction is rolled back when it
+    finishes, the same as closing a per-stage session used to.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._session = None
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._connection = engine.connect()
+                self._session = SessionLocal(bind=self._connection)
+            try:
+                yield self._session
+            finally:
+                if self._session.in_transaction():
+                    self._session.rollback()
+
+    @contextmanager
+    def activated(self):
+        """Make this the current turn for the code in the block"""
+        token = _current_turn.set(self)
+        try:
+            yield self
+        finally:
+            _current_turn.reset(token)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._connection.close()
+                self._session = None
+                self._connection = None
+
+
+@contextmanager
+def agent_session():
+    """The current turn's session, or a new session closed on exit when no turn is active"""
+    turn = _current_turn.get()
+    if turn is not None:
+        with turn.session() as db:
+            yield db
+        return
+
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,208 @@
+"""
+Versioned schema changes applied on top of Base.metadata.create_all.
+
+Each migration runs once and is recorded in schema_migrations. Append new
+ones to MIGRATIONS with the next version number; never edit one that has
+shipped. The app applies pending migrations on startup; to run or inspect
+them by hand:
+
+    cd backend && python -m database.migrations [--list]
+
+On PostgreSQL the runner holds an advisory lock so that several workers
+starting together apply each migration once. Waiting workers poll with
+pg_try_advisory_lock and sleep in between rather than blocking inside
+pg_advisory_lock: a blocked statement keeps a snapshot open, and CREATE
+INDEX CONCURRENTLY on the lock holder would wait for it forever. Index
+migrations use CREATE INDEX CONCURRENTLY (outside a transaction) so writes
+are not blocked while an index builds; an INVALID index left by a failed
+build is dropped and built again, and a build that ends INVALID stops the
+migration before its version is recorded.
+"""
+import argparse
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+MIGRATION_LOCK_ID = 72_311_025  # pg_try_advisory_lock key
+LOCK_POLL_SECONDS = 1.0
+LOCK_WAIT_SECONDS = 600.0
+
+CONCURRENT_INDEX_PATTERN = re.compile(r"CREATE\s+INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+INDEX_VALID_SQL = """
+    SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name AND pg_table_is_visible(c.oid)
+"""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: Callable[[str], List[str]]  # dialect name -> SQL statements
+    transactional: bool = True
+
+
+def _index(dialect_name: str, name: str, table: str, columns: List[str], include: List[str] = ()) -> str:
+    """CREATE INDEX; INCLUDE columns become trailing key columns where INCLUDE is not supported"""
+    if dialect_name == "postgresql":
+        include_sql = f" INCLUDE ({', '.join(include)})" if include else ""
+        return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)}){include_sql}"
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(list(columns) + list(include))})"
+
+
+def hot_path_indexes(dialect_name: str) -> List[str]:
+    return [
+        # Dashboard recent purchases (ORDER BY created_at DESC LIMIT) and month ranges
+        _index(dialect_name, "ix_transactions_user_created", "transactions", ["user_id", "created_at"]),
+        # Per-category sums and the business recent-income/expense lists, answered from the index
+        _index(dialect_name, "ix_transactions_user_category_created", "transactions",
+               ["user_id", "category_id", "created_at"], include=["amount"]),
+        # Chat history for one session, and for all of a user's sessions, in timestamp order
+        _index(dialect_name, "ix_llmlogs_user_session_timestamp", "llmlogs", ["user_id", "session_id", "timestamp"]),
+        _index(dialect_name, "ix_llmlogs_user_timestamp", "llmlogs", ["user_id", "timestamp"]),
+        # Goal lists (personal, business and the dashboard summary)
+        _index(dialect_name, "ix_goals_user", "goals", ["user_id", "type"]),
+        # Budget lookups per user and per user/category (budget views and the business budget)
+        _index(dialect_name, "ix_budgetentries_user_category", "budgetentries", ["user_id", "category_id"]),
+    ]
+
+
+def pending_operations_table(dialect_name: str) -> List[str]:
+    # Deletes waiting for confirmation, shared by every worker (agents/pending_store.py)
+    return [
+        "CREATE TABLE IF NOT EXISTS pending_operations ("
+        "operation_id VARCHAR(64) PRIMARY KEY, user_id INTEGER NOT NULL, payload TEXT NOT NULL, "
+        "created_at DOUBLE PRECISION NOT NULL, expires_at DOUBLE PRECISION NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_pending_operations_user_id ON pending_operations (user_id)",
+        # Purging expired operations reads only the expired range
+        "CREATE INDEX IF NOT EXISTS ix_pending_operations_expires_at ON pending_operations (expires_at)",
+    ]
+
+
+PENDING_OPERATIONS_MIGRATION = Migration(2, "pending operations table", pending_operations_table)
+
+MIGRATIONS = [
+    Migration(1, "hot path indexes", hot_path_indexes, transactional=False),
+    PENDING_OPERATIONS_MIGRATION,
+]
+
+
+def _ensure_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(engine) -> set:
+    _ensure_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+
+def _apply(engine, migration: Migration):
+    statements = migration.statements(engine.dialect.name)
+    record = text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)")
+    params = {"version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()}
+
+    if migration.transactional:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+            conn.execute(record, params)
+        return
+
+    # Statements that cannot run inside a transaction; each must be idempotent
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for statement in statements:
+            match = CONCURRENT_INDEX_PATTERN.search(statement)
+            if match and conn.dialect.name == "postgresql":
+                _build_concurrent_index(conn, match.group(1), statement)
+            else:
+                conn.execute(text(statement))
+        conn.execute(record, params)
+
+
+def _index_valid(conn, name: str):
+    """True/False for an existing index, None when there is none"""
+    return conn.execute(text(INDEX_VALID_SQL), {"name": name}).scalar()
+
+
+def _build_concurrent_index(conn, name: str, statement: str):
+    # IF NOT EXISTS would skip an INVALID index left by an earlier failed build
+    if _index_valid(conn, name) is False:
+        logger.warning(f"Dropping invalid index {name} before rebuilding it")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(statement))
+    if not _index_valid(conn, name):
+        raise RuntimeError(f"Index {name} is not valid after CREATE INDEX CONCURRENTLY")
+
+
+def _acquire_lock(engine):
+    """Poll for the migration lock; nothing runs on the connection between attempts"""
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    try:
+        while not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_ID}).scalar():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out after {LOCK_WAIT_SECONDS:.0f}s waiting for the migration lock")
+            time.sleep(LOCK_POLL_SECONDS)
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def migrate(engine, migrations: List[Migration] = None) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+    _ensure_table(engine)
+
+    lock_conn = None
+    if engine.dialect.name == "postgresql":
+        lock_conn = _acquire_lock(engine)
+
+    applied = []
+    try:
+        # Read after taking the lock, so a worker that waited sees what the others did
+        done = applied_versions(engine)
+        for migration in migrations:
+            if migration.version in done:
+                continue
+            logger.info(f"Applying migration {migration.version}: {migration.name}")
+            _apply(engine, migration)
+            applied.append(migration.version)
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_ID})
+            lock_conn.close()
+
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--list", action="store_true", help="show migrations and whether they are applied")
+    args = parser.parse_args(argv)
+
+    from database.connection import engine
+
+    if args.list:
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            status = "applied" if migration.version in done else "pending"
+            print(f"{migration.version:>4}  {status:<8} {migration.name}")
+        return
+
+    applied = migrate(engine)
+    print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
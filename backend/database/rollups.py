@@ -0,0 +1,118 @@
+"""
+Per-(user, month, category) transaction totals kept in monthly_category_rollups.
+
+Writers call apply_transactions() in the same transaction as their change:
+with sign=-1 before rows are deleted or updated, and sign=+1 after rows are
+inserted or updated. The rows are read back from transactions, so server
+defaults (created_at) are already filled in. ORM writes are covered by the
+hooks in models/category_rollups.py; the agents' raw SQL writes call these
+functions themselves. Bulk Query.delete()/update() bypass both, so run the
+rebuild command after those:
+
+    cd backend && python -m database.rollups [--user-id N]
+
+Transactions without a category are left out; every reader joins to
+categories anyway.
+"""
+import argparse
+import logging
+from typing import Iterable, Optional
+from sqlalchemy import text, bindparam
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "monthly_category_rollups"
+ROLLUP_VIEW = "llm_monthly_category_totals"
+
+
+def month_start_sql(dialect_name: str, column: str = "created_at") -> str:
+    """SQL for the first day of the column's month"""
+    if dialect_name == "sqlite":
+        return f"date({column}, 'start of month')"
+    return f"CAST(date_trunc('month', {column}) AS DATE)"
+
+
+def _upsert_sql(dialect_name: str, where: str) -> str:
+    return f"""
+        INSERT INTO {ROLLUP_TABLE} (user_id, month_start, category_id, total, txn_count)
+        SELECT user_id, {month_start_sql(dialect_name)}, category_id, :sign * SUM(amount), :sign * COUNT(*)
+        FROM transactions
+        WHERE {where} AND category_id IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY user_id, {month_start_sql(dialect_name)}, category_id
+        ON CONFLICT (user_id, month_start, category_id) DO UPDATE
+        SET total = {ROLLUP_TABLE}.total + excluded.total,
+            txn_count = {ROLLUP_TABLE}.txn_count + excluded.txn_count
+    """
+
+
+def apply_transactions(conn, ids: Iterable[int], sign: int = 1, user_id: Optional[int] = None):
+    """
+    Add (sign=1) or subtract (sign=-1) the current state of these transaction
+    rows; user_id limits it to the rows a user-scoped statement will touch
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    where = "id IN :ids" if user_id is None else "id IN :ids AND user_id = :user_id"
+    statement = text(_upsert_sql(conn.dialect.name, where)).bindparams(
+        bindparam("ids", expanding=True)
+    )
+    conn.execute(statement, {"ids": ids, "sign": sign, "user_id": user_id})
+
+
+def rebuild(conn, user_id: Optional[int] = None):
+    """Recompute the rollups from transactions, for one user or everyone"""
+    if user_id is None:
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE}"))
+        conn.execute(text(_upsert_sql(conn.dialect.name, "1 = 1")), {"sign": 1})
+    else:
+        params = {"user_id": user_id, "sign": 1}
+        conn.execute(text(f"DELETE FROM {ROLLUP_TABLE} WHERE user_id = :user_id"), params)
+        conn.execute(text(_upsert_sql(conn.dialect.name, "user_id = :user_id")), params)
+
+
+def install_view(conn):
+    """Expose the rollups to the chat agents as an llm_* view"""
+    create = "CREATE VIEW IF NOT EXISTS" if conn.dialect.name == "sqlite" else "CREATE OR REPLACE VIEW"
+    conn.execute(text(f"""
+        {create} {ROLLUP_VIEW} AS
+        SELECT r.user_id, r.month_start AS month, c.name AS category_name, c.kind AS category_kind,
+               r.total AS amount, ABS(r.total) AS absolute_amount, r.txn_count AS transaction_count
+        FROM {ROLLUP_TABLE} r JOIN categories c ON c.id = r.category_id
+        WHERE r.txn_count > 0
+    """))
+
+
+def ensure_rollups(engine):
+    """Install the view and backfill an empty rollup table (first start after the upgrade)"""
+    with engine.begin() as conn:
+        install_view(conn)
+        has_rollups = conn.execute(text(f"SELECT 1 FROM {ROLLUP_TABLE} LIMIT 1")).first()
+        has_transactions = conn.execute(text(
+            "SELECT 1 FROM transactions WHERE category_id IS NOT NULL LIMIT 1"
+        )).first()
+        if has_transactions and not has_rollups:
+            logger.info("Backfilling monthly category rollups")
+            rebuild(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the monthly category rollups from transactions")
+    parser.add_argument("--user-id", type=int, default=None, help="only rebuild this user's rows")
+    args = parser.parse_args(argv)
+
+    from database.connection import Base, engine
+    from models.user import User
+    from models.categories import Category
+    from models.category_rollups import MonthlyCategoryRollup
+
+    Base.metadata.create_all(bind=engine, tables=[MonthlyCategoryRollup.__table__])
+    with engine.begin() as conn:
+        rebuild(conn, args.user_id)
+        install_view(conn)
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {ROLLUP_TABLE}")).scalar()
+    print(f"Rebuilt {ROLLUP_TABLE}: {count} rows")
+
+
+if __name__ == "__main__":
+    main()
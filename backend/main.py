@@ -4,11 +4,14 @@ from fastapi.openapi.utils import get_openapi
 from sqlalchemy import text
 
 from database.connection import Base, engine, SessionLocal
+from database.rollups import ensure_rollups
+from database.migrations import migrate
 from routers.auth_router import router as auth_router
 from routers.goals import router as goals_router
 from routers.dashboard_router import router as dashboard_router
-from routers.chat_router import router as chat_router  # NEW
+from routers.chat_router import router as chat_router, init_chat_processor  # NEW
 from core.config import settings
+from core.security import password_hasher
 
 print(">>> USING DATABASE URL:", settings.DATABASE_URL)
 
@@ -21,11 +24,14 @@ from models.categories import Category
 from models.transactions import Transaction
 from models.budgets import Budget
 from models.budget_entries import BudgetEntry
-from models.llmlogs import LLMLog
+from models.llmlogs import LLMLog, LLMLogMetric
+from models.category_rollups import MonthlyCategoryRollup
 
 app = FastAPI(title="ClariFi API", version="1.0.0")
 
 Base.metadata.create_all(bind=engine)
+migrate(engine)
+ensure_rollups(engine)
 
 # configuration
 origins = [
@@ -53,6 +59,18 @@ app.include_router(goals_router)
 app.include_router(dashboard_router)
 app.include_router(chat_router)  # NEW
 
+@app.on_event("startup")
+def startup_agents():
+    init_chat_processor()
+
+@app.on_event("startup")
+def startup_password_pool():
+    password_hasher.start()
+
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    password_hasher.shutdown()
+
 @app.get("/")
 def root():
     return {"status": "OK"}
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, event, inspect
+from database.connection import Base
+from database import rollups
+from models.transactions import Transaction
+
+class MonthlyCategoryRollup(Base):
+    __tablename__ = "monthly_category_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month_start = Column(Date, primary_key=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    total = Column(Float, nullable=False, default=0.0)
+    txn_count = Column(Integer, nullable=False, default=0)
+
+
+# Keep the rollups in step with ORM writes to transactions, inside the same flush
+ROLLUP_COLUMNS = ("user_id", "category_id", "amount", "created_at")
+
+def _rollup_columns_changed(target) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in ROLLUP_COLUMNS)
+
+@event.listens_for(Transaction, "after_insert")
+def _add_inserted(mapper, connection, target):
+    rollups.apply_transactions(connection, [target.id], 1)
+
+@event.listens_for(Transaction, "before_update")
+def _subtract_before_update(mapper, connection, target):
+    if _rollup_columns_changed(target):
+        rollups.apply_transactions(connection, [target.id], -1)
+
+@event.listens_for(Transaction, "after_update")
+def _add_after_update(mapper, connection, target):
+    if _rollup_columns_changed(target):
+        rollups.apply_transactions(connection, [target.id], 1)
+
+@event.listens_for(Transaction, "before_delete")
+def _subtract_deleted(mapper, connection, target):
+    rollups.apply_transactions(connection, [target.id], -1)
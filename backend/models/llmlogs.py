@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, TIMESTAMP, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database.connection import Base
@@ -14,4 +14,24 @@ class LLMLog(Base):
     timestamp = Column(TIMESTAMP, server_default=func.now())
 
     # Relationship
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    metrics = relationship("LLMLogMetric", back_populates="llmlog", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class LLMLogMetric(Base):
+    """One timed agent pipeline stage of the chat turn logged in llmlogs"""
+    __tablename__ = "llmlog_metrics"
+
+    id = Column(Integer, primary_key=True)
+    llmlog_id = Column(Integer, ForeignKey("llmlogs.id", ondelete="CASCADE"), nullable=False, index=True)
+    stage_index = Column(Integer, nullable=False)
+    stage = Column(String(50), nullable=False, index=True)
+    seconds = Column(Float, nullable=False)
+    llm_calls = Column(Integer)
+    prompt_chars = Column(Integer)
+    response_chars = Column(Integer)
+    prompt_tokens = Column(Integer)  # Ollama prompt_eval_count
+    completion_tokens = Column(Integer)  # Ollama eval_count
+
+    # Relationship
+    llmlog = relationship("LLMLog", back_populates="metrics")
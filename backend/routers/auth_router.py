@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from database.connection import SessionLocal
@@ -8,9 +8,15 @@ from models.profile import Profile
 from models.business import Business
 from models.role import Role
 from schemas.auth_schema import *
-from core.security import hash_password, verify_password, create_access_token
+from core.security import create_access_token, password_hasher
+from core.password_pool import PasswordPoolBusy
+from core.throttle import AttemptThrottle
 from core.config import settings
+from core.token_cache import TokenCache
+from core.llm_access import role_cache
+from core.business_context import business_contexts
 from jose import jwt, JWTError
+from sqlalchemy.orm import make_transient_to_detached
 import re 
 
 from datetime import datetime
@@ -19,6 +25,56 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# Verified tokens -> (claims, user snapshot); skips the user lookup on every request
+token_cache = TokenCache(
+    max_entries=settings.TOKEN_CACHE_SIZE,
+    max_ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+USER_SNAPSHOT_FIELDS = ("id", "email", "role_id", "business_id", "admin_email", "created_at")
+
+# Login attempts per client IP, and failed logins per account
+# Both count failed logins only, so busy IPs (offices, NAT) are not limited by successful ones
+login_ip_throttle = AttemptThrottle(settings.LOGIN_MAX_FAILURES_PER_IP, settings.LOGIN_IP_WINDOW_SECONDS)
+login_account_throttle = AttemptThrottle(settings.LOGIN_MAX_FAILURES_PER_ACCOUNT, settings.LOGIN_ACCOUNT_WINDOW_SECONDS)
+
+
+def client_ip(request: Request) -> str:
+    """
+    The caller's address. Behind a proxy listed in TRUSTED_PROXY_IPS this is
+    the right-most X-Forwarded-For entry that is not one of those proxies;
+    the header is ignored for direct connections, where anyone could set it.
+    """
+    peer = request.client.host if request.client else "unknown"
+    trusted = {ip.strip() for ip in settings.TRUSTED_PROXY_IPS.split(",") if ip.strip()}
+    if peer not in trusted:
+        return peer
+    forwarded = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+    for ip in reversed(forwarded):
+        if ip not in trusted:
+            return ip
+    return forwarded[0] if forwarded else peer
+
+
+def record_failed_login(ip: str, account: str):
+    login_ip_throttle.record(ip)
+    login_account_throttle.record(account)
+
+
+def hash_password(password: str) -> str:
+    """bcrypt hash on the password pool; 503 when the pool is saturated or restarting"""
+    try:
+        return password_hasher.hash(password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    """bcrypt verification on the password pool; 503 when the pool is saturated or restarting"""
+    try:
+        return password_hasher.verify(plain, hashed)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
+
 
 def get_db():
     db = SessionLocal()
@@ -34,6 +90,9 @@ def register_personal(payload: RegisterPersonal, db: Session = Depends(get_db)):
     if email_exists:
         raise HTTPException(status_code=400, detail="Email already exists")
 
+    # Hash before writing anything so a busy pool cannot leave a user without credentials
+    hashed = hash_password(payload.password)
+
     role = db.query(Role).filter(Role.role_name == "personal_user").first()
 
     user = User(email=payload.email, role_id=role.id)
@@ -48,8 +107,6 @@ def register_personal(payload: RegisterPersonal, db: Session = Depends(get_db)):
     )
     db.add(profile)
 
-    hashed = hash_password(payload.password)
-    
     creds = AuthCredentials(
         user_id=user.id,
         password_hash=hashed,
@@ -70,6 +127,9 @@ def register_business_admin(payload: RegisterBusinessAdmin, db: Session = Depend
     if email_exists:
         raise HTTPException(status_code=400, detail="Email already in use")
 
+    # Hash before writing anything so a busy pool cannot leave a user without credentials
+    hashed = hash_password(payload.password)
+
     role = db.query(Role).filter(Role.role_name == "business_admin").first()
 
     business = Business(name=payload.businessname)
@@ -90,8 +150,6 @@ def register_business_admin(payload: RegisterBusinessAdmin, db: Session = Depend
     )
     db.add(profile)
 
-    hashed = hash_password(payload.password)
-    
     creds = AuthCredentials(
         user_id=user.id,
         password_hash=hashed,
@@ -128,6 +186,9 @@ def register_business_sub(payload: RegisterBusinessSub, db: Session = Depends(ge
     if email_exists:
         raise HTTPException(status_code=400, detail="Email already in use")
 
+    # Hash before writing anything so a busy pool cannot leave a user without credentials
+    hashed = hash_password(payload.password)
+
     role = db.query(Role).filter(Role.role_name == "business_subuser").first()
     
     # Get the business name for the profile
@@ -146,8 +207,6 @@ def register_business_sub(payload: RegisterBusinessSub, db: Session = Depends(ge
     )
     db.add(profile)
 
-    hashed = hash_password(payload.password)
-    
     creds = AuthCredentials(
         user_id=user.id,
         password_hash=hashed,
@@ -158,6 +217,8 @@ def register_business_sub(payload: RegisterBusinessSub, db: Session = Depends(ge
     db.add(creds)
 
     db.commit()
+    # The business has a new member
+    business_contexts.invalidate(admin.business_id)
 
     return {
         "message": "Sub-user registered successfully",
@@ -166,19 +227,26 @@ def register_business_sub(payload: RegisterBusinessSub, db: Session = Depends(ge
     }
 
 @router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+def login(payload: LoginRequest, request: Request, db: Session = Depends(get_db)):
     print(f"Login attempt for email: {payload.email}")
     
+    ip = client_ip(request)
+    account = payload.email.strip().lower()
+    if login_ip_throttle.is_blocked(ip) or login_account_throttle.is_blocked(account):
+        raise HTTPException(status_code=429, detail="Too many login attempts. Please try again later.")
+    
     user = db.query(User).filter(User.email == payload.email).first()
     
     if not user:
         print(f"User not found: {payload.email}")
+        record_failed_login(ip, account)
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
     creds = db.query(AuthCredentials).filter(AuthCredentials.user_id == user.id).first()
     
     if not creds:
         print(f"No credentials found for user: {user.id}")
+        record_failed_login(ip, account)
         raise HTTPException(status_code=400, detail="Invalid email or password")
     
     print(f"Found user: {user.email}, role_id: {user.role_id}")
@@ -195,10 +263,12 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
         creds.failed_attempts += 1
         creds.last_failed_at = datetime.utcnow()
         db.commit()
+        record_failed_login(ip, account)
 
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
     # 2. SUCCESSFUL LOGIN: reset failed attempts + update last_login
+    login_account_throttle.reset(account)
     creds.failed_attempts = 0
     creds.last_failed_at = None
     creds.last_login = datetime.utcnow()
@@ -230,6 +300,33 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+def snapshot_user(user: User) -> dict:
+    return {field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS}
+
+
+def attach_user_snapshot(db: Session, snapshot: dict) -> User:
+    """
+    Rebuild the User from a cached snapshot as a persistent instance of this
+    request's session, without a SELECT, so routes can still modify it
+    """
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def invalidate_user_cache(user_id: int):
+    """Call after changing a user's profile, email or role"""
+    token_cache.invalidate_user(user_id)
+    role_cache.invalidate(user_id)
+
+
+def cached_token_claims(token: str):
+    """Claims of a token verify_token has already accepted, or None"""
+    cached = token_cache.get(token)
+    return cached[0] if cached else None
+
+
 def verify_token(
     Authorization: str = Header(None, alias="Authorization"),
     db: Session = Depends(get_db)
@@ -244,6 +341,10 @@ def verify_token(
     try:
         token = Authorization.replace("Bearer ", "").strip()
 
+        cached = token_cache.get(token)
+        if cached:
+            return attach_user_snapshot(db, cached[1])
+
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
@@ -258,12 +359,25 @@ def verify_token(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        token_cache.set(token, payload, snapshot_user(user))
         return user
 
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
+@router.get("/password-pool")
+def password_pool_stats(
+    user: User = Depends(verify_token),
+    db: Session = Depends(get_db)
+):
+    """Hashing pool load: in-flight operations, queue depth and rejections (admins only)"""
+    role = db.query(Role).filter(Role.id == user.role_id).first()
+    if not role or role.role_name != "business_admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return password_hasher.stats()
+
+
 @router.get("/debug-headers")
 def debug_headers(authorization: str = Header(None)):
     return {"authorization_received": authorization}
@@ -330,6 +444,7 @@ def update_personal_profile(
     
     profile.display_name = payload.display_name
     db.commit()
+    invalidate_user_cache(user.id)
     
     return {"message": "Profile updated successfully"}
 
@@ -365,6 +480,9 @@ def update_business_profile(
     profile.display_name = payload.display_name
     profile.business_name = payload.business_name
     db.commit()
+    invalidate_user_cache(user.id)
+    if user.business_id:
+        business_contexts.invalidate(user.business_id)
     
     return {"message": "Business profile updated successfully"}
 
@@ -392,6 +510,7 @@ def update_subuser_profile(
     
     profile.display_name = payload.display_name
     db.commit()
+    invalidate_user_cache(user.id)
     
     return {"message": "Profile updated successfully"}
 
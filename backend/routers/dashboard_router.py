@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, desc, select, union_all, literal, cast, null, Integer, Float, String, TIMESTAMP
 from datetime import datetime, timedelta
 from typing import List
 from database.connection import SessionLocal
+from core.config import settings
+from core.ttl_cache import TTLCache
+from core.user_data_events import on_user_data_changed
+from core.business_context import business_contexts
+from core.business_figures import BusinessFigures, DEFAULT_BUSINESS_BUDGET, percent_change
 from models.user import User
 from models.transactions import Transaction
 from models.categories import Category
 from models.goals import Goal
 from models.profile import Profile
+from models.category_rollups import MonthlyCategoryRollup
 from routers.auth_router import verify_token
 from models.budgets import Budget
 from models.budget_entries import BudgetEntry
@@ -23,164 +29,309 @@ def get_db():
         db.close()
 
 
-def fetch_recent_purchases_helper(user_id: int, db: Session, limit: int = 10):
-    """Helper function to fetch recent purchases"""
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-    ).order_by(desc(Transaction.created_at)).limit(limit).all()
-    
-    # Map category IDs to specific item names for personal expenses
-    category_item_map = {
-        1: "Rent Payment",
-        2: "Grocery Shopping",
-        3: "Gas Station",
-        4: "Movie Tickets",
-        5: "Doctor Visit",
-        6: "Insurance Premium",
-        7: "Savings Deposit",
-        8: "Miscellaneous Expense",
-        22: "Office Rent",
-        23: "Salary Payment",
-        24: "Software Purchase",
-        25: "Marketing Expense",
-        26: "Utility Bill",
-        27: "Business Development",
-        28: "Product Development",
-        29: "Training Course",
-        30: "Business Operations",
-    }
+# Map category IDs to specific item names for personal expenses
+CATEGORY_ITEM_MAP = {
+    1: "Rent Payment",
+    2: "Grocery Shopping",
+    3: "Gas Station",
+    4: "Movie Tickets",
+    5: "Doctor Visit",
+    6: "Insurance Premium",
+    7: "Savings Deposit",
+    8: "Miscellaneous Expense",
+    22: "Office Rent",
+    23: "Salary Payment",
+    24: "Software Purchase",
+    25: "Marketing Expense",
+    26: "Utility Bill",
+    27: "Business Development",
+    28: "Product Development",
+    29: "Training Course",
+    30: "Business Operations",
+}
+
+CATEGORY_GENERIC_MAP = {
+    "Housing": "Housing Expense",
+    "Food": "Food Purchase", 
+    "Transportation": "Transportation",
+    "Entertainment": "Entertainment",
+    "Healthcare": "Healthcare",
+    "Insurance": "Insurance",
+    "Savings": "Savings Transfer",
+    "Other Expense": "Expense",
+    "Utilities": "Utility Bill",
+}
+
+EXPENSE_COLORS = [
+    "#FF6384", "#36A2EB", "#FFCE56", "#4BC0C0", "#9966FF",
+    "#FF9F40", "#FF6384", "#C9CBCF", "#4BC0C0", "#FF6384"
+]
+
+GOAL_COLORS = [
+    "#36A2EB", "#FF6384", "#FFCE56", "#4BC0C0", "#9966FF",
+    "#FF9F40", "#C9CBCF", "#7D5BA6", "#89CE94", "#643173",
+]
+
+business_figures = BusinessFigures()
+
+# Summary per user id, dropped whenever that user's rows change
+summary_cache = TTLCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS)
+
+
+@on_user_data_changed
+def invalidate_dashboard_cache(user_id: int, table_name: str = None):
+    if table_name in (None, "transactions", "goals", "profiles"):
+        summary_cache.invalidate(user_id)
+
+
+def format_purchase(transaction_id, category_id, category_name, amount, created_at):
+    """Frontend row for a transaction, named after its category and amount"""
+    item_name = "Purchase"
+    
+    if category_id and category_id in CATEGORY_ITEM_MAP:
+        item_name = CATEGORY_ITEM_MAP[category_id]
+    elif category_name:
+        if category_name in CATEGORY_GENERIC_MAP:
+            item_name = CATEGORY_GENERIC_MAP[category_name]
+        else:
+            item_name = category_name
+    
+    if category_id == 2:
+        if abs(amount) < 30:
+            item_name = "Coffee Shop"
+        elif abs(amount) < 80:
+            item_name = "Restaurant Meal"
+        else:
+            item_name = "Grocery Shopping"
+    elif category_id == 3:
+        if abs(amount) < 40:
+            item_name = "Bus/Train Fare"
+        elif abs(amount) < 100:
+            item_name = "Gas Station"
+        else:
+            item_name = "Car Maintenance"
+    elif category_id == 4:
+        if abs(amount) < 30:
+            item_name = "Streaming Service"
+        elif abs(amount) < 60:
+            item_name = "Movie Tickets"
+        else:
+            item_name = "Concert/Event"
+    elif category_id == 26:
+        if abs(amount) < 100:
+            item_name = "Internet Bill"
+        elif abs(amount) < 150:
+            item_name = "Electricity Bill"
+        else:
+            item_name = "Utility Bundle"
     
-    category_generic_map = {
-        "Housing": "Housing Expense",
-        "Food": "Food Purchase", 
-        "Transportation": "Transportation",
-        "Entertainment": "Entertainment",
-        "Healthcare": "Healthcare",
-        "Insurance": "Insurance",
-        "Savings": "Savings Transfer",
-        "Other Expense": "Expense",
-        "Utilities": "Utility Bill",
+    return {
+        "id": transaction_id,
+        "item": item_name,
+        "date": created_at.strftime("%Y-%m-%d") if created_at else "Unknown",
+        "amount": f"${abs(amount):.2f}"
     }
-    
-    result = []
-    for t in transactions:
-        item_name = "Purchase"
-        
-        if t.category_id and t.category_id in category_item_map:
-            item_name = category_item_map[t.category_id]
-        elif t.category and t.category.name:
-            category_name = t.category.name
-            if category_name in category_generic_map:
-                item_name = category_generic_map[category_name]
-            else:
-                item_name = category_name
-        
-        if t.category_id == 2:
-            if abs(t.amount) < 30:
-                item_name = "Coffee Shop"
-            elif abs(t.amount) < 80:
-                item_name = "Restaurant Meal"
-            else:
-                item_name = "Grocery Shopping"
-        elif t.category_id == 3:
-            if abs(t.amount) < 40:
-                item_name = "Bus/Train Fare"
-            elif abs(t.amount) < 100:
-                item_name = "Gas Station"
-            else:
-                item_name = "Car Maintenance"
-        elif t.category_id == 4:
-            if abs(t.amount) < 30:
-                item_name = "Streaming Service"
-            elif abs(t.amount) < 60:
-                item_name = "Movie Tickets"
-            else:
-                item_name = "Concert/Event"
-        elif t.category_id == 26:
-            if abs(t.amount) < 100:
-                item_name = "Internet Bill"
-            elif abs(t.amount) < 150:
-                item_name = "Electricity Bill"
-            else:
-                item_name = "Utility Bundle"
-        
-        result.append({
-            "id": t.id,
-            "item": item_name,
-            "date": t.created_at.strftime("%Y-%m-%d") if t.created_at else "Unknown",
-            "amount": f"${abs(t.amount):.2f}"
-        })
-    
-    return result
 
-def fetch_expense_categories_helper(user_id: int, db: Session, month: str = None):
-    """Helper function to fetch expense categories"""
-    query = db.query(
-        Category.name,
-        Category.id,
-        func.sum(Transaction.amount).label("total")
-    ).join(
-        Transaction,
-        Transaction.category_id == Category.id
-    ).filter(
-        Transaction.user_id == user_id,
-        Category.kind == "expense",
-    )
-    
-    if month:
-        try:
-            year, month_num = map(int, month.split("-"))
-            start_date = datetime(year, month_num, 1)
-            if month_num == 12:
-                end_date = datetime(year + 1, 1, 1)
-            else:
-                end_date = datetime(year, month_num + 1, 1)
-            
-            query = query.filter(
-                Transaction.created_at >= start_date,
-                Transaction.created_at < end_date
-            )
-        except ValueError:
-            pass
-    
-    results = query.group_by(Category.id, Category.name).all()
-    
-    colors = [
-        "#FF6384", "#36A2EB", "#FFCE56", "#4BC0C0", "#9966FF",
-        "#FF9F40", "#FF6384", "#C9CBCF", "#4BC0C0", "#FF6384"
-    ]
-    
+def format_expense_categories(totals):
+    """Chart slices from (name, total) pairs"""
+    totals = [(name, total) for name, total in totals if total is not None]
     return [
         {
             "name": name,
             "value": abs(float(total)) if total else 0.0,
-            "color": colors[i % len(colors)]
+            "color": EXPENSE_COLORS[i % len(EXPENSE_COLORS)]
         }
-        for i, (name, _, total) in enumerate(results) if total is not None
+        for i, (name, total) in enumerate(totals)
     ]
 
+def format_goal(goal_id, name, target, current, goal_type, status, index):
+    return {
+        "id": goal_id,
+        "name": name,
+        "target": target,
+        "current": current,
+        "type": goal_type,
+        "status": status,
+        "color": GOAL_COLORS[index % len(GOAL_COLORS)]
+    }
+
+def month_range(month: str):
+    """(start, end) datetimes for a YYYY-MM string, or None if it does not parse"""
+    try:
+        year, month_num = map(int, month.split("-"))
+        start_date = datetime(year, month_num, 1)
+        if month_num == 12:
+            end_date = datetime(year + 1, 1, 1)
+        else:
+            end_date = datetime(year, month_num + 1, 1)
+        return start_date, end_date
+    except ValueError:
+        return None
+
+
+def fetch_recent_purchases_helper(user_id: int, db: Session, limit: int = 10):
+    """Helper function to fetch recent purchases"""
+    transactions = db.query(Transaction).options(
+        joinedload(Transaction.category)
+    ).filter(
+        Transaction.user_id == user_id,
+    ).order_by(desc(Transaction.created_at)).limit(limit).all()
+    
+    return [
+        format_purchase(t.id, t.category_id, t.category.name if t.category else None, t.amount, t.created_at)
+        for t in transactions
+    ]
+
+def expense_totals_statement(user_id: int, month: str = None):
+    """
+    (name, id, total) per expense category, for one YYYY-MM month or all time.
+    Reads the monthly rollups when CATEGORY_ROLLUPS_ENABLED, otherwise sums
+    the raw transactions.
+    """
+    date_range = month_range(month) if month else None
+    
+    if settings.CATEGORY_ROLLUPS_ENABLED:
+        statement = select(
+            Category.name.label("name"),
+            Category.id.label("id"),
+            func.sum(MonthlyCategoryRollup.total).label("total")
+        ).join(
+            MonthlyCategoryRollup,
+            MonthlyCategoryRollup.category_id == Category.id
+        ).where(
+            MonthlyCategoryRollup.user_id == user_id,
+            MonthlyCategoryRollup.txn_count > 0,
+            Category.kind == "expense",
+        )
+        if date_range:
+            statement = statement.where(MonthlyCategoryRollup.month_start == date_range[0].date())
+    else:
+        statement = select(
+            Category.name.label("name"),
+            Category.id.label("id"),
+            func.sum(Transaction.amount).label("total")
+        ).join(
+            Transaction,
+            Transaction.category_id == Category.id
+        ).where(
+            Transaction.user_id == user_id,
+            Category.kind == "expense",
+        )
+        if date_range:
+            statement = statement.where(
+                Transaction.created_at >= date_range[0],
+                Transaction.created_at < date_range[1]
+            )
+    
+    return statement.group_by(Category.id, Category.name)
+
+def fetch_expense_categories_helper(user_id: int, db: Session, month: str = None):
+    """Helper function to fetch expense categories"""
+    results = db.execute(expense_totals_statement(user_id, month)).all()
+    return format_expense_categories((name, total) for name, _, total in results)
+
 def fetch_user_goals_helper(user_id: int, db: Session):
     """Helper function to fetch user goals"""
     goals = db.query(Goal).filter(Goal.user_id == user_id).all()
     
-    goal_colors = [
-        "#36A2EB", "#FF6384", "#FFCE56", "#4BC0C0", "#9966FF",
-        "#FF9F40", "#C9CBCF", "#7D5BA6", "#89CE94", "#643173",
-    ]
-    
     return [
-        {
-            "id": g.id,
-            "name": g.name,
-            "target": g.target_amount,
-            "current": g.current_amount,
-            "type": g.type,
-            "status": g.status,
-            "color": goal_colors[i % len(goal_colors)]
-        }
+        format_goal(g.id, g.name, g.target_amount, g.current_amount, g.type, g.status, i)
         for i, g in enumerate(goals)
     ]
 
+def _null(type_):
+    # Typed NULLs so every branch of the UNION agrees on column types
+    return cast(null(), type_)
+
+def build_summary_statement(user_id: int, month: str, recent_limit: int = 10):
+    """
+    One UNION ALL statement for the whole personal dashboard: recent
+    transactions joined to their category, the month's expense totals,
+    the goals and the profile name. Rows are tagged with their section.
+    """
+    recent = select(
+        literal("recent").label("section"),
+        Transaction.id.label("id"),
+        Category.name.label("name"),
+        Transaction.category_id.label("category_id"),
+        Transaction.amount.label("amount"),
+        _null(Float).label("current"),
+        _null(String).label("kind"),
+        _null(String).label("status"),
+        Transaction.created_at.label("created_at"),
+    ).select_from(Transaction).outerjoin(
+        Category, Category.id == Transaction.category_id
+    ).where(
+        Transaction.user_id == user_id
+    ).order_by(desc(Transaction.created_at)).limit(recent_limit).subquery()
+
+    totals = expense_totals_statement(user_id, month).subquery()
+    categories = select(
+        literal("category"),
+        totals.c.id,
+        totals.c.name,
+        totals.c.id,
+        totals.c.total,
+        _null(Float),
+        _null(String),
+        _null(String),
+        _null(TIMESTAMP),
+    )
+
+    goals = select(
+        literal("goal"),
+        Goal.id,
+        Goal.name,
+        _null(Integer),
+        Goal.target_amount,
+        Goal.current_amount,
+        Goal.type,
+        Goal.status,
+        _null(TIMESTAMP),
+    ).where(Goal.user_id == user_id)
+
+    profile = select(
+        literal("profile"),
+        Profile.id,
+        Profile.display_name,
+        _null(Integer),
+        _null(Float),
+        _null(Float),
+        _null(String),
+        _null(String),
+        _null(TIMESTAMP),
+    ).where(Profile.user_id == user_id)
+
+    return union_all(select(*recent.c), categories, goals, profile)
+
+def fetch_dashboard_summary_helper(user: User, db: Session, month: str):
+    """Summary payload from a single round-trip"""
+    rows = db.execute(build_summary_statement(user.id, month)).all()
+
+    recent = sorted((r for r in rows if r.section == "recent"),
+                    key=lambda r: (r.created_at is not None, r.created_at), reverse=True)
+    goal_rows = sorted((r for r in rows if r.section == "goal"), key=lambda r: r.id)
+    category_rows = sorted((r for r in rows if r.section == "category"), key=lambda r: r.id)
+    profile = next((r for r in rows if r.section == "profile"), None)
+
+    user_name = ""
+    if profile and profile.name:
+        user_name = profile.name
+    elif user.email:
+        user_name = user.email.split('@')[0]
+
+    return {
+        "recent_purchases": [
+            format_purchase(r.id, r.category_id, r.name, r.amount, r.created_at) for r in recent
+        ],
+        "expense_categories": format_expense_categories((r.name, r.amount) for r in category_rows),
+        "goals": [
+            format_goal(r.id, r.name, r.amount, r.current, r.kind, r.status, i)
+            for i, r in enumerate(goal_rows)
+        ],
+        "user_name": user_name
+    }
+
 
 @router.get("/recent-purchases")
 def get_recent_purchases_endpoint(
@@ -214,26 +365,28 @@ def get_dashboard_summary(
     db: Session = Depends(get_db)
 ):
     """Get all dashboard data in one endpoint"""
-    
-    recent_purchases = fetch_recent_purchases_helper(user.id, db, limit=10)
     current_month = datetime.now().strftime("%Y-%m")
-    expense_categories = fetch_expense_categories_helper(user.id, db, month=current_month)
-    goals = fetch_user_goals_helper(user.id, db)
     
-    profile = db.query(Profile).filter(Profile.user_id == user.id).first()
-    user_name = ""
+    cached = summary_cache.get(user.id)
+    if cached and cached["month"] == current_month and cached["email"] == user.email:
+        return cached["summary"]
     
-    if profile and profile.display_name:
-        user_name = profile.display_name
-    elif user.email:
-        user_name = user.email.split('@')[0]
+    summary = fetch_dashboard_summary_helper(user, db, current_month)
+    summary_cache.set(user.id, {"month": current_month, "email": user.email, "summary": summary})
+    return summary
+
+
+def get_business_context(user: User, db: Session) -> dict:
+    """The caller's business context (admin, name, members), from the shared cache"""
+    business_id = user.business_id
+    if not business_id:
+        raise HTTPException(status_code=400, detail="User is not associated with a business")
     
-    return {
-        "recent_purchases": recent_purchases,
-        "expense_categories": expense_categories,
-        "goals": goals,
-        "user_name": user_name
-    }
+    context = business_contexts.get(db, business_id)
+    if not context:
+        raise HTTPException(status_code=404, detail="Business admin not found")
+    
+    return context
 
 
 @router.get("/business/summary")
@@ -245,68 +398,36 @@ def get_business_dashboard_summary(
     
     print(f"=== BUSINESS DASHBOARD FOR USER {user.id} ===")
     
-    # Get profile
-    profile = db.query(Profile).filter(Profile.user_id == user.id).first()
-    
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    
-    business_id = user.business_id
-    if not business_id:
-        raise HTTPException(status_code=400, detail="User is not associated with a business")
+    context = get_business_context(user, db)
     
-    print(f"Business ID: {business_id}")
-    
-    # Get the business admin user for this business
-    admin_user = db.query(User).filter(
-        User.business_id == business_id,
-        User.role_id == 2  # business_admin role
-    ).first()
-    
-    if not admin_user:
-        raise HTTPException(status_code=404, detail="Business admin not found")
-    
-    print(f"Using business admin user_id: {admin_user.id} for data")
+    # Every member of the business shares one cached summary
+    return business_contexts.payload(
+        context["business_id"], "summary", lambda: build_business_summary(context, db)
+    )
+
+
+def build_business_summary(context: dict, db: Session) -> dict:
+    """Business dashboard payload, built from the admin's data"""
+    print(f"Business ID: {context['business_id']}")
+    print(f"Using business admin user_id: {context['admin_user_id']} for data")
     
     # USE ADMIN'S USER_ID FOR ALL DATA QUERIES
-    target_user_id = admin_user.id
+    target_user_id = context["admin_user_id"]
     
-    # Business category IDs
-    business_income_ids = [17, 18, 19, 20, 21]
-    business_expense_ids = [22, 23, 24, 25, 26, 27, 28, 29, 30]
+    # Totals, quarters and recent items in two queries
+    figures = business_figures.load(db, target_user_id)
     
-    print(f"Business income category IDs: {business_income_ids}")
-    print(f"Business expense category IDs: {business_expense_ids}")
-    
-    # Get TOTAL BUDGET from budget_entries
-    budget_entry = db.query(BudgetEntry).filter(
-        BudgetEntry.user_id == target_user_id
-    ).first()
-    
-    if budget_entry:
-        total_budget = float(budget_entry.planned)
+    if figures["budget_total"] is not None:
+        total_budget = figures["budget_total"]
         print(f"Budget from budget_entries: ${total_budget}")
     else:
         # Just use default budget
-        total_budget = 60000.0
+        total_budget = DEFAULT_BUSINESS_BUDGET
         print(f"Using default budget: ${total_budget}")
     
-    # Calculate TOTAL EXPENSES
-    expense_result = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_expense_ids)
-    ).scalar()
-    
-    total_expenses = abs(float(expense_result)) if expense_result else 0.0
+    total_expenses = figures["total_expenses"]
+    total_income = figures["total_income"]
     print(f"Total Expenses: ${total_expenses}")
-    
-    # Calculate TOTAL INCOME
-    income_result = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_income_ids)
-    ).scalar()
-    
-    total_income = float(income_result) if income_result else 0.0
     print(f"Total Income: ${total_income}")
     
     # Budget used = total expenses
@@ -315,75 +436,35 @@ def get_business_dashboard_summary(
     
     print(f"Budget: ${budget_used:.2f} used / ${total_budget:.2f} total = {budget_percentage:.1f}%")
     
-    # Get current year
-    current_year = datetime.now().year
-    
-    # QUARTERLY INCOME DATA
-    quarterly_income_data = db.query(
-        func.floor((extract('month', Transaction.created_at) - 1) / 3).label('quarter_num'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_income_ids),
-        extract('year', Transaction.created_at) == current_year
-    ).group_by('quarter_num').all()
-    
-    # Build quarterly income array
-    quarterly_income = [
-        {"quarter": "Q1", "amount": 0.0},
-        {"quarter": "Q2", "amount": 0.0},
-        {"quarter": "Q3", "amount": 0.0},
-        {"quarter": "Q4", "amount": 0.0}
-    ]
+    current_year = figures["year"]
     
-    for q_num, total in quarterly_income_data:
-        if q_num is not None and 0 <= int(q_num) <= 3:
-            quarterly_income[int(q_num)]["amount"] = float(total) if total else 0.0
+    def quarter_amounts(year, kind):
+        amounts = figures["quarters"][year][kind]
+        return [
+            {"quarter": f"Q{i + 1}", "amount": abs(amount) if kind == "expense" else amount}
+            for i, amount in enumerate(amounts)
+        ]
     
+    quarterly_income = quarter_amounts(current_year, "income")
+    quarterly_expenses = quarter_amounts(current_year, "expense")
     print(f"Quarterly Income: {quarterly_income}")
-    
-    # QUARTERLY EXPENSE DATA
-    quarterly_expense_data = db.query(
-        func.floor((extract('month', Transaction.created_at) - 1) / 3).label('quarter_num'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_expense_ids),
-        extract('year', Transaction.created_at) == current_year
-    ).group_by('quarter_num').all()
-    
-    # Build quarterly expense array
-    quarterly_expenses = [
-        {"quarter": "Q1", "amount": 0.0},
-        {"quarter": "Q2", "amount": 0.0},
-        {"quarter": "Q3", "amount": 0.0},
-        {"quarter": "Q4", "amount": 0.0}
-    ]
-    
-    for q_num, total in quarterly_expense_data:
-        if q_num is not None and 0 <= int(q_num) <= 3:
-            quarterly_expenses[int(q_num)]["amount"] = abs(float(total)) if total else 0.0
-    
     print(f"Quarterly Expenses: {quarterly_expenses}")
     
-    # Get recent income transactions
-    recent_income = db.query(Transaction).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_income_ids)
-    ).order_by(desc(Transaction.created_at)).limit(10).all()
-    
-    # Get recent expense transactions
-    recent_expenses = db.query(Transaction).filter(
-        Transaction.user_id == target_user_id,
-        Transaction.category_id.in_(business_expense_ids)
-    ).order_by(desc(Transaction.created_at)).limit(10).all()
+    # Year over year, comparing the same months of both years
+    through_month = datetime.now().month if current_year == datetime.now().year else 12
+    income_ytd = business_figures.year_to_date(figures["months"], "income", current_year, through_month)
+    income_prev_ytd = business_figures.year_to_date(figures["months"], "income", current_year - 1, through_month)
+    expense_ytd = abs(business_figures.year_to_date(figures["months"], "expense", current_year, through_month))
+    expense_prev_ytd = abs(business_figures.year_to_date(figures["months"], "expense", current_year - 1, through_month))
     
+    recent_income = figures["recent_income"]
+    recent_expenses = figures["recent_expenses"]
     print(f"Recent transactions: {len(recent_income)} income, {len(recent_expenses)} expenses")
     
     # Format income for frontend
     formatted_income = []
     for trans in recent_income:
-        category_name = trans.category.name if trans.category else f"Income Category {trans.category_id}"
+        category_name = trans.category_name or f"Income Category {trans.category_id}"
         formatted_income.append({
             "id": trans.id,
             "description": category_name,
@@ -394,7 +475,7 @@ def get_business_dashboard_summary(
     # Format expenses for frontend
     formatted_expenses = []
     for trans in recent_expenses:
-        category_name = trans.category.name if trans.category else f"Expense Category {trans.category_id}"
+        category_name = trans.category_name or f"Expense Category {trans.category_id}"
         formatted_expenses.append({
             "id": trans.id,
             "description": category_name,
@@ -412,12 +493,21 @@ def get_business_dashboard_summary(
         "expenseData": quarterly_expenses,
         "recentIncome": formatted_income,
         "recentExpenses": formatted_expenses,
-        "business_name": profile.business_name or "Business",
+        "business_name": context["business_name"] or "Business",
         "stats": {
             "total_income": float(total_income),
             "total_expenses": float(total_expenses),
             "net_profit": float(total_income - total_expenses),
             "budget_percentage": float(budget_percentage)
+        },
+        "yearOverYear": {
+            "year": current_year,
+            "previous_year": current_year - 1,
+            "through_month": through_month,
+            "incomeData": quarter_amounts(current_year - 1, "income"),
+            "expenseData": quarter_amounts(current_year - 1, "expense"),
+            "income_change_pct": percent_change(income_ytd, income_prev_ytd),
+            "expense_change_pct": percent_change(expense_ytd, expense_prev_ytd)
         }
     }
     
@@ -440,25 +530,21 @@ def get_business_goals(
     
     print(f"=== FETCHING BUSINESS GOALS FOR USER {user.id} ===")
     
-    # Get business_id
-    business_id = user.business_id
-    if not business_id:
-        raise HTTPException(status_code=400, detail="User is not associated with a business")
+    context = get_business_context(user, db)
     
-    # Find the business admin for this business
-    admin_user = db.query(User).filter(
-        User.business_id == business_id,
-        User.role_id == 2  # business_admin role
-    ).first()
-    
-    if not admin_user:
-        raise HTTPException(status_code=404, detail="Business admin not found")
-    
-    print(f"Using business admin user_id: {admin_user.id} for goals")
+    # Every member of the business shares one cached goal list
+    return business_contexts.payload(
+        context["business_id"], "goals", lambda: build_business_goals(context, db)
+    )
+
+
+def build_business_goals(context: dict, db: Session) -> list:
+    """Business goals formatted for the frontend"""
+    print(f"Using business admin user_id: {context['admin_user_id']} for goals")
     
     # Get all business goals for the admin
     goals = db.query(Goal).filter(
-        Goal.user_id == admin_user.id,
+        Goal.user_id == context["admin_user_id"],
         Goal.type == "business"
     ).all()
     
@@ -535,23 +621,12 @@ def create_business_goal(
 ):
     """Create a new business goal"""
     
-    # Get business_id
-    business_id = user.business_id
-    if not business_id:
-        raise HTTPException(status_code=400, detail="User is not associated with a business")
-    
-    # Find the business admin
-    admin_user = db.query(User).filter(
-        User.business_id == business_id,
-        User.role_id == 2
-    ).first()
-    
-    if not admin_user:
-        raise HTTPException(status_code=404, detail="Business admin not found")
+    context = get_business_context(user, db)
+    admin_user_id = context["admin_user_id"]
     
     # Create goal for the admin (shared across business)
     new_goal = Goal(
-        user_id=admin_user.id,
+        user_id=admin_user_id,
         name=goal_data.get("name"),
         type="business",
         target_amount=float(goal_data.get("amount")),
@@ -577,24 +652,13 @@ def update_business_goal(
 ):
     """Update a business goal"""
     
-    # Get business_id
-    business_id = user.business_id
-    if not business_id:
-        raise HTTPException(status_code=400, detail="User is not associated with a business")
-    
-    # Find the business admin
-    admin_user = db.query(User).filter(
-        User.business_id == business_id,
-        User.role_id == 2
-    ).first()
-    
-    if not admin_user:
-        raise HTTPException(status_code=404, detail="Business admin not found")
+    context = get_business_context(user, db)
+    admin_user_id = context["admin_user_id"]
     
     # Get the goal
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
-        Goal.user_id == admin_user.id
+        Goal.user_id == admin_user_id
     ).first()
     
     if not goal:
@@ -630,24 +694,13 @@ def delete_business_goal(
 ):
     """Delete a business goal"""
     
-    # Get business_id
-    business_id = user.business_id
-    if not business_id:
-        raise HTTPException(status_code=400, detail="User is not associated with a business")
-    
-    # Find the business admin
-    admin_user = db.query(User).filter(
-        User.business_id == business_id,
-        User.role_id == 2
-    ).first()
-    
-    if not admin_user:
-        raise HTTPException(status_code=404, detail="Business admin not found")
+    context = get_business_context(user, db)
+    admin_user_id = context["admin_user_id"]
     
     # Get the goal
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
-        Goal.user_id == admin_user.id
+        Goal.user_id == admin_user_id
     ).first()
     
     if not goal:
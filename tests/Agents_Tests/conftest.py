@@ -0,0 +1,15 @@
+import os
+import sys
+
+# -------------------------------
+# Set required env vars for tests
+# -------------------------------
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+# --------------------------------
+# Add project root to Python path
+# --------------------------------
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,76 @@
+#test_answer_renderer.py
+from datetime import date
+from decimal import Decimal
+from agents.answer_renderer import AnswerRenderer
+
+
+def test_scalar_results():
+    renderer = AnswerRenderer()
+
+    spent = {"columns": ["total_spent"], "data": [(Decimal("-1234.5"),)]}
+    assert renderer.render(spent, "how much did I spend this month") == "Your total expenses were $1,234.50."
+
+    income = {"columns": ["total_income"], "data": [(2500.0,)]}
+    assert renderer.render(income, "what is my income") == "Your total income was $2,500.00."
+
+    business = {"columns": ["business_name"], "data": [("ABC Corporation",)]}
+    assert renderer.render(business, "what business am I in") == "Business name: ABC Corporation"
+
+    empty_sum = {"columns": ["total_spent"], "data": [(None,)]}
+    assert renderer.render(empty_sum, "how much did I spend") == "No information found for your query."
+
+
+def test_single_row_and_table_results():
+    renderer = AnswerRenderer()
+
+    row = {"columns": ["display_name", "role_name"], "data": [("Sam", "personal_user")]}
+    assert renderer.render(row, "show my profile") == "Here is what I found: Display name: Sam, Role name: personal_user."
+
+    expenses = {
+        "columns": ["amount", "category_name", "created_at"],
+        "data": [(-12.5, "Food & Dining", date(2024, 3, 1)), (-40, "Transportation", date(2024, 3, 2))]
+    }
+    assert renderer.render(expenses, "show my expenses") == (
+        "Found 2 records:\n"
+        "- -$12.50 · Food & Dining · 2024-03-01\n"
+        "- -$40.00 · Transportation · 2024-03-02"
+    )
+
+
+def test_ambiguous_results_need_the_llm():
+    renderer = AnswerRenderer()
+
+    by_category = {"columns": ["category_name", "total"], "data": [("Food & Dining", -300), ("Housing", -1200)]}
+    assert renderer.render(by_category, "which category did I spend the most on") is None
+
+
+def test_structured_mode():
+    renderer = AnswerRenderer()
+    expenses = {"columns": ["amount", "created_at"], "data": [(Decimal("-12.50"), date(2024, 3, 1))] * 3}
+
+    assert renderer.render(expenses, "how much did I spend per day", structured=True) == "Found 3 records matching your query."
+    assert renderer.structure(expenses) == {
+        "columns": ["amount", "created_at"],
+        "rows": [[-12.5, "2024-03-01"]] * 3,
+        "rowcount": 3,
+        "truncated": False
+    }
+
+
+def test_streamed_view_answer_carries_the_table_in_structured_mode():
+    from types import SimpleNamespace
+    from agents.query_runner import QueryRunner
+
+    runner = QueryRunner(llm=SimpleNamespace(model="fake"))
+    raw_data = {"columns": ["amount", "created_at"], "data": [(Decimal("-12.50"), date(2024, 3, 1))] * 3, "rowcount": 3}
+    runner._check_user_llm_access = lambda user_id: {"has_access": True}
+    runner._prepare_sql_query = lambda user_query, user_id: ("SELECT amount, created_at FROM llm_transaction_summary", None, user_query)
+    runner._run_sql_query = lambda *args: raw_data
+    runner._store_extracted_values = lambda *args: None
+
+    events = list(runner.stream_natural_language_query("how much did I spend per day", 1, structured=True))
+
+    answer = events[-1]["data"]
+    assert events[-1]["event"] == "answer"
+    assert answer["table"] == runner.renderer.structure(raw_data)
+    assert "table" not in list(runner.stream_natural_language_query("how much did I spend per day", 1))[-1]["data"]
@@ -0,0 +1,114 @@
+import pytest
+from contextlib import contextmanager
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from agents import data_handler
+from agents.data_handler import DataHandler
+from agents.pending_store import MemoryPendingStore
+from backend.database import rollups
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """A throwaway database with two users' transactions, used as the handler's agent_session"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'transactions.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE transactions (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                          "category_id INTEGER, amount FLOAT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"))
+        conn.execute(text("INSERT INTO transactions (id, user_id, category_id, amount, created_at) "
+                          "VALUES (:id, :user_id, 10, :amount, :created_at)"),
+                     [{"id": i, "user_id": 1 if i <= 8 else 2, "amount": -float(i),
+                       "created_at": f"2026-{9 + i % 2:02d}-15 12:00:00"} for i in range(1, 11)])
+        conn.execute(text("CREATE TABLE monthly_category_rollups (user_id INTEGER, month_start DATE, category_id INTEGER, "
+                          "total FLOAT NOT NULL, txn_count INTEGER NOT NULL, PRIMARY KEY (user_id, month_start, category_id))"))
+        rollups.rebuild(conn)
+
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def throwaway_session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(data_handler, "agent_session", throwaway_session)
+    yield engine
+    engine.dispose()
+
+
+def _rollups_match_transactions(engine):
+    with engine.connect() as conn:
+        kept = conn.execute(text("SELECT user_id, month_start, category_id, total, txn_count "
+                                 "FROM monthly_category_rollups WHERE txn_count > 0 ORDER BY 1, 2, 3")).fetchall()
+        fresh = conn.execute(text("SELECT user_id, date(created_at, 'start of month'), category_id, SUM(amount), COUNT(*) "
+                                  "FROM transactions GROUP BY 1, 2, 3 ORDER BY 1, 2, 3")).fetchall()
+    return [tuple(row) for row in kept] == [tuple(row) for row in fresh]
+
+
+def _handler():
+    handler = DataHandler(llm=SimpleNamespace(model="fake"), query_runner=SimpleNamespace())
+    handler.pending_deletes = MemoryPendingStore()
+    handler.log_interaction = lambda **kwargs: None
+    return handler
+
+
+def test_confirm_deletes_only_the_previewed_rows(engine):
+    handler = _handler()
+
+    staged = handler._complete_delete("DELETE FROM transactions WHERE user_id = 1 AND amount < -5", "delete big ones", 1)
+    assert staged["status"] == "CONFIRM_REQUIRED"
+    assert staged["preview"]["ids"] == [6, 7, 8]
+    assert staged["preview"]["record_count"] == 3
+
+    # A row added after the preview matches the original statement but was never shown
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO transactions (id, user_id, category_id, amount) VALUES (11, 1, 10, -50)"))
+
+    result = handler.confirm_delete(1, staged["confirmation_id"])
+
+    assert result["status"] == "COMPLETE" and result["rows_deleted"] == 3
+    with engine.connect() as conn:
+        remaining = [row[0] for row in conn.execute(text("SELECT id FROM transactions WHERE user_id = 1 ORDER BY id"))]
+    assert remaining == [1, 2, 3, 4, 5, 11]
+
+
+def test_agent_writes_keep_the_category_rollups_in_step(engine):
+    handler = _handler()
+
+    created = handler._complete_create(
+        "INSERT INTO transactions (user_id, category_id, amount) VALUES (1, 10, -4.5), (1, 10, -5.5);", "add two", 1
+    )
+    assert created["status"] == "COMPLETE"
+    assert "2 rows affected" in created["message"]
+    assert _rollups_match_transactions(engine)
+
+    staged = handler._complete_delete("DELETE FROM transactions WHERE user_id = 1 AND amount < -5", "delete big ones", 1)
+    assert handler.confirm_delete(1, staged["confirmation_id"])["status"] == "COMPLETE"
+    assert _rollups_match_transactions(engine)
+
+
+def test_oversized_deletes_are_refused(engine, monkeypatch):
+    monkeypatch.setattr(data_handler.settings, "PENDING_DELETE_MAX_ROWS", 5, raising=False)
+    handler = _handler()
+
+    result = handler._complete_delete("DELETE FROM transactions WHERE user_id = 1", "delete everything", 1)
+
+    assert result["status"] == "ERROR"
+    assert "8 records match" in result["message"]
+    assert handler.pending_deletes.list(1) == {}
+
+
+def test_limited_delete_is_not_refused_for_a_large_match(engine, monkeypatch):
+    monkeypatch.setattr(data_handler.settings, "PENDING_DELETE_MAX_ROWS", 5, raising=False)
+    handler = _handler()
+
+    staged = handler._complete_delete(
+        "DELETE FROM transactions WHERE user_id = 1 ORDER BY created_at DESC, id DESC LIMIT 1", "delete my last one", 1
+    )
+
+    assert staged["status"] == "CONFIRM_REQUIRED"
+    assert staged["preview"]["ids"] == [7]
+    assert staged["preview"]["record_count"] == 1
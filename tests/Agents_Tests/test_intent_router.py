@@ -0,0 +1,43 @@
+#test_intent_router.py
+from agents.intent_classifier import IntentClassifier
+
+
+def get_router():
+    return IntentClassifier().intent_router
+
+
+def test_obvious_queries_skip_llm():
+    router = get_router()
+
+    expected = {
+        "show my expenses": "VIEW",
+        "how much did I spend this month": "VIEW",
+        "what is my balance": "VIEW",
+        "delete my last transaction": "DELETE",
+        "I spent $60 on shoes": "CREATE",
+        "add $75 dinner expense": "CREATE",
+        "change grocery budget to $600": "UPDATE",
+    }
+
+    for query, intent in expected.items():
+        route = router.route(query)
+        assert route["intent"] == intent, query
+        assert route["confident"], query
+        assert router.min_route_score <= route["route_score"] <= 1, query
+
+
+def test_ambiguous_queries_fall_back_to_llm():
+    router = get_router()
+
+    for query in ["can you help me with my finances", "groceries", "remove or show my expenses"]:
+        assert not router.route(query)["confident"], query
+
+
+def test_hit_miss_counters():
+    router = get_router()
+
+    router.route("show my expenses")
+    router.route("groceries")
+    router.record_hit()
+
+    assert router.stats() == {"hits": 2, "misses": 1, "hit_rate": 0.667}
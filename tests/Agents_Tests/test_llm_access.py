@@ -0,0 +1,44 @@
+#test_llm_access.py
+from contextlib import contextmanager
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from agents import query_runner
+from agents.query_runner import QueryRunner
+from backend.core.llm_access import role_cache
+
+
+def test_role_lookup_is_cached_per_user(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'roles.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE roles (id INTEGER PRIMARY KEY, role_name TEXT, permission_level INTEGER)"))
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, role_id INTEGER)"))
+        conn.execute(text("INSERT INTO roles VALUES (1, 'personal_user', 1), (2, 'business_subuser', 1)"))
+        conn.execute(text("INSERT INTO users VALUES (10, 1), (11, 2)"))
+
+    Session = sessionmaker(bind=engine)
+
+    @contextmanager
+    def throwaway_session():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(query_runner, "agent_session", throwaway_session)
+    role_cache.clear()
+    runner = QueryRunner(llm=SimpleNamespace(model="fake"))
+
+    assert runner._check_user_llm_access(10)["has_access"]
+    assert not runner._check_user_llm_access(11)["has_access"]
+    assert runner._check_user_llm_access(99)["message"] == "User not found."
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE users"))
+
+    # Served from the cache without touching the (now missing) table
+    assert runner._check_user_llm_access(10)["has_access"]
+    assert "sub-users" in runner._check_user_llm_access(11)["message"]
+    role_cache.clear()
+    engine.dispose()
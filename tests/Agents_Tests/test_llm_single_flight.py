@@ -0,0 +1,92 @@
+#test_llm_single_flight.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from agents.llm_client import TracedLLM
+
+
+class SlowOllama:
+    model = "fake"
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def _result(self, prompt):
+        generation = SimpleNamespace(text=f"answer to {prompt}", generation_info={"eval_count": 3})
+        return SimpleNamespace(generations=[[generation]])
+
+    def generate(self, prompts):
+        with self._lock:
+            self.prompts.extend(prompts)
+        time.sleep(self.delay)
+        return self._result(prompts[0])
+
+    async def agenerate(self, prompts):
+        self.prompts.extend(prompts)
+        await asyncio.sleep(self.delay)
+        return self._result(prompts[0])
+
+
+def test_concurrent_identical_prompts_share_one_generation():
+    ollama = SlowOllama()
+    llm = TracedLLM(ollama)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        answers = list(pool.map(llm.invoke, ["same prompt"] * 5 + ["other prompt"]))
+
+    assert answers == ["answer to same prompt"] * 5 + ["answer to other prompt"]
+    assert sorted(ollama.prompts) == ["other prompt", "same prompt"]
+    assert llm.stats() == {"single_flight": True, "generations": 2, "coalesced": 4}
+
+
+def test_async_waiters_survive_a_cancelled_caller():
+    ollama = SlowOllama()
+    llm = TracedLLM(ollama)
+
+    async def run():
+        first = asyncio.ensure_future(llm.ainvoke("same prompt"))
+        others = [asyncio.ensure_future(llm.ainvoke("same prompt")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.gather(*others)
+
+    assert asyncio.run(run()) == ["answer to same prompt"] * 3
+    assert ollama.prompts == ["same prompt"]
+
+
+def test_single_flight_can_be_disabled():
+    ollama = SlowOllama(delay=0.01)
+    llm = TracedLLM(ollama, single_flight=False)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(llm.invoke, ["same prompt"] * 3))
+
+    assert len(ollama.prompts) == 3
+
+
+def test_waiters_fail_cleanly_when_the_leader_is_interrupted():
+    class InterruptedOllama(SlowOllama):
+        def generate(self, prompts):
+            time.sleep(self.delay)
+            raise KeyboardInterrupt
+
+    llm = TracedLLM(InterruptedOllama())
+    errors = []
+
+    def call():
+        try:
+            llm.invoke("same prompt")
+        except BaseException as e:
+            errors.append(type(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(errors, key=lambda e: e.__name__) == [KeyboardInterrupt, RuntimeError, RuntimeError]
@@ -0,0 +1,64 @@
+#test_pending_store.py
+import time
+import pytest
+from datetime import datetime
+from sqlalchemy import text
+from agents.pending_store import PendingOperationStore, MemoryPendingStore, DatabasePendingStore
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        PendingOperationStore()
+
+
+def test_memory_store_purges_only_expired_entries():
+    store = MemoryPendingStore(ttl_seconds=60)
+    store.put(1, "keep", {"sql_query": "DELETE FROM transactions WHERE user_id = 1"})
+
+    store.ttl_seconds = 0
+    store.put(2, "old", {"sql_query": "DELETE FROM transactions WHERE user_id = 2"})
+
+    assert store.list(2) == {}
+    assert store.purge_expired() == 0  # already purged by put()
+    assert list(store.list(1)) == ["keep"]
+    assert store.pop(1, "keep")["sql_query"].endswith("user_id = 1")
+    assert store.pop(1, "keep") is None
+
+
+def test_database_store_is_shared_between_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pending.db'}"
+    worker_a = DatabasePendingStore(url=url, ttl_seconds=60)
+    worker_b = DatabasePendingStore(url=url, ttl_seconds=60)
+
+    created_at = datetime(2024, 3, 1, 12, 30)
+    worker_a.put(7, "abc123", {"sql_query": "DELETE FROM transactions WHERE user_id = 7",
+                               "preview": {"record_count": 1}, "created_at": created_at})
+
+    assert list(worker_b.list(7)) == ["abc123"]
+    assert worker_b.list(8) == {}
+
+    claimed = worker_b.pop(7, "abc123")
+    assert claimed["preview"]["record_count"] == 1
+    assert claimed["created_at"] == created_at
+    # Confirmation can only be claimed once, by any worker
+    assert worker_a.pop(7, "abc123") is None
+
+
+def test_database_store_ignores_expired_operations(tmp_path):
+    store = DatabasePendingStore(url=f"sqlite:///{tmp_path / 'pending.db'}", ttl_seconds=0)
+    store.put(3, "gone", {"sql_query": "DELETE FROM transactions WHERE user_id = 3"})
+    time.sleep(0.01)
+
+    assert store.pop(3, "gone") is None
+    assert store.pop_all(3) == {}
+
+
+def test_separate_store_database_is_created_by_the_migration(tmp_path):
+    store = DatabasePendingStore(url=f"sqlite:///{tmp_path / 'pending.db'}", ttl_seconds=60)
+
+    with store.engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))]
+        indexes = {row[0] for row in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'pending_operations'"))}
+    assert versions == [2]
+    assert {"ix_pending_operations_user_id", "ix_pending_operations_expires_at"} <= indexes
@@ -0,0 +1,44 @@
+#test_pipeline_modes.py
+from agents.query_runner import QueryRunner
+
+
+class RecordingLLM:
+    model = "fake"
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if "enhancing a financial query" in prompt:
+            return "show total spending in Food & Dining"
+        return "SELECT SUM(amount) FROM llm_transaction_summary WHERE user_id = 1 AND category_name = 'Food & Dining'"
+
+
+def get_runner():
+    llm = RecordingLLM()
+    runner = QueryRunner(llm=llm)
+    runner._get_schema_info = lambda: "schema"
+    return runner, llm
+
+
+def test_two_call_mode_enhances_then_generates():
+    runner, llm = get_runner()
+
+    sql, params, enhanced = runner._prepare_sql_query("groceries total", 1, pipeline_mode="two_call")
+
+    assert len(llm.prompts) == 2
+    assert enhanced == "show total spending in Food & Dining"
+    assert sql.startswith("SELECT SUM(amount)")
+
+
+def test_single_call_mode_uses_one_prompt_with_category_mapping():
+    runner, llm = get_runner()
+
+    sql, params, enhanced = runner._prepare_sql_query("groceries total", 1, pipeline_mode="single_call")
+
+    assert len(llm.prompts) == 1
+    assert "CATEGORY NAME MAPPING" in llm.prompts[0]
+    assert '"groceries total"' in llm.prompts[0]
+    assert enhanced == "groceries total"
+    assert sql.startswith("SELECT SUM(amount)")
@@ -0,0 +1,69 @@
+#test_pipeline_trace.py
+import asyncio
+from types import SimpleNamespace
+from agents.llm_client import TracedLLM
+from agents.pipeline_trace import PipelineTrace, trace_stage
+
+
+class FakeOllama:
+    model = "fake"
+    generation_info = {"prompt_eval_count": 120, "eval_count": 8, "eval_duration": 250000000}
+
+    def _result(self):
+        generation = SimpleNamespace(text="SELECT 1", generation_info=self.generation_info)
+        return SimpleNamespace(generations=[[generation]])
+
+    def generate(self, prompts):
+        return self._result()
+
+    async def agenerate(self, prompts):
+        return self._result()
+
+
+def test_stage_records_timing_and_ollama_counts():
+    llm = TracedLLM(FakeOllama())
+    trace = PipelineTrace()
+
+    with trace.activated():
+        with trace_stage("generate_sql"):
+            assert llm.invoke("prompt text") == "SELECT 1"
+        with trace_stage("execute_query"):
+            pass
+
+    timings = trace.to_dict()
+    generate_sql, execute_query = timings["stages"]
+
+    assert generate_sql["stage"] == "generate_sql"
+    assert generate_sql["llm_calls"] == 1
+    assert generate_sql["prompt_chars"] == len("prompt text")
+    assert generate_sql["prompt_tokens"] == 120
+    assert generate_sql["completion_tokens"] == 8
+    assert generate_sql["eval_seconds"] == 0.25
+    assert execute_query["stage"] == "execute_query"
+    assert "llm_calls" not in execute_query
+    assert llm.model == "fake"
+
+
+def test_concurrent_async_stages_do_not_mix():
+    llm = TracedLLM(FakeOllama())
+    trace = PipelineTrace()
+
+    async def stage(name, calls):
+        with trace_stage(name):
+            for _ in range(calls):
+                await llm.ainvoke(name)
+                await asyncio.sleep(0)
+
+    async def run():
+        with trace.activated():
+            await asyncio.gather(stage("classify_intent", 1), stage("enhance_query", 2))
+
+    asyncio.run(run())
+
+    calls = {s["stage"]: s["llm_calls"] for s in trace.to_dict()["stages"]}
+    assert calls == {"classify_intent": 1, "enhance_query": 2}
+
+
+def test_stages_are_ignored_without_a_trace():
+    with trace_stage("generate_sql") as stage:
+        assert stage is None
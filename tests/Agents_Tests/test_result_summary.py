@@ -0,0 +1,108 @@
+#test_result_summary.py
+from types import SimpleNamespace
+from sqlalchemy import text
+from agents.result_summary import fetch_preview_with_summary
+from agents.answer_renderer import AnswerRenderer
+
+
+class FakePostgresResult:
+    def __init__(self, keys, rows):
+        self._keys = keys
+        self._rows = rows
+
+    def keys(self):
+        return self._keys
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakePostgresSession:
+    """Returns preview rows with the summary columns the wrapper query appends"""
+
+    def __init__(self, keys, rows):
+        self.result = FakePostgresResult(keys, rows)
+        self.statements = []
+        self.execution_options = None
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def execute(self, statement, params=None, execution_options=None):
+        self.statements.append(str(statement))
+        self.execution_options = execution_options
+        return self.result
+
+
+def _seed_rows():
+    from backend.database.connection import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS summary_rows"))
+        conn.execute(text("CREATE TABLE summary_rows (id INTEGER, category TEXT, amount NUMERIC)"))
+        conn.execute(text("INSERT INTO summary_rows (id, category, amount) VALUES (:id, :category, :amount)"),
+                     [{"id": i, "category": "Food", "amount": -float(i)} for i in range(1, 101)])
+    return engine
+
+
+def test_postgres_summary_runs_in_one_statement():
+    numeric = {"amount": {"count": 100, "sum": -5050, "avg": -50.5}}
+    session = FakePostgresSession(
+        ["id", "amount", "__summary_row_number", "__summary_row_count", "__summary_numeric"],
+        [(1, -1, 1, 100, numeric), (2, -2, 2, 100, numeric)]
+    )
+
+    result = fetch_preview_with_summary(session, "SELECT id, amount FROM t WHERE note = '{x}';", None, 2)
+
+    assert len(session.statements) == 1
+    assert "SELECT id, amount FROM t WHERE note = '{x}'" in session.statements[0]
+    assert "LIMIT 2" in session.statements[0]
+    # The preview keeps the query's own order
+    assert "ROW_NUMBER() OVER ()" in session.statements[0]
+    assert "ORDER BY q.__summary_row_number" in session.statements[0]
+    assert session.execution_options == {"stream_results": True}
+    assert result["columns"] == ["id", "amount"]
+    assert result["data"] == [(1, -1), (2, -2)]
+    assert result["rowcount"] == 100 and result["truncated"]
+    assert result["summary"]["numeric"] == {"amount": {"count": 100, "sum": -5050.0, "avg": -50.5}}
+
+
+def test_only_preview_rows_are_kept():
+    engine = _seed_rows()
+
+    with engine.connect() as conn:
+        from sqlalchemy.orm import Session
+        with Session(bind=conn) as db:
+            result = fetch_preview_with_summary(db, "SELECT id, category, amount FROM summary_rows ORDER BY id", None, 5)
+
+    assert len(result["data"]) == 5
+    assert result["rowcount"] == 100 and result["truncated"]
+    assert result["summary"]["numeric"]["amount"] == {"count": 100, "sum": -5050.0, "avg": -50.5}
+    assert "category" not in result["summary"]["numeric"]
+
+
+def test_preview_keeps_the_query_order():
+    engine = _seed_rows()
+
+    with engine.connect() as conn:
+        from sqlalchemy.orm import Session
+        with Session(bind=conn) as db:
+            result = fetch_preview_with_summary(db, "SELECT id, amount FROM summary_rows ORDER BY id DESC", None, 3)
+
+    assert [row[0] for row in result["data"]] == [100, 99, 98]
+
+
+def test_query_runner_answers_from_summary():
+    from agents.query_runner import QueryRunner
+
+    _seed_rows()
+    runner = QueryRunner(llm=SimpleNamespace(model="fake"))
+    runner.preview_rows = 20
+
+    raw_data = runner.execute_summarized_query("SELECT id, amount FROM summary_rows ORDER BY id")
+    prompt_data = runner._format_data_for_extraction(raw_data)
+
+    assert len(raw_data["data"]) == 20
+    assert "... and 85 more rows" in prompt_data
+    assert "amount: 100 values, sum: -5050.00, avg: -50.50" in prompt_data
+    assert AnswerRenderer().structure(raw_data)["rowcount"] == 100
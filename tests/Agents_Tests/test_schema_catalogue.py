@@ -0,0 +1,37 @@
+#test_schema_catalogue.py
+from agents.schema_catalogue import SchemaCatalogue
+
+
+def make_catalogue(rows):
+    catalogue = SchemaCatalogue(check_interval_seconds=0)
+    catalogue._fetch_view_columns = lambda: list(rows)
+    return catalogue
+
+
+def test_catalogue_is_stable_until_fingerprint_changes():
+    rows = [("llm_transaction_summary", "amount", "numeric", "YES")]
+    catalogue = make_catalogue(rows)
+    versions = []
+    catalogue.add_listener(versions.append)
+
+    first = catalogue.get()
+    second = catalogue.get()
+
+    assert first is second
+    assert "VIEW: llm_transaction_summary" in first
+    assert "  - amount (numeric) (nullable)" in first
+    assert catalogue.version == 1
+
+    rows.append(("llm_transaction_summary", "category_name", "text", "NO"))
+    third = catalogue.get()
+
+    assert "  - category_name (text)" in third
+    assert catalogue.version == 2
+    assert versions == [1, 2]
+
+
+def test_refresh_forces_rebuild():
+    catalogue = make_catalogue([("llm_user_profile", "display_name", "text", "YES")])
+    catalogue.get()
+
+    assert catalogue.refresh() == 2
@@ -0,0 +1,62 @@
+#test_speculative_enhancement.py
+import asyncio
+import json
+from agents.intent_classifier import IntentClassifier
+
+
+class FakeAsyncLLM:
+    model = "fake"
+
+    def __init__(self, intent):
+        self.intent = intent
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, prompt):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.05)
+        self.in_flight -= 1
+        if "classify its intent" in prompt:
+            return json.dumps({"intent": self.intent, "confidence": 0.9, "reason": "test"})
+        return "show total spending on groceries"
+
+
+def get_classifier(intent):
+    llm = FakeAsyncLLM(intent)
+    classifier = IntentClassifier(llm=llm)
+    classifier.speculative_enhancement = True
+    classifier.query_runner._get_schema_info = lambda: "schema"
+    return classifier, llm
+
+
+def test_view_query_uses_speculative_enhancement():
+    classifier, llm = get_classifier("VIEW")
+    seen = {}
+
+    async def fake_query(user_query, user_id, enhanced_query=None, structured=False):
+        seen["enhanced_query"] = enhanced_query
+        return {"answer": "You spent $10.00", "sql": "SELECT 1"}
+
+    classifier.query_runner.aprocess_view_query = fake_query
+
+    result = asyncio.run(classifier.aclassify_intent("groceries", 1))
+
+    assert result["intent"] == "VIEW"
+    assert seen["enhanced_query"] == "show total spending on groceries"
+    assert llm.max_in_flight == 2
+    assert classifier.speculation_stats()["used"] == 1
+
+
+def test_non_view_query_discards_speculation():
+    classifier, llm = get_classifier("DELETE")
+
+    async def fake_delete(enhanced_query, original_user_query, user_id, session_id=''):
+        return {"status": "PENDING_CONFIRMATION", "sql": None, "message": "confirm"}
+
+    classifier.data_handler.aprocess_natural_language_delete = fake_delete
+
+    result = asyncio.run(classifier.aclassify_intent("groceries", 1))
+
+    assert result["intent"] == "DELETE"
+    assert classifier.speculation_stats() == {"enabled": True, "used": 0, "wasted": 1, "waste_rate": 1.0}
@@ -0,0 +1,72 @@
+#test_sql_guard.py
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import text
+from agents.sql_guard import SQLGuard, SQLGuardError
+
+
+class FakePostgresSession:
+    """Returns a canned EXPLAIN (FORMAT JSON) plan"""
+
+    def __init__(self, total_cost, plan_rows):
+        self.plan = [{"Plan": {"Total Cost": total_cost, "Plan Rows": plan_rows}}]
+        self.statements = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return SimpleNamespace(fetchone=lambda: (self.plan,))
+
+
+def test_row_cap_only_applies_to_plain_selects():
+    guard = SQLGuard(row_cap=50)
+
+    assert guard.apply_row_cap("SELECT amount FROM llm_transaction_summary WHERE user_id = 1;") == \
+        "SELECT amount FROM llm_transaction_summary WHERE user_id = 1 LIMIT 50"
+    assert guard.apply_row_cap("SELECT SUM(amount) FROM llm_transaction_summary") == \
+        "SELECT SUM(amount) FROM llm_transaction_summary"
+    assert guard.apply_row_cap("SELECT amount FROM llm_transaction_summary LIMIT 5") == \
+        "SELECT amount FROM llm_transaction_summary LIMIT 5"
+    assert guard.apply_row_cap("DELETE FROM transactions WHERE id = 1") == "DELETE FROM transactions WHERE id = 1"
+
+
+def test_expensive_plans_are_rejected():
+    guard = SQLGuard(max_plan_cost=1000, max_plan_rows=500)
+
+    guard.check_plan(FakePostgresSession(total_cost=10, plan_rows=20), "SELECT 1")
+
+    with pytest.raises(SQLGuardError, match="estimated cost"):
+        guard.check_plan(FakePostgresSession(total_cost=5000, plan_rows=20), "SELECT 1")
+    with pytest.raises(SQLGuardError, match="rows"):
+        guard.check_plan(FakePostgresSession(total_cost=10, plan_rows=9000), "SELECT 1")
+
+
+def test_statement_timeout_is_set_on_postgres():
+    session = FakePostgresSession(total_cost=0, plan_rows=0)
+
+    SQLGuard(statement_timeout_ms=2500).prepare_session(session)
+
+    assert session.statements == ["SET LOCAL statement_timeout = 2500"]
+
+
+def test_guarded_execution_caps_rows():
+    from agents.query_runner import QueryRunner
+    from backend.database.connection import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS guard_rows"))
+        conn.execute(text("CREATE TABLE guard_rows (n INTEGER)"))
+        conn.execute(text("INSERT INTO guard_rows (n) VALUES (:n)"), [{"n": n} for n in range(30)])
+
+    runner = QueryRunner(llm=SimpleNamespace(model="fake"))
+    runner.sql_guard.row_cap = 10
+
+    capped = runner.execute_guarded_query("SELECT n FROM guard_rows ORDER BY n")
+    grouped = runner.execute_guarded_query("SELECT n, COUNT(*) FROM guard_rows GROUP BY n")
+
+    assert capped["rowcount"] == 10 and capped["truncated"]
+    assert grouped["rowcount"] == 10 and grouped["truncated"]
+    with pytest.raises(ValueError):
+        runner.execute_guarded_query("DELETE FROM guard_rows")
@@ -0,0 +1,50 @@
+#test_sql_template_cache.py
+from agents.sql_template_cache import SQLTemplateCache
+
+
+def test_repeat_question_is_bound_for_another_user():
+    cache = SQLTemplateCache()
+    sql = "SELECT SUM(amount) as total_spent FROM llm_transaction_summary WHERE user_id = 7 AND amount < 0"
+
+    assert cache.lookup("How much did I spend?", 7) is None
+    assert cache.store("How much did I spend?", sql, 7)
+
+    bound_sql, params = cache.lookup("how much did i spend", 12)
+    assert "user_id = :user_id" in bound_sql
+    assert params == {"user_id": 12}
+
+
+def test_amounts_and_dates_become_slots():
+    cache = SQLTemplateCache()
+    sql = ("SELECT amount FROM llm_transaction_summary WHERE user_id = 3 "
+           "AND absolute_amount > 50.00 AND DATE(created_at) = '2024-03-01'")
+
+    assert cache.store("show expenses over $50 on 2024-03-01", sql, 3)
+
+    bound_sql, params = cache.lookup("show expenses over $80 on 2024-04-02", 3)
+    assert "absolute_amount > :slot_1" in bound_sql
+    assert "DATE(created_at) = :slot_0" in bound_sql
+    assert params == {"user_id": 3, "slot_0": "2024-04-02", "slot_1": 80.0}
+
+
+def test_unsafe_sql_is_not_cached():
+    cache = SQLTemplateCache()
+
+    # Slot value missing from the SQL
+    assert not cache.store("show my last 5 expenses", "SELECT amount FROM llm_transaction_summary WHERE user_id = 3", 3)
+    # User id hard-coded outside a user_id filter
+    assert not cache.store("who am i", "SELECT display_name FROM llm_user_profile WHERE user_id = 3 OR id = 3", 3)
+    # Writes are never cached
+    assert not cache.store("delete it", "DELETE FROM transactions WHERE user_id = 3", 3)
+
+
+def test_lru_eviction_and_clear():
+    cache = SQLTemplateCache(max_entries=1)
+    cache.store("what is my income", "SELECT SUM(amount) FROM llm_transaction_summary WHERE user_id = 1 AND amount > 0", 1)
+    cache.store("what is my business", "SELECT business_name FROM llm_user_profile WHERE user_id = 1", 1)
+
+    assert cache.lookup("what is my income", 1) is None
+    assert cache.lookup("what is my business", 1) is not None
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,58 @@
+#test_turn_session.py
+import asyncio
+from sqlalchemy import event, text
+from agents.async_utils import run_blocking
+from backend.database.connection import engine, TurnSession, agent_session
+
+
+class CheckoutCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def _stage(sql):
+    with agent_session() as db:
+        return db.execute(text(sql)).scalar()
+
+
+def test_turn_reuses_one_connection_across_stages():
+    counter = CheckoutCounter()
+    event.listen(engine, "checkout", counter)
+    turn = TurnSession()
+    try:
+        async def pipeline():
+            with turn.activated():
+                # Stages run on executor threads, as in the async chat pipeline
+                first, second = await asyncio.gather(run_blocking(_stage, "SELECT 1"), run_blocking(_stage, "SELECT 2"))
+                third = _stage("SELECT 3")
+            return first, second, third
+
+        assert asyncio.run(pipeline()) == (1, 2, 3)
+        assert counter.count == 1
+    finally:
+        turn.close()
+        event.remove(engine, "checkout", counter)
+
+
+def test_stage_transactions_do_not_leak_into_the_next_stage():
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS turn_rows"))
+        conn.execute(text("CREATE TABLE turn_rows (n INTEGER)"))
+
+    turn = TurnSession()
+    try:
+        with turn.activated():
+            with agent_session() as db:
+                db.execute(text("INSERT INTO turn_rows (n) VALUES (1)"))  # never committed
+            with agent_session() as db:
+                db.execute(text("INSERT INTO turn_rows (n) VALUES (2)"))
+                db.commit()
+            with agent_session() as db:
+                rows = [row[0] for row in db.execute(text("SELECT n FROM turn_rows"))]
+    finally:
+        turn.close()
+
+    assert rows == [2]
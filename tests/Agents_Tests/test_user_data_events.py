@@ -0,0 +1,16 @@
+#test_user_data_events.py
+from backend.core import user_data_events as agent_events
+
+
+def test_api_and_agents_share_one_listener_registry():
+    from core import user_data_events as api_events
+
+    assert agent_events is api_events
+
+    heard = []
+    listener = api_events.on_user_data_changed(lambda user_id, table_name: heard.append((user_id, table_name)))
+    try:
+        agent_events.user_data_changed(7, "transactions")
+    finally:
+        api_events._listeners.remove(listener)
+    assert heard == [(7, "transactions")]
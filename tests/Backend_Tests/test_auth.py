@@ -12,3 +12,197 @@ def test_login_invalid_credentials(client):
 def test_get_profile_unauthorized(client):
     response = client.get("/auth/profile")
     assert response.status_code == 401
+
+
+def test_verify_token_caches_the_user_lookup(client):
+    from sqlalchemy import event
+    from database.connection import SessionLocal, engine
+    from models.user import User
+    from models.role import Role
+    from models.profile import Profile
+    from core.security import create_access_token
+    from routers.auth_router import token_cache
+
+    db = SessionLocal()
+    try:
+        role = db.query(Role).filter(Role.role_name == "personal_user").first()
+        if not role:
+            role = Role(role_name="personal_user", permission_level=1)
+            db.add(role)
+            db.commit()
+        user = db.query(User).filter(User.email == "token-cache@test.com").first()
+        if not user:
+            user = User(email="token-cache@test.com", role_id=role.id)
+            db.add(user)
+            db.commit()
+            db.add(Profile(user_id=user.id, display_name="Token Cache", is_business=False))
+            db.commit()
+        user_id = user.id
+    finally:
+        db.close()
+
+    token_cache.clear()
+    headers = {"Authorization": f"Bearer {create_access_token(user_id, 'personal_user')}"}
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.get("/auth/profile", headers=headers)
+        first = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM users" in s]
+        statements.clear()
+        response = client.get("/auth/profile", headers=headers)
+        second = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM users" in s]
+
+        assert response.status_code == 200
+        assert response.json()["email"] == "token-cache@test.com"
+        assert len(first) == 1 and second == []
+
+        # Profile updates go through the cached user and invalidate its tokens
+        update = client.put("/auth/profile/personal", headers=headers,
+                            json={"email": "token-cache-2@test.com", "display_name": "Token Cache"})
+        assert update.status_code == 200
+        assert token_cache.get(headers["Authorization"][7:]) is None
+        assert client.get("/auth/profile", headers=headers).json()["email"] == "token-cache-2@test.com"
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        db = SessionLocal()
+        db.query(Profile).filter(Profile.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_login_is_throttled_per_account(client, monkeypatch):
+    from core.throttle import AttemptThrottle
+    from routers import auth_router
+
+    monkeypatch.setattr(auth_router, "login_account_throttle", AttemptThrottle(max_attempts=2, window_seconds=60))
+    credentials = {"email": "throttled@test.com", "password": "wrongpassword"}
+
+    statuses = [client.post("/auth/login", json=credentials).status_code for _ in range(3)]
+
+    assert statuses == [400, 400, 429]
+
+
+def test_password_pool_rejects_when_full():
+    import threading
+    import pytest
+    from concurrent.futures import ThreadPoolExecutor
+    from core.password_pool import PasswordHasher, PasswordPoolBusy
+
+    release = threading.Event()
+
+    def slow_hash(password):
+        release.wait(5)
+        return password
+
+    hasher = PasswordHasher(slow_hash, lambda plain, hashed: plain == hashed, workers=1, max_pending=1)
+    hasher._executor = ThreadPoolExecutor(max_workers=1)  # threads stand in for processes here
+
+    worker = threading.Thread(target=hasher.hash, args=("secret",))
+    worker.start()
+    while hasher.stats()["in_flight"] == 0:
+        pass
+    try:
+        with pytest.raises(PasswordPoolBusy):
+            hasher.verify("secret", "secret")
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        release.set()
+        worker.join()
+        hasher.shutdown()
+
+    assert hasher.stats()["in_flight"] == 0
+    assert hasher.stats()["completed"] == 1
+
+
+def test_password_pool_stats_require_an_admin(client):
+    from database.connection import SessionLocal
+    from models.user import User
+    from models.role import Role
+    from core.security import create_access_token
+
+    assert client.get("/auth/password-pool").status_code == 401
+
+    db = SessionLocal()
+    try:
+        role = db.query(Role).filter(Role.role_name == "personal_user").first()
+        if not role:
+            role = Role(role_name="personal_user", permission_level=1)
+            db.add(role)
+            db.commit()
+        user = User(email="pool-stats@test.com", role_id=role.id)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        headers = {"Authorization": f"Bearer {create_access_token(user_id, 'personal_user')}"}
+        assert client.get("/auth/password-pool", headers=headers).status_code == 403
+    finally:
+        db.query(User).filter(User.email == "pool-stats@test.com").delete()
+        db.commit()
+        db.close()
+
+
+def test_password_pool_recovers_after_a_worker_dies():
+    import os
+    import operator
+    import pytest
+    from core.password_pool import PasswordHasher, PasswordPoolBusy
+
+    hasher = PasswordHasher(str.upper, operator.eq, workers=1, max_pending=2)
+    hasher.start()
+    try:
+        assert hasher.hash("before") == "BEFORE"
+        broken = hasher._executor
+
+        # The worker exits mid-call, as after an OOM kill
+        with pytest.raises(PasswordPoolBusy):
+            hasher._run(os._exit, 1)
+
+        assert hasher.hash("after") == "AFTER"
+        assert hasher._executor is not broken
+    finally:
+        hasher.shutdown()
+
+
+def test_login_ip_throttle_counts_failures_from_the_forwarded_client(client, monkeypatch):
+    from database.connection import SessionLocal
+    from models.user import User
+    from models.role import Role
+    from models.auth import AuthCredentials
+    from core.config import settings
+    from core.throttle import AttemptThrottle
+    from routers import auth_router
+
+    db = SessionLocal()
+    role = db.query(Role).filter(Role.role_name == "personal_user").first()
+    if not role:
+        role = Role(role_name="personal_user", permission_level=1)
+        db.add(role)
+        db.commit()
+    user = User(email="ip-throttle@test.com", role_id=role.id)
+    db.add(user)
+    db.commit()
+    db.add(AuthCredentials(user_id=user.id, password_hash="right", failed_attempts=0))
+    db.commit()
+    user_id = user.id
+
+    monkeypatch.setattr(auth_router, "verify_password", lambda plain, hashed: plain == hashed)
+    monkeypatch.setattr(auth_router, "login_ip_throttle", AttemptThrottle(max_attempts=2, window_seconds=60))
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_IPS", "testclient")
+    try:
+        def login(password, forwarded_for):
+            return client.post("/auth/login", json={"email": "ip-throttle@test.com", "password": password},
+                               headers={"X-Forwarded-For": forwarded_for}).status_code
+
+        # Successful logins behind the shared proxy address are not counted
+        assert [login("right", "203.0.113.5") for _ in range(3)] == [200, 200, 200]
+        assert [login("wrong", "203.0.113.9") for _ in range(3)] == [400, 400, 429]
+        # Another client behind the same proxy is unaffected
+        assert login("right", "203.0.113.5") == 200
+    finally:
+        db.query(AuthCredentials).filter(AuthCredentials.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,170 @@
+import pytest
+from routers import chat_router
+
+
+def test_chatbot_message_unauthorized(client):
+    response = client.post("/chatbot/message", json={"message": "show my expenses"})
+    assert response.status_code == 401
+
+
+def test_chat_processor_is_shared():
+    if not chat_router.INTENT_CLASSIFIER_AVAILABLE:
+        pytest.skip("LLM agents not available")
+
+    first = chat_router.get_chat_processor()
+    second = chat_router.get_chat_processor()
+
+    assert first is second
+    assert first.query_runner.llm is first.llm
+    assert first.data_handler.llm is first.llm
+    assert first.data_handler.query_runner is first.query_runner
+
+
+class FakeUser:
+    id = 1
+
+
+class FakeStreamingClassifier:
+    def stream_classify_intent(self, user_query, user_id, structured=False):
+        yield {"event": "intent", "data": {"intent": "VIEW", "confidence": 0.9}}
+        yield {"event": "token", "data": {"text": "You spent "}}
+        yield {"event": "token", "data": {"text": "$10.00"}}
+        yield {"event": "result", "data": {
+            "intent": "VIEW",
+            "confidence": 0.9,
+            "result": {"status": "COMPLETE", "answer": "You spent $10.00"}
+        }}
+
+
+def test_chatbot_message_stream_emits_stage_events(client, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(chat_router, "get_chat_processor", lambda: FakeStreamingClassifier())
+    app.dependency_overrides[chat_router.verify_token] = lambda: FakeUser()
+    try:
+        response = client.post("/chatbot/message/stream", json={"message": "how much did I spend"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: intent", "event: token", "event: token", "event: done"]
+    assert '"response": "You spent $10.00"' in response.text
+
+
+class FakeStructuredStreamingClassifier:
+    TABLE = {"columns": ["amount"], "rows": [[-10.0]], "rowcount": 1, "truncated": False}
+
+    def stream_classify_intent(self, user_query, user_id, structured=False):
+        yield {"event": "intent", "data": {"intent": "VIEW", "confidence": 0.9}}
+        result = {"status": "COMPLETE", "answer": "Found 1 record matching your query."}
+        if structured:
+            result["table"] = self.TABLE
+        yield {"event": "result", "data": {"intent": "VIEW", "confidence": 0.9, "result": result}}
+
+
+def test_chatbot_message_stream_structured_mode_sends_the_table(client, monkeypatch):
+    import json
+    from main import app
+
+    monkeypatch.setattr(chat_router, "get_chat_processor", lambda: FakeStructuredStreamingClassifier())
+    app.dependency_overrides[chat_router.verify_token] = lambda: FakeUser()
+    try:
+        response = client.post("/chatbot/message/stream",
+                               json={"message": "show my expenses", "response_format": "structured"})
+    finally:
+        app.dependency_overrides.clear()
+
+    done = response.text.strip().split("\n\n")[-1]
+    assert done.startswith("event: done")
+    payload = json.loads(done.split("data: ", 1)[1])
+    assert payload["data"] == FakeStructuredStreamingClassifier.TABLE
+    assert payload["response"] == "Found 1 record matching your query."
+
+
+class FakeAsyncClassifier:
+    async def aclassify_intent(self, user_query, user_id, structured=False):
+        return {
+            "intent": "VIEW",
+            "confidence": 0.9,
+            "result": {"status": "COMPLETE", "answer": "You spent $10.00"}
+        }
+
+
+def test_chatbot_message_uses_async_pipeline(client, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(chat_router, "get_chat_processor", lambda: FakeAsyncClassifier())
+    app.dependency_overrides[chat_router.verify_token] = lambda: FakeUser()
+    try:
+        response = client.post("/chatbot/message", json={"message": "how much did I spend"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["response"] == "You spent $10.00"
+    assert response.json()["intent"] == "VIEW"
+
+
+class FakeTracedClassifier:
+    async def aclassify_intent(self, user_query, user_id, structured=False):
+        with chat_router.pipeline_trace.trace_stage("generate_sql") as stage:
+            stage["llm_calls"] = 1
+            stage["prompt_tokens"] = 42
+        return {
+            "intent": "VIEW",
+            "confidence": 0.9,
+            "result": {"status": "COMPLETE", "answer": "You spent $10.00"}
+        }
+
+
+def test_chatbot_message_records_stage_timings(client, monkeypatch):
+    if not chat_router.INTENT_CLASSIFIER_AVAILABLE:
+        pytest.skip("LLM agents not available")
+
+    from main import app
+    from database.connection import SessionLocal
+    from models.llmlogs import LLMLogMetric
+
+    monkeypatch.setattr(chat_router, "get_chat_processor", lambda: FakeTracedClassifier())
+    app.dependency_overrides[chat_router.verify_token] = lambda: FakeUser()
+    try:
+        response = client.post("/chatbot/message", json={"message": "how much did I spend"})
+    finally:
+        app.dependency_overrides.clear()
+
+    timings = response.json()["metadata"]["timings"]
+    assert timings["slowest_stage"] == "generate_sql"
+    assert timings["stages"][0]["prompt_tokens"] == 42
+
+    db = SessionLocal()
+    try:
+        metric = db.query(LLMLogMetric).order_by(LLMLogMetric.id.desc()).first()
+        assert metric.stage == "generate_sql"
+        assert metric.prompt_tokens == 42
+        assert metric.llmlog.prompt == "how much did I spend"
+    finally:
+        db.close()
+
+
+def test_denied_role_is_rejected_before_agent_work(client, monkeypatch):
+    from main import app
+    from core.security import create_access_token
+
+    def no_agents():
+        raise AssertionError("agents should not run for a denied role")
+
+    monkeypatch.setattr(chat_router, "get_chat_processor", no_agents)
+    app.dependency_overrides[chat_router.verify_token] = lambda: FakeUser()
+    token = create_access_token(1, "business_subuser")
+    try:
+        response = client.post("/chatbot/message", json={"message": "how much did I spend"},
+                               headers={"Authorization": f"Bearer {token}"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ACCESS_DENIED"
+    assert "sub-users" in response.json()["response"]
@@ -6,3 +6,322 @@ def test_dashboard_summary_unauthorized(client):
 def test_dashboard_recent_purchases_unauthorized(client):
     response = client.get("/dashboard/recent-purchases")
     assert response.status_code == 401
+
+
+def test_dashboard_summary_is_one_query_and_cached_until_data_changes(client):
+    from datetime import datetime
+    from sqlalchemy import event
+    from database.connection import SessionLocal, engine
+    from models.user import User
+    from models.role import Role
+    from models.profile import Profile
+    from models.categories import Category
+    from models.transactions import Transaction
+    from models.goals import Goal
+    from models.category_rollups import MonthlyCategoryRollup
+    from core.security import create_access_token
+    from routers.dashboard_router import summary_cache
+
+    db = SessionLocal()
+    try:
+        role = db.query(Role).filter(Role.role_name == "personal_user").first()
+        if not role:
+            role = Role(role_name="personal_user", permission_level=1)
+            db.add(role)
+            db.commit()
+        category = db.query(Category).filter(Category.name == "Dashboard Test Food").first()
+        if not category:
+            category = Category(name="Dashboard Test Food", kind="expense")
+            db.add(category)
+            db.commit()
+        user = User(email="dashboard-summary@test.com", role_id=role.id)
+        db.add(user)
+        db.commit()
+        user_id, category_id = user.id, category.id
+        db.add(Profile(user_id=user_id, display_name="Dash Board", is_business=False))
+        db.add_all([Transaction(user_id=user_id, category_id=category_id, amount=-amount, created_at=datetime.now())
+                    for amount in (12.5, 7.5)])
+        db.commit()
+    finally:
+        db.close()
+
+    summary_cache.clear()
+    headers = {"Authorization": f"Bearer {create_access_token(user_id, 'personal_user')}"}
+    client.get("/auth/profile", headers=headers)  # warm the token cache
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        first = client.get("/dashboard/summary", headers=headers).json()
+        assert len(statements) == 1
+        assert first["user_name"] == "Dash Board"
+        assert len(first["recent_purchases"]) == 2
+        assert first["expense_categories"][0]["name"] == "Dashboard Test Food"
+        assert first["expense_categories"][0]["value"] == 20.0
+        assert first["goals"] == []
+
+        statements.clear()
+        assert client.get("/dashboard/summary", headers=headers).json() == first
+        assert statements == []
+
+        # A goal written through the API drops the cached summary
+        created = client.post("/goals/", headers=headers,
+                              json={"name": "Trip", "type": "savings", "target_amount": 500, "current_amount": 50})
+        assert created.status_code == 200
+        goals = client.get("/dashboard/summary", headers=headers).json()["goals"]
+        assert [(g["name"], g["target"], g["current"]) for g in goals] == [("Trip", 500.0, 50.0)]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        db = SessionLocal()
+        db.query(Goal).filter(Goal.user_id == user_id).delete()
+        db.query(Transaction).filter(Transaction.user_id == user_id).delete()
+        db.query(MonthlyCategoryRollup).filter(MonthlyCategoryRollup.user_id == user_id).delete()
+        db.query(Profile).filter(Profile.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_category_rollups_follow_orm_writes(client):
+    from datetime import datetime
+    from sqlalchemy import text
+    from database.connection import SessionLocal, engine
+    from database import rollups
+    from models.user import User
+    from models.role import Role
+    from models.categories import Category
+    from models.transactions import Transaction
+    from models.category_rollups import MonthlyCategoryRollup
+    from core.security import create_access_token
+
+    db = SessionLocal()
+    try:
+        role = db.query(Role).filter(Role.role_name == "personal_user").first()
+        if not role:
+            role = Role(role_name="personal_user", permission_level=1)
+            db.add(role)
+            db.commit()
+        categories = []
+        for name in ("Rollup Test Rent", "Rollup Test Fuel"):
+            category = db.query(Category).filter(Category.name == name).first()
+            if not category:
+                category = Category(name=name, kind="expense")
+                db.add(category)
+                db.commit()
+            categories.append(category.id)
+        user = User(email="rollups@test.com", role_id=role.id)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        def rollup_rows():
+            return sorted(
+                (str(r.month_start), r.category_id, round(r.total, 2), r.txn_count)
+                for r in db.query(MonthlyCategoryRollup).filter(
+                    MonthlyCategoryRollup.user_id == user_id, MonthlyCategoryRollup.txn_count > 0
+                )
+            )
+
+        rent = Transaction(user_id=user_id, category_id=categories[0], amount=-900, created_at=datetime(2026, 3, 1))
+        fuel = Transaction(user_id=user_id, category_id=categories[1], amount=-40, created_at=datetime(2026, 3, 9))
+        db.add_all([rent, fuel, Transaction(user_id=user_id, category_id=categories[1], amount=-60,
+                                            created_at=datetime(2026, 4, 2))])
+        db.commit()
+        assert rollup_rows() == [("2026-03-01", categories[0], -900.0, 1), ("2026-03-01", categories[1], -40.0, 1),
+                                 ("2026-04-01", categories[1], -60.0, 1)]
+
+        # Moving a transaction to another month and category moves its total
+        fuel.amount = -45
+        fuel.created_at = datetime(2026, 4, 20)
+        db.commit()
+        db.delete(rent)
+        db.commit()
+        assert rollup_rows() == [("2026-04-01", categories[1], -105.0, 2)]
+
+        # The rebuild command agrees with the incrementally kept rows
+        with engine.begin() as conn:
+            rollups.rebuild(conn, user_id)
+        db.expire_all()
+        assert rollup_rows() == [("2026-04-01", categories[1], -105.0, 2)]
+
+        headers = {"Authorization": f"Bearer {create_access_token(user_id, 'personal_user')}"}
+        response = client.get("/dashboard/expense-categories?month=2026-04", headers=headers)
+        assert response.json() == [{"name": "Rollup Test Fuel", "value": 105.0, "color": "#FF6384"}]
+    finally:
+        db.query(Transaction).filter(Transaction.user_id == user_id).delete()
+        db.query(MonthlyCategoryRollup).filter(MonthlyCategoryRollup.user_id == user_id).delete()
+        db.query(User).filter(User.id == user_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_business_summary_figures_from_two_queries(client, monkeypatch):
+    from datetime import datetime
+    from sqlalchemy import event
+    from database.connection import SessionLocal, engine
+    from models.user import User
+    from models.role import Role
+    from models.profile import Profile
+    from models.business import Business
+    from models.categories import Category
+    from models.transactions import Transaction
+    from models.category_rollups import MonthlyCategoryRollup
+    from core.config import settings
+    from core.security import create_access_token
+    from core.business_context import business_contexts
+
+    year = datetime.now().year
+    db = SessionLocal()
+    try:
+        if not db.get(Role, 2):
+            db.add(Role(id=2, role_name="business_admin", permission_level="admin"))
+        for category_id, name, kind in ((17, "Business Test Sales", "income"), (22, "Business Test Rent", "expense")):
+            if not db.get(Category, category_id):
+                db.add(Category(id=category_id, name=name, kind=kind))
+        business = Business(name="Figures Inc")
+        db.add(business)
+        db.commit()
+        admin = User(email="figures-admin@test.com", role_id=2, business_id=business.id)
+        db.add(admin)
+        db.commit()
+        admin_id, business_id = admin.id, business.id
+        db.add(Profile(user_id=admin_id, display_name="Figures", is_business=True, business_name="Figures Inc"))
+        db.add_all([
+            Transaction(user_id=admin_id, category_id=17, amount=1000, created_at=datetime(year, 1, 10)),
+            Transaction(user_id=admin_id, category_id=17, amount=500, created_at=datetime(year - 1, 1, 10)),
+            Transaction(user_id=admin_id, category_id=22, amount=-300, created_at=datetime(year, 1, 20)),
+            Transaction(user_id=admin_id, category_id=22, amount=-200, created_at=datetime(year - 1, 8, 1)),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {create_access_token(admin_id, 'business_admin')}"}
+    client.get("/auth/profile", headers=headers)  # warm the token cache
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        responses = []
+        for rollups_enabled in (True, False):
+            monkeypatch.setattr(settings, "CATEGORY_ROLLUPS_ENABLED", rollups_enabled)
+            business_contexts.clear()
+            statements.clear()
+            response = client.get("/dashboard/business/summary", headers=headers)
+            assert response.status_code == 200
+            figure_queries = [s for s in statements if "FROM transactions" in s or "FROM monthly_category_rollups" in s]
+            assert len(figure_queries) == 2
+            responses.append(response.json())
+
+        data = responses[0]
+        assert responses[1] == data
+        assert data["stats"]["total_income"] == 1500.0
+        assert data["stats"]["total_expenses"] == 500.0
+        assert [q["amount"] for q in data["incomeData"]] == [1000.0, 0.0, 0.0, 0.0]
+        assert [q["amount"] for q in data["expenseData"]] == [300.0, 0.0, 0.0, 0.0]
+        assert [q["amount"] for q in data["yearOverYear"]["expenseData"]] == [0.0, 0.0, 200.0, 0.0]
+        assert data["yearOverYear"]["income_change_pct"] == 100.0
+        assert [t["description"] for t in data["recentIncome"]] == ["Business Test Sales"] * 2
+        assert data["budget"]["total"] == 60000.0
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        db = SessionLocal()
+        db.query(Transaction).filter(Transaction.user_id == admin_id).delete()
+        db.query(MonthlyCategoryRollup).filter(MonthlyCategoryRollup.user_id == admin_id).delete()
+        db.query(Profile).filter(Profile.user_id == admin_id).delete()
+        db.query(User).filter(User.id == admin_id).delete()
+        db.query(Business).filter(Business.id == business_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_business_members_share_one_cached_context(client):
+    from sqlalchemy import event
+    from database.connection import SessionLocal, engine
+    from models.user import User
+    from models.role import Role
+    from models.profile import Profile
+    from models.business import Business
+    from models.goals import Goal
+    from core.security import create_access_token
+    from core.business_context import business_contexts
+
+    db = SessionLocal()
+    try:
+        if not db.get(Role, 2):
+            db.add(Role(id=2, role_name="business_admin", permission_level="admin"))
+        subuser_role = db.query(Role).filter(Role.role_name == "business_subuser").first()
+        if not subuser_role:
+            subuser_role = Role(role_name="business_subuser", permission_level="restricted")
+            db.add(subuser_role)
+        business = Business(name="Context Co")
+        db.add(business)
+        db.commit()
+        admin = User(email="context-admin@test.com", role_id=2, business_id=business.id)
+        member = User(email="context-member@test.com", role_id=subuser_role.id, business_id=business.id)
+        db.add_all([admin, member])
+        db.commit()
+        admin_id, member_id, business_id = admin.id, member.id, business.id
+        db.add(Profile(user_id=admin_id, display_name="Admin", is_business=True, business_name="Context Co"))
+        db.commit()
+    finally:
+        db.close()
+
+    business_contexts.clear()
+    admin_headers = {"Authorization": f"Bearer {create_access_token(admin_id, 'business_admin')}"}
+    member_headers = {"Authorization": f"Bearer {create_access_token(member_id, 'business_subuser')}"}
+    client.get("/auth/profile", headers=admin_headers)  # warm the token cache
+    client.get("/auth/profile", headers=member_headers)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/dashboard/business/goals", headers=admin_headers).json() == []
+        context = business_contexts.contexts.get(business_id)
+        assert context["admin_user_id"] == admin_id
+        assert context["member_ids"] == [admin_id, member_id]
+        assert context["business_name"] == "Context Co"
+
+        # The sub-user is served from the admin's cached entry
+        statements.clear()
+        assert client.get("/dashboard/business/goals", headers=member_headers).json() == []
+        assert statements == []
+
+        # A goal written by the admin drops the shared payload
+        created = client.post("/dashboard/business/goals", headers=admin_headers, json={"name": "Revenue push", "amount": 1000})
+        assert created.status_code == 200
+        goals = client.get("/dashboard/business/goals", headers=member_headers).json()
+        assert [(g["name"], g["department"]) for g in goals] == [("Revenue push", "Revenue")]
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+        business_contexts.clear()
+        db = SessionLocal()
+        db.query(Goal).filter(Goal.user_id == admin_id).delete()
+        db.query(Profile).filter(Profile.user_id == admin_id).delete()
+        db.query(User).filter(User.id.in_([admin_id, member_id])).delete()
+        db.query(Business).filter(Business.id == business_id).delete()
+        db.commit()
+        db.close()
+
+
+def test_business_context_forgets_members_who_left():
+    from types import SimpleNamespace
+    from core.business_context import BusinessContextCache, BUSINESS_ADMIN_ROLE_ID
+
+    class FakeSession:
+        def __init__(self, member_ids):
+            self.member_ids = member_ids
+
+        def execute(self, statement):
+            rows = [SimpleNamespace(id=member_id, role_id=BUSINESS_ADMIN_ROLE_ID if member_id == 1 else 3,
+                                    business_name="Acme", name="Acme") for member_id in self.member_ids]
+            return SimpleNamespace(all=lambda: rows)
+
+    cache = BusinessContextCache(ttl_seconds=60)
+    cache.get(FakeSession([1, 2, 3]), 9)
+    assert cache.business_of(3) == 9
+
+    cache.invalidate(9)
+    cache.get(FakeSession([1, 2]), 9)
+    assert cache.business_of(2) == 9
+    assert cache.business_of(3) is None
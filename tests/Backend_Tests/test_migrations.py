@@ -0,0 +1,188 @@
+import pytest
+from datetime import datetime, timedelta
+
+HOT_TABLES = ("transactions", "goals", "llmlogs", "budgetentries", "monthly_category_rollups")
+
+
+def explain(conn, statement):
+    """EXPLAIN QUERY PLAN detail lines for a Core/ORM statement or SQL string"""
+    if isinstance(statement, str):
+        sql = statement
+        for name in ("user_id", "session_id", "limit"):
+            sql = sql.replace(f":{name}", "?")
+        count = sql.count("?")
+    else:
+        compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+        sql, count = compiled.string, len(compiled.positiontup)
+    # SQLite plans do not depend on the parameter values
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", (None,) * count)]
+
+
+def assert_uses_indexes(plan):
+    hot = [line for line in plan if any(f" {table}" in f" {line}" for table in HOT_TABLES)]
+    assert hot, plan
+    for line in hot:
+        assert line.startswith("SEARCH") and "INDEX" in line, plan
+
+
+@pytest.fixture
+def seeded(client):
+    from database.connection import SessionLocal, engine
+    from models.user import User
+    from models.role import Role
+    from models.profile import Profile
+    from models.categories import Category
+    from models.transactions import Transaction
+    from models.goals import Goal
+    from models.llmlogs import LLMLog
+    from models.category_rollups import MonthlyCategoryRollup
+
+    db = SessionLocal()
+    role = db.query(Role).filter(Role.role_name == "personal_user").first()
+    if not role:
+        role = Role(role_name="personal_user", permission_level=1)
+        db.add(role)
+        db.commit()
+    category = db.query(Category).filter(Category.name == "Index Test Groceries").first()
+    if not category:
+        category = Category(name="Index Test Groceries", kind="expense")
+        db.add(category)
+        db.commit()
+    users = [User(email=f"index-{i}@test.com", role_id=role.id) for i in range(5)]
+    db.add_all(users)
+    db.commit()
+    user_ids = [user.id for user in users]
+
+    now = datetime.now()
+    for user_id in user_ids:
+        db.add(Profile(user_id=user_id, display_name="Index", is_business=False))
+        db.add_all(Transaction(user_id=user_id, category_id=category.id, amount=-float(n),
+                               created_at=now - timedelta(days=n)) for n in range(60))
+        db.add_all(Goal(user_id=user_id, name=f"Goal {n}", type="savings", target_amount=100) for n in range(3))
+        db.add_all(LLMLog(user_id=user_id, session_id=f"s{n % 3}", prompt="q", response="a") for n in range(30))
+    db.commit()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    yield user_ids[0]
+
+    for model in (Transaction, Goal, LLMLog, Profile, MonthlyCategoryRollup):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_migrations_are_recorded_and_applied_once(client):
+    from database.connection import engine
+    from database.migrations import MIGRATIONS, applied_versions, migrate
+
+    assert applied_versions(engine) >= {m.version for m in MIGRATIONS}
+    assert migrate(engine) == []
+    with engine.connect() as conn:
+        indexes = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_transactions_user_created", "ix_transactions_user_category_created",
+            "ix_llmlogs_user_session_timestamp", "ix_goals_user", "ix_budgetentries_user_category"} <= indexes
+
+
+@pytest.mark.parametrize("rollups_enabled", [True, False])
+def test_dashboard_queries_use_indexes(seeded, monkeypatch, rollups_enabled):
+    from database.connection import engine
+    from core.config import settings
+    from core.business_figures import BusinessFigures
+    from routers.dashboard_router import build_summary_statement, expense_totals_statement
+
+    monkeypatch.setattr(settings, "CATEGORY_ROLLUPS_ENABLED", rollups_enabled)
+    month = datetime.now().strftime("%Y-%m")
+    figures = BusinessFigures()
+    with engine.connect() as conn:
+        for statement in (
+            build_summary_statement(seeded, month),
+            expense_totals_statement(seeded, month),
+            figures.monthly_statement(seeded, "sqlite"),
+            figures.recent_statement(seeded),
+        ):
+            assert_uses_indexes(explain(conn, statement))
+
+
+def test_recent_purchases_and_goals_use_indexes(seeded):
+    from sqlalchemy import select, desc
+    from database.connection import engine
+    from models.transactions import Transaction
+    from models.goals import Goal
+
+    recent = select(Transaction).where(Transaction.user_id == seeded).order_by(desc(Transaction.created_at)).limit(10)
+    business_goals = select(Goal).where(Goal.user_id == seeded, Goal.type == "business")
+    with engine.connect() as conn:
+        plan = explain(conn, recent)
+        assert_uses_indexes(plan)
+        assert not any("TEMP B-TREE" in line for line in plan)
+        assert_uses_indexes(explain(conn, select(Goal).where(Goal.user_id == seeded)))
+        assert_uses_indexes(explain(conn, business_goals))
+
+
+def test_chat_history_queries_use_indexes(seeded):
+    from sqlalchemy import select
+    from database.connection import engine
+    from models.llmlogs import LLMLog
+
+    by_user = select(LLMLog).where(LLMLog.user_id == seeded).order_by(LLMLog.timestamp.asc()).limit(50)
+    by_session = select(LLMLog).where(LLMLog.user_id == seeded, LLMLog.session_id == "s1") \
+        .order_by(LLMLog.timestamp.asc()).limit(50)
+    agent_history = ("SELECT id, prompt, response, timestamp FROM llmlogs "
+                     "WHERE user_id = :user_id ORDER BY timestamp ASC LIMIT :limit")
+    with engine.connect() as conn:
+        for statement in (by_user, by_session, agent_history):
+            plan = explain(conn, statement)
+            assert_uses_indexes(plan)
+            assert not any("TEMP B-TREE" in line for line in plan), plan
+
+
+class FakeConnection:
+    """Records statements and answers scalar() from a queue of results"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.statements = []
+        self.dialect = type("Dialect", (), {"name": "postgresql"})()
+        self.closed = False
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return self
+
+    def scalar(self):
+        return self.results.pop(0)
+
+    def close(self):
+        self.closed = True
+
+
+def test_waiting_workers_poll_for_the_migration_lock(monkeypatch):
+    from database import migrations
+
+    conn = FakeConnection([False, False, True])
+    engine = type("Engine", (), {"connect": lambda self: conn})()
+    monkeypatch.setattr(migrations, "LOCK_POLL_SECONDS", 0)
+
+    assert migrations._acquire_lock(engine) is conn
+    assert len(conn.statements) == 3
+    assert all("pg_try_advisory_lock" in statement for statement in conn.statements)
+
+
+def test_invalid_concurrent_index_is_dropped_and_rebuilt():
+    from database import migrations
+
+    statement = migrations._index("postgresql", "ix_goals_user", "goals", ["user_id", "type"])
+    # indisvalid before the build (left INVALID by a failed build), then after it
+    conn = FakeConnection([False, True])
+    migrations._build_concurrent_index(conn, "ix_goals_user", statement)
+    assert any(s.startswith("DROP INDEX CONCURRENTLY IF EXISTS ix_goals_user") for s in conn.statements)
+    assert statement in conn.statements
+
+    conn = FakeConnection([None, False])
+    with pytest.raises(RuntimeError):
+        migrations._build_concurrent_index(conn, "ix_goals_user", statement)
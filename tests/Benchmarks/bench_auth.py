@@ -0,0 +1,171 @@
+'''
+bench_auth.py
+
+Mixed-load benchmark: clients logging in (bcrypt verification) while other
+clients poll GET /dashboard/summary. Runs once with hashing inline on the
+request threads and once on the password process pool, and reports login
+throughput and dashboard latency percentiles for each.
+
+    python tests/Benchmarks/bench_auth.py --duration 10 --login-clients 16 --dashboard-clients 8
+'''
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_chat import percentile
+from seed_data import seed
+
+PASSWORD = "bench-password"
+
+
+def setup_environment(database_path: str, workers: int, max_pending: int):
+    """Point the backend at a local database, then import the app"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max_pending)
+    # Every benchmark client shares one address
+    os.environ["LOGIN_MAX_FAILURES_PER_IP"] = "0"
+    os.environ["LOGIN_MAX_FAILURES_PER_ACCOUNT"] = "0"
+
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "backend"))
+    sys.path.insert(0, PROJECT_ROOT)
+
+    from main import app
+    return app
+
+
+def add_credentials(engine, user_ids, rounds: int):
+    from sqlalchemy import text
+    from passlib.hash import bcrypt
+
+    password_hash = bcrypt.using(rounds=rounds).hash(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM authcredentials"))
+        conn.execute(text(
+            "INSERT INTO authcredentials (user_id, password_hash, password_algo, failed_attempts) "
+            "VALUES (:user_id, :password_hash, 'bcrypt', 0)"
+        ), [{"user_id": user_id, "password_hash": password_hash} for user_id in user_ids])
+
+
+def run_mixed_load(app, user_ids, duration, login_clients, dashboard_clients):
+    import httpx
+    from core.security import create_access_token
+
+    tokens = {user_id: create_access_token(user_id, "personal_user") for user_id in user_ids}
+    logins = {"ok": 0, "busy": 0, "errors": 0}
+    dashboard_latencies = []
+    dashboard_errors = 0
+
+    async def run():
+        nonlocal dashboard_errors
+        deadline = time.perf_counter() + duration
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            async def login_client(i):
+                n = i
+                while time.perf_counter() < deadline:
+                    user_id = user_ids[n % len(user_ids)]
+                    response = await client.post("/auth/login", json={
+                        "email": f"bench{user_id}@example.com", "password": PASSWORD
+                    })
+                    if response.status_code == 200:
+                        logins["ok"] += 1
+                    elif response.status_code == 503:
+                        logins["busy"] += 1
+                        await asyncio.sleep(0.01)
+                    else:
+                        logins["errors"] += 1
+                    n += login_clients
+
+            async def dashboard_client(i):
+                nonlocal dashboard_errors
+                user_id = user_ids[i % len(user_ids)]
+                headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    response = await client.get("/dashboard/summary", headers=headers)
+                    dashboard_latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        dashboard_errors += 1
+
+            await asyncio.gather(
+                *(login_client(i) for i in range(login_clients)),
+                *(dashboard_client(i) for i in range(dashboard_clients))
+            )
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    wall = time.perf_counter() - started
+
+    return {
+        "logins_per_second": round(logins["ok"] / wall, 2),
+        "logins_ok": logins["ok"],
+        "logins_busy": logins["busy"],
+        "login_errors": logins["errors"],
+        "dashboard_requests": len(dashboard_latencies),
+        "dashboard_errors": dashboard_errors,
+        "dashboard_p50_ms": round(percentile(dashboard_latencies, 50) * 1000, 2) if dashboard_latencies else None,
+        "dashboard_p95_ms": round(percentile(dashboard_latencies, 95) * 1000, 2) if dashboard_latencies else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Login vs dashboard mixed-load benchmark")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per mode")
+    parser.add_argument("--login-clients", type=int, default=16)
+    parser.add_argument("--dashboard-clients", type=int, default=8)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=2, help="password pool processes")
+    parser.add_argument("--max-pending", type=int, default=8, help="password pool admission limit")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    database_path = os.path.join(tempfile.mkdtemp(prefix="auth-bench-"), "bench.db")
+    app = setup_environment(database_path, args.workers, args.max_pending)
+
+    from database.connection import engine
+    from database import rollups
+    from core.security import password_hasher
+
+    user_ids = seed(engine, users=args.users, transactions_per_user=50)
+    with engine.begin() as conn:
+        rollups.rebuild(conn)
+    add_credentials(engine, user_ids, args.bcrypt_rounds)
+
+    reports = []
+    try:
+        for mode, workers in (("inline", 0), ("process_pool", args.workers)):
+            password_hasher.workers = workers
+            report = {"mode": mode, "workers": workers}
+            report.update(run_mixed_load(app, user_ids, args.duration, args.login_clients, args.dashboard_clients))
+            report["password_pool"] = password_hasher.stats()
+            reports.append(report)
+    finally:
+        password_hasher.shutdown()
+
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        for report in reports:
+            print(f"\n== {report['mode']} ==")
+            for key, value in report.items():
+                if key != "mode":
+                    print(f"  {key:>20}: {value}")
+
+    return reports
+
+
+if __name__ == "__main__":
+    main()
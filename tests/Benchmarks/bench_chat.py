@@ -0,0 +1,211 @@
+'''
+bench_chat.py
+
+Offline chat pipeline benchmark. Starts a fake Ollama server with scripted
+responses, seeds a local SQLite database, then drives
+IntentClassifier.classify_intent and POST /chatbot/message under
+concurrency and reports latency percentiles, LLM calls per turn and DB
+queries per turn.
+
+    python tests/Benchmarks/bench_chat.py --turns 200 --concurrency 16 --llm-latency 0.05
+'''
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ollama import FakeOllamaServer
+from seed_data import seed, sqlite_view_columns
+
+# Mix of the question types seen in real traffic
+WORKLOAD = [
+    "how much did I spend this month",
+    "show my expenses",
+    "what is my income",
+    "groceries",
+    "I spent $12 on lunch",
+]
+
+
+def _user_id(prompt: str) -> str:
+    match = re.search(r'(?:Current User ID|USER ID|USER_ID):\s*(\d+)', prompt)
+    return match.group(1) if match else "1"
+
+
+SCRIPT = [
+    ("classify its intent", '{"intent": "VIEW", "confidence": 0.9, "reason": "question about spending"}'),
+    ("enhancing a financial query", "total spending in Food & Dining for the current user"),
+    ("INSERT statement", lambda prompt:
+        f"INSERT INTO transactions (user_id, category_id, amount) VALUES ({_user_id(prompt)}, 10, -12.00)"),
+    ("SQL query generator", lambda prompt:
+        "SELECT SUM(amount) AS total_spent FROM llm_transaction_summary "
+        f"WHERE user_id = {_user_id(prompt)} AND amount < 0"),
+    ("ORIGINAL USER QUESTION", "Your total expenses were $1,234.56"),
+]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(name, latencies, wall_seconds, llm_calls, db_queries, concurrency, errors):
+    turns = len(latencies)
+    return {
+        "target": name,
+        "turns": turns,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_per_second": round(turns / wall_seconds, 2) if wall_seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "llm_calls_per_turn": round(llm_calls / turns, 2),
+        "db_queries_per_turn": round(db_queries / turns, 2),
+    }
+
+
+def setup_environment(server: FakeOllamaServer, database_path: str, sql_cache: bool):
+    """Point the backend settings at the fake server and the local database, then import the app"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    os.environ["OLLAMA_BASE_URL"] = server.base_url
+    os.environ["LLM_MODEL"] = "fake"
+    if not sql_cache:
+        os.environ["SQL_TEMPLATE_CACHE_SIZE"] = "0"
+
+    sys.path.insert(0, os.path.join(PROJECT_ROOT, "backend"))
+    sys.path.insert(0, PROJECT_ROOT)
+
+    from main import app
+    return app
+
+
+def bench_classifier(classifier, user_ids, turns, concurrency, server, counter):
+    def one_turn(i):
+        started = time.perf_counter()
+        result = classifier.classify_intent(WORKLOAD[i % len(WORKLOAD)], user_ids[i % len(user_ids)])
+        return time.perf_counter() - started, result.get("result", {}).get("status") == "ERROR"
+
+    llm_before, db_before = server.calls, counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_turn, range(turns)))
+    wall = time.perf_counter() - started
+
+    return summarize("classify_intent", [r[0] for r in results], wall, server.calls - llm_before,
+                     counter.count - db_before, concurrency, sum(1 for r in results if r[1]))
+
+
+def bench_route(app, user_ids, turns, concurrency, server, counter):
+    import httpx
+    from core.security import create_access_token
+
+    tokens = {user_id: create_access_token(user_id, "personal_user") for user_id in user_ids}
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            async def one_turn(i):
+                user_id = user_ids[i % len(user_ids)]
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/chatbot/message",
+                        json={"message": WORKLOAD[i % len(WORKLOAD)]},
+                        headers={"Authorization": f"Bearer {tokens[user_id]}"}
+                    )
+                    return time.perf_counter() - started, response.status_code != 200
+
+            return await asyncio.gather(*(one_turn(i) for i in range(turns)))
+
+    llm_before, db_before = server.calls, counter.count
+    started = time.perf_counter()
+    results = asyncio.run(run())
+    wall = time.perf_counter() - started
+
+    return summarize("/chatbot/message", [r[0] for r in results], wall, server.calls - llm_before,
+                     counter.count - db_before, concurrency, sum(1 for r in results if r[1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline chat pipeline benchmark")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="seconds per fake LLM call")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions-per-user", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=len(WORKLOAD), help="untimed turns before measuring")
+    parser.add_argument("--target", choices=["classifier", "route", "both"], default="both")
+    parser.add_argument("--no-sql-cache", action="store_true", help="disable the SQL template cache")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(SCRIPT, latency_seconds=args.llm_latency).start()
+    database_path = os.path.join(tempfile.mkdtemp(prefix="chat-bench-"), "bench.db")
+
+    try:
+        app = setup_environment(server, database_path, sql_cache=not args.no_sql_cache)
+
+        from sqlalchemy import event
+        from database.connection import engine
+        from routers import chat_router
+
+        user_ids = seed(engine, users=args.users, transactions_per_user=args.transactions_per_user)
+        counter = QueryCounter()
+        event.listen(engine, "before_cursor_execute", counter)
+
+        classifier = chat_router.get_chat_processor()
+        classifier.query_runner.schema_catalogue.column_source = lambda: sqlite_view_columns(engine)
+
+        # Warm up connections and the schema catalogue outside the measurement
+        for i in range(args.warmup):
+            classifier.classify_intent(WORKLOAD[i % len(WORKLOAD)], user_ids[0])
+
+        reports = []
+        if args.target in ("classifier", "both"):
+            reports.append(bench_classifier(classifier, user_ids, args.turns, args.concurrency, server, counter))
+        if args.target in ("route", "both"):
+            reports.append(bench_route(app, user_ids, args.turns, args.concurrency, server, counter))
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(reports))
+    else:
+        for report in reports:
+            print(f"\n== {report['target']} ==")
+            for key, value in report.items():
+                if key != "target":
+                    print(f"  {key:>22}: {value}")
+
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+'''
+fake_ollama.py
+
+Local HTTP server that speaks enough of the Ollama API (/api/generate,
+streaming NDJSON) for the agents' OllamaLLM client. Responses are scripted
+by prompt substring and every request waits a configurable latency.
+'''
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Tuple, Union
+
+
+class FakeOllamaServer:
+    """
+    Scripted fake Ollama server.
+
+    responses is a list of (prompt substring, response) where the response
+    is a string or a callable taking the prompt; the first match wins and
+    default_response is used otherwise.
+    """
+
+    def __init__(self, responses: List[Tuple[str, Union[str, Callable[[str], str]]]], default_response: str = "OK",
+                 latency_seconds: float = 0.0, tokens_per_chunk: int = 4):
+        self.responses = responses
+        self.default_response = default_response
+        self.latency_seconds = latency_seconds
+        self.tokens_per_chunk = tokens_per_chunk
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply_for(self, prompt: str) -> str:
+        for needle, response in self.responses:
+            if needle in prompt:
+                return response(prompt) if callable(response) else response
+        return self.default_response
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+
+                with server._lock:
+                    server.calls += 1
+                started = time.perf_counter()
+                time.sleep(server.latency_seconds)
+
+                prompt = body.get("prompt", "")
+                reply = server.reply_for(prompt)
+                words = reply.split(" ")
+                chunks = [" ".join(words[i:i + server.tokens_per_chunk]) + " "
+                          for i in range(0, len(words), server.tokens_per_chunk)]
+                chunks[-1] = chunks[-1].rstrip()
+
+                lines = [self._line(body, chunk, done=False) for chunk in chunks]
+                elapsed_ns = int((time.perf_counter() - started) * 1e9)
+                lines.append(self._line(body, "", done=True, extra={
+                    "done_reason": "stop",
+                    "prompt_eval_count": len(prompt.split()),
+                    "eval_count": len(words),
+                    "total_duration": elapsed_ns,
+                    "eval_duration": elapsed_ns,
+                }))
+                payload = "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+                if body.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                else:
+                    payload = json.dumps({**lines[-1], "response": reply}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _line(self, body, text, done, extra=None):
+                line = {
+                    "model": body.get("model", "fake"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": text,
+                    "done": done,
+                }
+                line.update(extra or {})
+                return line
+
+        return Handler
@@ -0,0 +1,91 @@
+'''
+seed_data.py
+
+Synthetic data for the benchmark database: roles, users, categories,
+transactions and SQLite versions of the llm_* views the agents query.
+'''
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+ROLES = [("personal_user", "standard"), ("business_admin", "admin"), ("business_subuser", "restricted")]
+
+CATEGORIES = [
+    ("Salary", "income"), ("Housing", "expense"), ("Utilities", "expense"), ("Food & Dining", "expense"),
+    ("Transportation", "expense"), ("Entertainment", "expense"), ("Healthcare", "expense"),
+    ("Insurance", "expense"), ("Freelance Income", "income"), ("Dining Out", "expense"),
+]
+
+VIEWS = [
+    """
+    CREATE VIEW IF NOT EXISTS llm_transaction_summary AS
+    SELECT t.id AS transaction_id, t.user_id, t.amount, ABS(t.amount) AS absolute_amount,
+           c.name AS category_name, c.kind AS category_kind, t.created_at,
+           strftime('%m', t.created_at) AS month, strftime('%Y', t.created_at) AS year
+    FROM transactions t JOIN categories c ON c.id = t.category_id
+    """,
+    """
+    CREATE VIEW IF NOT EXISTS llm_user_profile AS
+    SELECT u.id AS user_id, u.email, r.role_name, NULL AS business_name
+    FROM users u JOIN roles r ON r.id = u.role_id
+    """,
+]
+
+
+def sqlite_view_columns(engine) -> list:
+    """(view, column, data_type, is_nullable) rows for the llm_* views; SQLite has no information_schema"""
+    with engine.connect() as conn:
+        views = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'view' AND name LIKE 'llm_%' ORDER BY name"
+        )).fetchall()
+        rows = []
+        for (view_name,) in views:
+            for column in conn.execute(text(f'PRAGMA table_info("{view_name}")')).fetchall():
+                rows.append((view_name, column[1], column[2] or 'unknown', 'NO' if column[3] else 'YES'))
+    return rows
+
+
+def seed(engine, users: int = 20, transactions_per_user: int = 200, seed_value: int = 7):
+    """Create the views and fill an empty database; returns the seeded user ids"""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        for view in VIEWS:
+            conn.execute(text(view))
+
+        if conn.execute(text("SELECT COUNT(*) FROM users")).scalar():
+            return [row[0] for row in conn.execute(text("SELECT id FROM users ORDER BY id"))]
+
+        for role_id, (role_name, permission_level) in enumerate(ROLES, start=1):
+            conn.execute(text("INSERT INTO roles (id, role_name, permission_level) VALUES (:id, :name, :level)"),
+                         {"id": role_id, "name": role_name, "level": permission_level})
+
+        for category_id, (name, kind) in enumerate(CATEGORIES, start=1):
+            conn.execute(text("INSERT INTO categories (id, name, kind) VALUES (:id, :name, :kind)"),
+                         {"id": category_id, "name": name, "kind": kind})
+
+        user_ids = list(range(1, users + 1))
+        for user_id in user_ids:
+            conn.execute(text("INSERT INTO users (id, email, role_id) VALUES (:id, :email, 1)"),
+                         {"id": user_id, "email": f"bench{user_id}@example.com"})
+
+        rows = []
+        for user_id in user_ids:
+            for _ in range(transactions_per_user):
+                category_id = rng.randint(1, len(CATEGORIES))
+                amount = round(rng.uniform(5, 400), 2)
+                if CATEGORIES[category_id - 1][1] == "expense":
+                    amount = -amount
+                rows.append({
+                    "user_id": user_id,
+                    "category_id": category_id,
+                    "amount": amount,
+                    "created_at": now - timedelta(days=rng.randint(0, 365))
+                })
+        conn.execute(text(
+            "INSERT INTO transactions (user_id, category_id, amount, created_at) "
+            "VALUES (:user_id, :category_id, :amount, :created_at)"
+        ), rows)
+
+    return user_ids
@@ -0,0 +1,45 @@
+#test_bench_smoke.py
+import json
+import os
+import subprocess
+import sys
+
+BENCH_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_chat.py")
+
+
+def test_benchmark_reports_latency_percentiles():
+    # Separate process: the benchmark points the backend settings at its own database and fake LLM
+    completed = subprocess.run(
+        [sys.executable, BENCH_SCRIPT, "--turns", "10", "--concurrency", "4", "--llm-latency", "0",
+         "--users", "3", "--transactions-per-user", "20", "--json"],
+        capture_output=True, text=True, timeout=300
+    )
+    assert completed.returncode == 0, completed.stderr
+
+    reports = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert [report["target"] for report in reports] == ["classify_intent", "/chatbot/message"]
+    for report in reports:
+        assert report["turns"] == 10
+        assert report["errors"] == 0
+        assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+        assert report["llm_calls_per_turn"] > 0
+        assert report["db_queries_per_turn"] > 0
+
+
+def test_auth_benchmark_compares_inline_and_pool_hashing():
+    completed = subprocess.run(
+        [sys.executable, os.path.join(os.path.dirname(BENCH_SCRIPT), "bench_auth.py"), "--duration", "1",
+         "--login-clients", "4", "--dashboard-clients", "2", "--users", "2", "--bcrypt-rounds", "4", "--json"],
+        capture_output=True, text=True, timeout=300
+    )
+    assert completed.returncode == 0, completed.stderr
+
+    reports = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert [report["mode"] for report in reports] == ["inline", "process_pool"]
+    for report in reports:
+        assert report["logins_ok"] > 0
+        assert report["login_errors"] == 0 and report["dashboard_errors"] == 0
+        assert report["dashboard_p50_ms"] <= report["dashboard_p95_ms"]
+    assert reports[1]["password_pool"]["completed"] > 0